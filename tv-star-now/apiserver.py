@@ -9,6 +9,7 @@ __desc__ = "Serve TV program episode and schedule information in REST style"
 
 
 import argparse
+import gc
 import pymongo
 from flask import Flask
 from flask import redirect
@@ -16,8 +17,24 @@ from flask.ext.restful import Api
 from flask_restful_swagger import swagger
 from restapi import ScheduleDB
 from restapi import ScheduleSearch
+from restapi import ScheduleBatchSearch
 from restapi import ScheduleList
+from restapi import ScheduleNow
+from restapi import ScheduleWatch
+from restapi import WatchStats
 from restapi import CelebritiesList
+from restapi import CelebritiesSuggest
+from restapi import CelebIndexStatus
+from restapi import CacheStats
+from restapi import SqliteScheduleDB
+from restapi import SnapshotScheduleDB
+from restapi import WatchlistNotifier
+from restapi.representation import enableFastJson
+from restapi.metrics import RequestMetrics
+from restapi.metrics import enableMetrics
+from restapi.profiler import RequestProfiler
+from restapi.profiler import enableProfiler
+from restapi.profiler import ProfileReport
 
 
 def parseCmdLineArgs():
@@ -39,28 +56,184 @@ def parseCmdLineArgs():
                         help="API server address")
     parser.add_argument("--server-port", type=int, default=5000,
                         dest="serverPort", help="API server port")
+    parser.add_argument("--sqlite-file", dest="sqliteFile",
+                        help="serve from an SQLite file written by "
+                        "convert_to_sqlite.py instead of MongoDB")
+    parser.add_argument("--snapshot-file", dest="snapshotFile",
+                        help="serve from a snapshot file written by "
+                        "export_snapshot.py instead of MongoDB")
+    parser.add_argument("--celeb-index", action="store_true",
+                        dest="celebIndex",
+                        help="load celebrity index into memory")
+    parser.add_argument("--celeb-index-refresh", type=int, default=600,
+                        dest="celebIndexRefresh",
+                        help="celebrity index refresh interval in seconds")
+    parser.add_argument("--celeb-suggest", action="store_true",
+                        dest="celebSuggest",
+                        help="load celebrity name suggestion tries into "
+                        "memory")
+    parser.add_argument("--leaderboard", action="store_true",
+                        dest="leaderboard",
+                        help="load celebrity leaderboards by category and "
+                        "month into memory")
+    parser.add_argument("--schedule-index", action="store_true",
+                        dest="scheduleIndex",
+                        help="load schedule index into memory")
+    parser.add_argument("--slot-table", action="store_true",
+                        dest="slotTable",
+                        help="load on-air slot table into memory")
+    parser.add_argument("--participants-search", action="store_true",
+                        dest="participantsSearch",
+                        help="search with participants embedded in schedule")
+    parser.add_argument("--appearances-search", action="store_true",
+                        dest="appearancesSearch",
+                        help="search upcoming appearances with the "
+                        "materialized appearances collection")
+    parser.add_argument("--watchlist", action="store_true",
+                        dest="watchlist",
+                        help="notify watchers of celebrities with "
+                        "server-sent events on /schedule/watch; every "
+                        "stream holds a thread, so it requires --threads of "
+                        "2 or more and serves at most --watch-streams "
+                        "streams per worker, answering 503 beyond that")
+    parser.add_argument("--watch-streams", type=int, dest="watchStreams",
+                        help="event streams served at once per worker, "
+                        "1 to --threads minus 1; defaults to half of "
+                        "--threads")
+    parser.add_argument("--watch-lead", type=int, default=5,
+                        dest="watchLead",
+                        help="minutes before a program starts its watchers "
+                        "are notified")
+    parser.add_argument("--list-cache-size", type=int, default=64,
+                        dest="listCacheSize",
+                        help="number of cached schedule list responses")
+    parser.add_argument("--list-cache-ttl", type=int, default=3600,
+                        dest="listCacheTtl",
+                        help="schedule list cache time-to-live in seconds")
+    parser.add_argument("--search-cache-size", type=int, default=4096,
+                        dest="searchCacheSize",
+                        help="number of cached per-celebrity search results")
+    parser.add_argument("--search-cache-ttl", type=int, default=600,
+                        dest="searchCacheTtl",
+                        help="search cache time-to-live in seconds")
+    parser.add_argument("--generation-poll", type=int, default=60,
+                        dest="generationPoll",
+                        help="data generation polling interval in seconds")
+    parser.add_argument("--gzip-min-size", type=int, default=1024,
+                        dest="gzipMinSize",
+                        help="smallest response body in bytes compressed "
+                        "with gzip; 0 disables compression")
+    parser.add_argument("--metrics", action="store_true", dest="metrics",
+                        help="record request and MongoDB metrics and serve "
+                        "them on /metrics")
+    parser.add_argument("--profile-dir", dest="profileDir",
+                        help="profile sampled requests with cProfile and "
+                        "keep the dumps in this directory")
+    parser.add_argument("--profile-rate", type=float, default=0.0,
+                        dest="profileRate",
+                        help="fraction of requests to profile; authorized "
+                        "requests with X-Profile header are always profiled")
+    parser.add_argument("--profile-max-dumps", type=int, default=100,
+                        dest="profileMaxDumps",
+                        help="number of profile dumps to keep")
+    parser.add_argument("--profile-token", dest="profileToken",
+                        help="X-Profile header value authorizing forced "
+                        "profiling and /admin/profile; without it only "
+                        "loopback clients are authorized")
+    parser.add_argument("--workers", type=int, default=0, dest="workers",
+                        help="number of pre-forked worker processes; "
+                        "0 runs the development server")
+    parser.add_argument("--threads", type=int, default=1, dest="threads",
+                        help="number of threads per worker")
 
     args = parser.parse_args()
 
+    if args.sqliteFile and args.snapshotFile:
+        parser.error("--sqlite-file and --snapshot-file are exclusive")
+
+    # Every event stream holds a thread until its client goes away
+    if args.watchlist and args.threads < 2:
+        parser.error("--watchlist requires --threads of 2 or more")
+
+    if args.watchStreams is None:
+        args.watchStreams = max(1, args.threads // 2)
+    elif args.watchlist and not 0 < args.watchStreams < args.threads:
+        parser.error("--watch-streams must be 1 to --threads minus 1")
+
     return args
 
 
-def main(mongoHost, mongoPort, serverHost, serverPort):
+def setUpDB(mongoClient, args):
     """
-    Serve TV program episode and schedule information in REST style
+    Create a DB instance and load in-memory data structures.
     """
 
-    # Connect to MongoDB and create a DB instance
-    mongoClient = pymongo.MongoClient(host=mongoHost, port=mongoPort)
     db = ScheduleDB(mongoClient)
 
+    if args.celebIndex:
+        db.enableCelebIndex()
+
+    if args.celebSuggest:
+        db.enableCelebSuggest()
+
+    if args.leaderboard:
+        db.enableLeaderboard()
+
+    if args.scheduleIndex:
+        db.enableScheduleIndex()
+
+    if args.slotTable:
+        db.enableSlotTable()
+
+    if args.participantsSearch:
+        db.enableParticipantsSearch()
+
+    if args.appearancesSearch:
+        db.enableAppearancesSearch()
+
+    if args.searchCacheSize > 0:
+        db.enableSearchCache(args.searchCacheSize, args.searchCacheTtl)
+
+    return db
+
+
+def startBackgroundTasks(db, args):
+    """
+    Start refreshing in-memory data structures in background threads.
+    """
+
+    if args.celebIndex:
+        db.startCelebIndexRefresh(args.celebIndexRefresh)
+
+    db.watchGenerations(args.generationPoll)
+
+
+def createApp(db, args, metrics=None, notifier=None):
+    """
+    Create the WSGI app serving given DB instance.
+    """
+
     # Set up Flask app with Swagger document
     app = Flask(__name__)
     api = swagger.docs(
         Api(app),
-        basePath="http://{}:{}".format(serverHost, serverPort)
+        basePath="http://{}:{}".format(args.serverHost, args.serverPort)
     )
 
+    # Record requests; registered first so it sees the compressed sizes
+    if metrics:
+        enableMetrics(app, metrics)
+
+    # Serialize responses with ujson and compress large ones
+    enableFastJson(app, api, args.gzipMinSize)
+
+    # Profile sampled requests; registered last so it wraps the view only
+    if args.profileDir:
+        profiler = RequestProfiler(args.profileDir, args.profileRate,
+                                   args.profileMaxDumps, args.profileToken)
+        enableProfiler(app, profiler)
+        api.add_resource(ProfileReport.make(profiler), "/admin/profile")
+
     # Redirect / to API document
     @app.route("/")
     def index():
@@ -68,11 +241,147 @@ def main(mongoHost, mongoPort, serverHost, serverPort):
 
     # Register API methods
     api.add_resource(ScheduleSearch.make(db), "/schedule/search")
-    api.add_resource(ScheduleList.make(db), "/schedule/list")
+    api.add_resource(ScheduleNow.make(db), "/schedule/now")
+    api.add_resource(ScheduleList.make(db, args.listCacheSize,
+                                       args.listCacheTtl, args.gzipMinSize),
+                     "/schedule/list")
     api.add_resource(CelebritiesList.make(db), "/celebrities/list")
 
-    # Run the app
-    app.run(host=serverHost, port=serverPort)
+    # Server-sent events held open by watchers
+    if notifier:
+        api.add_resource(ScheduleWatch.make(notifier), "/schedule/watch")
+        api.add_resource(WatchStats.make(notifier), "/schedule/watch/stats")
+
+    # Methods relying on MongoDB in-memory structures
+    if not (args.sqliteFile or args.snapshotFile):
+        api.add_resource(ScheduleBatchSearch.make(db), "/schedule/batch")
+        api.add_resource(CelebritiesSuggest.make(db), "/celebrities/suggest")
+        api.add_resource(CelebIndexStatus.make(db), "/celebrities/index")
+        api.add_resource(CacheStats.make(db), "/cache/stats")
+
+    return app
+
+
+def serveProduction(app, db, args, notifier=None, metrics=None):
+    """
+    Serve the app with pre-forked gunicorn workers.
+
+    The app and its in-memory data are loaded before fork so workers share
+    them copy-on-write, and each worker connects to MongoDB after fork.
+    """
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("gunicorn is required to run with --workers")
+
+    def postFork(server, worker):
+        # SQLite connections are opened per process and thread on use, and
+        # snapshot pages mapped before fork are shared by the workers
+        if not (args.sqliteFile or args.snapshotFile):
+            mongoClient = pymongo.MongoClient(host=args.mongoHost,
+                                              port=args.mongoPort)
+            db.connect(mongoClient)
+            startBackgroundTasks(db, args)
+
+        # Each worker notifies its own watchers
+        if notifier:
+            notifier.start()
+
+    def onExit(server):
+        if metrics:
+            metrics.close()
+
+    options = {
+        "bind": "{}:{}".format(args.serverHost, args.serverPort),
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "preload_app": True,
+        "post_fork": postFork,
+        "on_exit": onExit
+    }
+
+    class ProductionServer(BaseApplication):
+
+        """
+        Gunicorn application serving the preloaded app.
+        """
+
+        def load_config(self):
+            """
+            Set gunicorn options.
+            """
+
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            """
+            Return the preloaded app.
+            """
+
+            return app
+
+    ProductionServer().run()
+
+
+def main(args):
+    """
+    Serve TV program episode and schedule information in REST style
+    """
+
+    # Listen to commands before any MongoClient is created
+    metrics = None
+
+    if args.metrics:
+        metrics = RequestMetrics()
+        metrics.listenMongoCommands()
+
+        # Whichever worker is scraped serves the sum of all workers
+        if args.workers > 0:
+            metrics.shareAcrossProcesses()
+
+    if args.sqliteFile:
+        mongoClient = None
+        db = SqliteScheduleDB(args.sqliteFile)
+    elif args.snapshotFile:
+        mongoClient = None
+        db = SnapshotScheduleDB(args.snapshotFile)
+    else:
+        # Connect to MongoDB and create a DB instance
+        mongoClient = pymongo.MongoClient(host=args.mongoHost,
+                                          port=args.mongoPort)
+        db = setUpDB(mongoClient, args)
+
+    notifier = None
+
+    if args.watchlist:
+        notifier = WatchlistNotifier(db, args.watchLead, args.watchStreams)
+
+    app = createApp(db, args, metrics, notifier)
+
+    if args.workers > 0:
+        # MongoClient is not fork-safe; workers create their own.
+        if mongoClient:
+            mongoClient.close()
+
+        # Keep preloaded objects out of GC so their pages stay shared
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        serveProduction(app, db, args, notifier, metrics)
+    else:
+        if mongoClient:
+            startBackgroundTasks(db, args)
+
+        if notifier:
+            notifier.start()
+
+        # Run the app
+        app.run(host=args.serverHost, port=args.serverPort,
+                threaded=args.threads > 1)
+
 
 #
 # main
@@ -80,4 +389,4 @@ def main(mongoHost, mongoPort, serverHost, serverPort):
 
 if __name__ == "__main__":
     args = parseCmdLineArgs()
-    main(args.mongoHost, args.mongoPort, args.serverHost, args.serverPort)
+    main(args)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+__author__ = "Hwanho Lee"
+__email__ = "hanwho633@naver.com"
+__copyright__ = "Copyright (c) 2014 by Hwanho Lee"
+__desc__ = "Serve TV program episode and schedule information in REST style " \
+           "with asyncio"
+
+
+import argparse
+import urllib.parse
+from aiohttp import web
+from motor.motor_asyncio import AsyncIOMotorClient
+from restapi.asyncscheduledb import AsyncScheduleDB
+from restapi.apiparams import ASYNC_SEARCH_PARAMS
+from restapi.apiparams import ASYNC_LIST_PARAMS
+from restapi.apiparams import ASYNC_CELEBRITIES_PARAMS
+from restapi.queries import parseChannelIds
+from restapi.queries import dumpJson
+from restapi.util import validateDate
+
+
+_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+
+def parseCmdLineArgs():
+    """
+    Parse command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(description=__desc__,
+                                     epilog="Contact {} <{}> for reporting "
+                                     "bugs and suggestions.\n"
+                                     "{}".format(__author__, __email__,
+                                                 __copyright__))
+
+    parser.add_argument("--mongo-host", default="localhost", dest="mongoHost",
+                        help="MongoDB host")
+    parser.add_argument("--mongo-port", type=int, default=27017,
+                        dest="mongoPort", help="MongoDB port")
+    parser.add_argument("--server-host", required=True, dest="serverHost",
+                        help="API server address")
+    parser.add_argument("--server-port", type=int, default=5000,
+                        dest="serverPort", help="API server port")
+
+    args = parser.parse_args()
+
+    return args
+
+
+def makeSwaggerSpec(basePath):
+    """
+    Make Swagger 1.2 API declaration of the served routes.
+    """
+
+    apis = [
+        ("/schedule/search", u"방송 편성표 검색", ASYNC_SEARCH_PARAMS),
+        ("/schedule/list", u"방송 편성 정보 보기", ASYNC_LIST_PARAMS),
+        ("/celebrities/list", u"방송 출연 유명인 보기",
+         ASYNC_CELEBRITIES_PARAMS)
+    ]
+    spec = {
+        "apiVersion": "0.1",
+        "swaggerVersion": "1.2",
+        "basePath": basePath,
+        "resourcePath": "/",
+        "produces": ["application/json"],
+        "apis": []
+    }
+
+    for path, summary, params in apis:
+        spec["apis"].append({
+            "path": path,
+            "operations": [{
+                "method": "GET",
+                "nickname": path.strip("/").replace("/", "_"),
+                "summary": summary,
+                "parameters": params
+            }]
+        })
+
+    return spec
+
+
+def errorResponse(message):
+    """
+    Make an error response in the same form as the Flask server.
+    """
+
+    return web.json_response({"error": message}, headers=_HEADERS,
+                             dumps=dumpJson)
+
+
+def checkParams(request, params):
+    """
+    Return an error response naming the first query parameter not in given
+    parameters, None if all are supported.
+    """
+
+    names = {p["name"] for p in params}
+
+    for name in request.query:
+        if name not in names:
+            return errorResponse("Unsupported parameter: {}".format(name))
+
+    return None
+
+
+def getScheduleFilter(request):
+    """
+    Get channel IDs and main category schedule filters of the request.
+    """
+
+    channelIds = request.query.get("channelIds")
+
+    if channelIds is not None:
+        channelIds = parseChannelIds(channelIds)
+
+    return channelIds, request.query.get("mainCategory")
+
+
+def makeHandlers(db, spec):
+    """
+    Make request handlers serving given DB instance.
+    """
+
+    async def searchSchedule(request):
+        error = checkParams(request, ASYNC_SEARCH_PARAMS)
+
+        if error:
+            return error
+
+        dateStr = request.query.get("date")
+        timeStr = request.query.get("time")
+        celebs = request.query.get("celebs")
+        mode = request.query.get("mode", "window")
+
+        if not (dateStr and timeStr and celebs):
+            return errorResponse("date, time and celebs are required")
+
+        celebs = urllib.parse.unquote(celebs, encoding="utf-8")
+
+        try:
+            channelIds, mainCategory = getScheduleFilter(request)
+        except ValueError as e:
+            return errorResponse("{}".format(e))
+
+        if mode == "window":
+            records = await db.searchSchedule(dateStr, timeStr, celebs,
+                                              channelIds, mainCategory)
+        elif mode == "onair":
+            records = await db.searchScheduleOnAir(dateStr, timeStr, celebs,
+                                                   channelIds, mainCategory)
+        elif mode in ["range", "next"]:
+            return errorResponse("Unsupported mode: {}".format(mode))
+        else:
+            return errorResponse("Invalid mode: {}".format(mode))
+
+        return web.json_response({"data": records}, headers=_HEADERS,
+                                 dumps=dumpJson)
+
+    async def listSchedule(request):
+        error = checkParams(request, ASYNC_LIST_PARAMS)
+
+        if error:
+            return error
+
+        dateStr = request.query.get("date")
+        dateRange = request.query.get("range")
+
+        try:
+            validateDate(dateStr)
+            channelIds, mainCategory = getScheduleFilter(request)
+        except ValueError as e:
+            return errorResponse("{}".format(e))
+
+        if dateRange not in ["day", "week"]:
+            return errorResponse("Invalid range: {}".format(dateRange))
+
+        records = await db.listSchedule(dateStr, dateRange, channelIds,
+                                        mainCategory)
+
+        return web.json_response({"data": records}, headers=_HEADERS,
+                                 dumps=dumpJson)
+
+    async def listCelebrities(request):
+        error = checkParams(request, ASYNC_CELEBRITIES_PARAMS)
+
+        if error:
+            return error
+
+        try:
+            topN = int(request.query.get("topN"))
+        except (TypeError, ValueError):
+            return errorResponse("Invalid topN: "
+                                 "{}".format(request.query.get("topN")))
+
+        if topN > 100:
+            return errorResponse("Invalid topN: {}".format(topN))
+
+        records = await db.listCelebrities(topN)
+
+        return web.json_response({"data": records}, headers=_HEADERS,
+                                 dumps=dumpJson)
+
+    async def getSpec(request):
+        return web.json_response(spec, headers=_HEADERS, dumps=dumpJson)
+
+    return searchSchedule, listSchedule, listCelebrities, getSpec
+
+
+def createApp(db, serverHost, serverPort):
+    """
+    Create the aiohttp app serving given DB instance.
+    """
+
+    spec = makeSwaggerSpec("http://{}:{}".format(serverHost, serverPort))
+    searchSchedule, listSchedule, listCelebrities, getSpec = \
+        makeHandlers(db, spec)
+
+    app = web.Application()
+    app.router.add_get("/schedule/search", searchSchedule)
+    app.router.add_get("/schedule/list", listSchedule)
+    app.router.add_get("/celebrities/list", listCelebrities)
+    app.router.add_get("/api/spec.json", getSpec)
+
+    return app
+
+
+def main(mongoHost, mongoPort, serverHost, serverPort):
+    """
+    Serve TV program episode and schedule information in REST style with
+    asyncio.
+    """
+
+    # Connect to MongoDB and create a DB instance
+    mongoClient = AsyncIOMotorClient(host=mongoHost, port=mongoPort)
+    db = AsyncScheduleDB(mongoClient)
+
+    # Run the app
+    app = createApp(db, serverHost, serverPort)
+    web.run_app(app, host=serverHost, port=serverPort)
+
+
+#
+# main
+#
+
+if __name__ == "__main__":
+    args = parseCmdLineArgs()
+    main(args.mongoHost, args.mongoPort, args.serverHost, args.serverPort)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+__author__ = "Hwanho Lee"
+__email__ = "hanwho633@naver.com"
+__copyright__ = "Copyright (c) 2014 by Hwanho Lee"
+__desc__ = "Compare JSON encoders on a week of crawled TV schedule"
+
+
+import argparse
+import datetime
+import gzip
+import json
+import timeit
+import ujson
+from restapi.util import getThisWeekSunSatDateTime
+
+
+ENCODERS = [
+    ("json", lambda d: json.dumps(d)),
+    ("json ensure_ascii=False", lambda d: json.dumps(d, ensure_ascii=False)),
+    ("ujson", lambda d: ujson.dumps(d)),
+    ("ujson ensure_ascii=False", lambda d: ujson.dumps(d, ensure_ascii=False))
+]
+
+
+def parseCmdLineArgs():
+    """
+    Parse command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(description=__desc__,
+                                     epilog="Contact {} <{}> for reporting "
+                                     "bugs and suggestions.\n"
+                                     "{}".format(__author__, __email__,
+                                                 __copyright__))
+
+    parser.add_argument("--schedule-files", dest="scheduleFiles",
+                        type=argparse.FileType("r"), nargs="+",
+                        required=True, help="schedule information file names")
+    parser.add_argument("--date", dest="date",
+                        help="a date of the week to encode, e.g. 20141020; "
+                        "all items are encoded if not given")
+    parser.add_argument("--repeat", type=int, default=20, dest="repeat",
+                        help="number of encodings per encoder")
+    args = parser.parse_args()
+
+    return args
+
+
+def loadWeekPayload(scheduleFiles, dateStr):
+    """
+    Load schedule items of the week given date belongs as a list response.
+    """
+
+    weekDates = None
+
+    if dateStr:
+        sunDateTime, _ = getThisWeekSunSatDateTime(dateStr)
+        weekDates = {(sunDateTime + datetime.timedelta(days=d)).strftime(
+            "%Y%m%d") for d in range(7)}
+
+    scheduleItems = []
+
+    for scheduleFile in scheduleFiles:
+        for line in scheduleFile:
+            scheduleItem = ujson.loads(line.strip())
+
+            if weekDates is None or scheduleItem["date"] in weekDates:
+                scheduleItems.append(scheduleItem)
+
+    return {"data": scheduleItems}
+
+
+def main(scheduleFiles, dateStr, repeat):
+    """
+    Compare JSON encoders on a week of crawled TV schedule.
+    """
+
+    payload = loadWeekPayload(scheduleFiles, dateStr)
+    print("{} schedule items".format(len(payload["data"])))
+
+    for name, dumps in ENCODERS:
+        body = dumps(payload).encode("utf-8")
+        elapsed = timeit.timeit(lambda: dumps(payload), number=repeat)
+        print("{:<26} {:>8.2f} ms {:>10} bytes".format(
+            name, elapsed / repeat * 1000, len(body)))
+
+    body = ujson.dumps(payload, ensure_ascii=False).encode("utf-8")
+    elapsed = timeit.timeit(lambda: gzip.compress(body, compresslevel=6),
+                            number=repeat)
+    print("{:<26} {:>8.2f} ms {:>10} bytes".format(
+        "gzip level 6", elapsed / repeat * 1000,
+        len(gzip.compress(body, compresslevel=6))))
+
+#
+# main
+#
+
+
+if __name__ == "__main__":
+    args = parseCmdLineArgs()
+    main(args.scheduleFiles, args.date, args.repeat)
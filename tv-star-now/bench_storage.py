@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+__author__ = "Hwanho Lee"
+__email__ = "hanwho633@naver.com"
+__copyright__ = "Copyright (c) 2014 by Hwanho Lee"
+__desc__ = "Compare MongoDB and SQLite storage backends on the same dataset"
+
+
+import argparse
+import timeit
+import pymongo
+from restapi import ScheduleDB
+from restapi import SqliteScheduleDB
+
+
+def parseCmdLineArgs():
+    """
+    Parse command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(description=__desc__,
+                                     epilog="Contact {} <{}> for reporting "
+                                     "bugs and suggestions.\n"
+                                     "{}".format(__author__, __email__,
+                                                 __copyright__))
+
+    parser.add_argument("--mongo-host", default="localhost", dest="mongoHost",
+                        help="MongoDB host")
+    parser.add_argument("--mongo-port", type=int, default=27017,
+                        dest="mongoPort", help="MongoDB port")
+    parser.add_argument("--sqlite-file", dest="sqliteFile", required=True,
+                        help="SQLite file converted from the same files")
+    parser.add_argument("--date", dest="date", required=True,
+                        help="date to query, e.g. 20141020")
+    parser.add_argument("--celebs", type=int, default=5, dest="celebs",
+                        help="number of top celebrities searched")
+    parser.add_argument("--repeat", type=int, default=20, dest="repeat",
+                        help="number of runs per query")
+    args = parser.parse_args()
+
+    return args
+
+
+def makeQueries(dateStr, celebs):
+    """
+    Make (name, function of a DB instance) pairs of the benchmarked queries.
+    """
+
+    times = ["{:02d}00".format(h) for h in range(6, 24, 3)]
+
+    return [
+        ("search", lambda db: [db.searchSchedule(dateStr, t, celebs)
+                               for t in times]),
+        ("search onair", lambda db: [db.searchScheduleOnAir(dateStr, t,
+                                                            celebs)
+                                     for t in times]),
+        ("list day", lambda db: list(db.listSchedule(dateStr, "day"))),
+        ("list week", lambda db: list(db.listSchedule(dateStr, "week"))),
+        ("celebrities", lambda db: list(db.listCelebrities(100)))
+    ]
+
+
+def normalize(result):
+    """
+    Normalize query results for comparison regardless of order.
+    """
+
+    keys = []
+
+    for record in result:
+        if isinstance(record, list):
+            keys.append(normalize(record))
+        elif "scheduleItems" in record:
+            keys.append(sorted((record["celebrity"], s["channelId"],
+                                s["date"], s["time"])
+                               for items in record["scheduleItems"].values()
+                               for s in items))
+        elif "channelId" in record:
+            keys.append((record["channelId"], record["date"],
+                         record["time"]))
+        else:
+            keys.append((record["name"], record["appearCount"]))
+
+    return sorted(keys)
+
+
+def main(mongoHost, mongoPort, sqliteFile, dateStr, numCelebs, repeat):
+    """
+    Compare MongoDB and SQLite storage backends on the same dataset.
+    """
+
+    mongoClient = pymongo.MongoClient(host=mongoHost, port=mongoPort)
+    dbs = [("mongodb", ScheduleDB(mongoClient)),
+           ("sqlite", SqliteScheduleDB(sqliteFile))]
+
+    celebs = "|".join(c["name"]
+                      for c in dbs[1][1].listCelebrities(numCelebs))
+    print("Searching {}".format(celebs))
+
+    for name, query in makeQueries(dateStr, celebs):
+        results = []
+
+        for dbName, db in dbs:
+            results.append(normalize(query(db)))
+            elapsed = timeit.timeit(lambda: query(db), number=repeat)
+            print("{:<14} {:<8} {:>8.2f} ms".format(name, dbName,
+                                                    elapsed / repeat * 1000))
+
+        if results[0] != results[1]:
+            print("{:<14} results differ".format(name))
+
+#
+# main
+#
+
+
+if __name__ == "__main__":
+    args = parseCmdLineArgs()
+    main(args.mongoHost, args.mongoPort, args.sqliteFile, args.date,
+         args.celebs, args.repeat)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+__author__ = "Hwanho Lee"
+__email__ = "hanwho633@naver.com"
+__copyright__ = "Copyright (c) 2014 by Hwanho Lee"
+__desc__ = "Convert crawled TV schedule and program information into an " \
+           "SQLite file"
+
+
+import argparse
+import collections
+import logging
+import sqlite3
+import ujson
+from tvinfo import ProgramInfo
+from restapi.util import str2dateTime
+from restapi.participants import getParticipants
+from restapi.leaderboard import getEpisodePeriod
+from restapi.leaderboard import makeCelebrityDeltas
+from restapi.sqlitedb import createSqliteSchema
+from restapi.sqlitedb import formatDateTime
+from restapi.sqlitedb import bumpSqliteGeneration
+
+
+def parseCmdLineArgs():
+    """
+    Parse command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(description=__desc__,
+                                     epilog="Contact {} <{}> for reporting "
+                                     "bugs and suggestions.\n"
+                                     "{}".format(__author__, __email__,
+                                                 __copyright__))
+
+    parser.add_argument("--sqlite-file", dest="sqliteFile", required=True,
+                        help="SQLite file name; created if not exists")
+    parser.add_argument("--schedule-files", dest="scheduleFiles",
+                        type=argparse.FileType("r"), nargs="+", default=[],
+                        help="schedule information file names")
+    parser.add_argument("--prog-files", dest="progInfoFiles",
+                        type=argparse.FileType("r"), nargs="+", default=[],
+                        help="program information file names")
+    args = parser.parse_args()
+
+    if not (args.scheduleFiles or args.progInfoFiles):
+        parser.error("--schedule-files or --prog-files is required")
+
+    return args
+
+
+def insertScheduleItem(conn, scheduleItem):
+    """
+    Insert a schedule item, replacing the item of the same channel and
+    dateTime.
+    """
+
+    dateTime = str2dateTime(scheduleItem["date"], scheduleItem["time"])
+    endDateTime = None
+
+    # End datetime is left unknown for the last item of a crawl
+    if scheduleItem.get("endTime"):
+        endDateTime = formatDateTime(str2dateTime(scheduleItem["endDate"],
+                                                  scheduleItem["endTime"]))
+
+    conn.execute("INSERT OR REPLACE INTO schedule (date, time, dateTime, "
+                 "endDate, endTime, endDateTime, channelId, channelName, "
+                 "programId, title, episodeNum) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 (scheduleItem["date"], scheduleItem["time"],
+                  formatDateTime(dateTime), scheduleItem.get("endDate"),
+                  scheduleItem.get("endTime"), endDateTime,
+                  scheduleItem["channelId"], scheduleItem.get("channelName"),
+                  scheduleItem["programId"], scheduleItem.get("title"),
+                  scheduleItem.get("episodeNum") or ""))
+
+
+def insertProgramInfo(conn, progInfo):
+    """
+    Insert program basic information, episodes and their celebrities.
+    """
+
+    programInfo = ProgramInfo(logging.DEBUG)
+    progBasicInfo = programInfo.getProgBasicInfoCelebs(progInfo)[0]
+    programId = progBasicInfo["programId"]
+
+    conn.execute("INSERT OR REPLACE INTO programs (programId, title, "
+                 "mainCategory, subCategory) VALUES (?, ?, ?, ?)",
+                 (programId, progBasicInfo["programTitle"],
+                  progBasicInfo["mainCatName"], progBasicInfo["subCatName"]))
+    conn.executemany("INSERT OR IGNORE INTO programCast (programId, "
+                     "celebrity) VALUES (?, ?)",
+                     [(programId, c) for c in progBasicInfo["cast"]])
+
+    episodes = programInfo.getEpisodesCelebs(progInfo)[0]
+
+    if not episodes:
+        return
+
+    conn.executemany("INSERT OR REPLACE INTO episodes (programId, "
+                     "episodeNum, episodeDate) VALUES (?, ?, ?)",
+                     [(programId, e["episodeNum"], e["episodeDate"])
+                      for e in episodes])
+    conn.executemany("INSERT OR IGNORE INTO episodeGuests (programId, "
+                     "episodeNum, celebrity) VALUES (?, ?, ?)",
+                     [(programId, e["episodeNum"], g)
+                      for e in episodes for g in e["guests"]])
+
+
+def countCelebrities(conn):
+    """
+    Count appearances of celebrities and write them with their deltas,
+    replacing the counts of earlier conversions.
+    """
+
+    categoryCounts = collections.defaultdict(collections.Counter)
+
+    # Cast appearances count for the program's category in no period
+    for celeb, category in conn.execute(
+            "SELECT c.celebrity, p.mainCategory FROM programCast c "
+            "LEFT JOIN programs p ON p.programId = c.programId"):
+        categoryCounts[category][(celeb, "")] += 1
+
+    # Guest appearances count for the program's category in episode months
+    for celeb, category, episodeDate in conn.execute(
+            "SELECT g.celebrity, p.mainCategory, e.episodeDate "
+            "FROM episodeGuests g "
+            "LEFT JOIN programs p ON p.programId = g.programId "
+            "LEFT JOIN episodes e ON e.programId = g.programId AND "
+            "e.episodeNum = g.episodeNum"):
+        categoryCounts[category][(celeb, getEpisodePeriod(episodeDate))] += 1
+
+    conn.execute("DELETE FROM celebrityDeltas")
+    conn.execute("DELETE FROM celebrities")
+
+    for category, celebCounts in categoryCounts.items():
+        conn.executemany("INSERT INTO celebrityDeltas (name, category, "
+                         "period, count) VALUES (?, ?, ?, ?)",
+                         [(d["name"], d["category"], d["period"], d["count"])
+                          for d in makeCelebrityDeltas(celebCounts,
+                                                       category)])
+
+    conn.execute("INSERT INTO celebrities (name, appearCount) "
+                 "SELECT name, SUM(count) FROM celebrityDeltas GROUP BY name")
+
+
+def materializeParticipants(conn, programIds):
+    """
+    Write participants and main categories onto schedule rows of given
+    programs.
+    """
+
+    for programId in set(programIds):
+        episodeGuests = collections.defaultdict(set)
+        programCast = {programId: {r[0] for r in conn.execute(
+            "SELECT celebrity FROM programCast WHERE programId = ?",
+            (programId,))}}
+
+        for episodeNum, celeb in conn.execute(
+                "SELECT episodeNum, celebrity FROM episodeGuests "
+                "WHERE programId = ?", (programId,)):
+            episodeGuests[(programId, episodeNum)].add(celeb)
+
+        row = conn.execute("SELECT mainCategory FROM programs "
+                           "WHERE programId = ?", (programId,)).fetchone()
+        mainCategory = row[0] if row else None
+        episodeNums = [r[0] for r in conn.execute(
+            "SELECT DISTINCT episodeNum FROM schedule WHERE programId = ?",
+            (programId,))]
+
+        for episodeNum in episodeNums:
+            participants = getParticipants(episodeGuests, programCast,
+                                           programId, episodeNum)
+            conn.execute("UPDATE schedule SET participants = ?, "
+                         "mainCategory = ? WHERE programId = ? AND "
+                         "episodeNum = ?",
+                         (ujson.dumps(participants, ensure_ascii=False),
+                          mainCategory, programId, episodeNum))
+
+
+def main(sqliteFile, scheduleFiles, progInfoFiles):
+    """
+    Convert crawled TV schedule and program information into an SQLite file.
+    """
+
+    conn = sqlite3.connect(sqliteFile)
+    createSqliteSchema(conn)
+    programIds = set()
+
+    # One transaction, so API servers never read a partial conversion
+    with conn:
+        for scheduleFile in scheduleFiles:
+            print("Converting schedule from {}".format(scheduleFile.name))
+
+            for line in scheduleFile:
+                scheduleItem = ujson.loads(line.strip())
+                insertScheduleItem(conn, scheduleItem)
+                programIds.add(scheduleItem["programId"])
+
+        for progInfoFile in progInfoFiles:
+            print("Converting program information from "
+                  "{}".format(progInfoFile.name))
+
+            for line in progInfoFile:
+                progInfo = ujson.loads(line.strip())
+                insertProgramInfo(conn, progInfo)
+                programIds.add(progInfo["programId"])
+
+        print("Materializing participants")
+        materializeParticipants(conn, programIds)
+
+        # Counted from all programs so converting again never adds to them
+        print("Counting celebrity appearances")
+        countCelebrities(conn)
+
+        # Let API servers know the data changed
+        for name in ["schedule", "programs", "episodes", "celebrities"]:
+            bumpSqliteGeneration(conn, name)
+
+    # Refresh statistics the query planner picks indexes with
+    conn.execute("ANALYZE")
+    conn.close()
+
+#
+# main
+#
+
+
+if __name__ == "__main__":
+    args = parseCmdLineArgs()
+    main(args.sqliteFile, args.scheduleFiles, args.progInfoFiles)
@@ -10,6 +10,8 @@ __desc__ = "Drop celebrities collection from MongoDB"
 
 import argparse
 import pymongo
+from restapi.datagen import bumpGeneration
+from restapi.leaderboard import CELEBRITY_DELTAS_COLL
 
 
 def parseCmdLineArgs():
@@ -39,12 +41,19 @@ def main(host, port):
 
     client = pymongo.MongoClient(host=host, port=port)
     db = client["tv-star-now"]
-    coll = db["celebrites"]
+    coll = db["celebrities"]
 
     # Drop collection
-    print("Dropping celebrites collection.")
+    print("Dropping celebrities collection.")
     coll.drop()
 
+    # Drop appearance count deltas summed by API servers
+    print("Dropping {} collection.".format(CELEBRITY_DELTAS_COLL))
+    db[CELEBRITY_DELTAS_COLL].drop()
+
+    # Let API servers know the celebrities are gone
+    bumpGeneration(db, "celebrities")
+
 #
 # main
 #
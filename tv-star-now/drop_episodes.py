@@ -10,6 +10,7 @@ __desc__ = "Drop episodes collection from MongoDB"
 
 import argparse
 import pymongo
+from restapi.datagen import bumpGeneration
 
 
 def parseCmdLineArgs():
@@ -45,6 +46,9 @@ def main(host, port):
     print("Dropping episodes collection.")
     coll.drop()
 
+    # Let API servers know the episodes are gone
+    bumpGeneration(db, "episodes")
+
 #
 # main
 #
@@ -10,6 +10,7 @@ __desc__ = "Drop programs collection from MongoDB"
 
 import argparse
 import pymongo
+from restapi.datagen import bumpGeneration
 
 
 def parseCmdLineArgs():
@@ -45,6 +46,9 @@ def main(host, port):
     print("Dropping programs collection.")
     coll.drop()
 
+    # Let API servers know the programs are gone
+    bumpGeneration(db, "programs")
+
 #
 # main
 #
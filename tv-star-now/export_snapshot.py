@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+__author__ = "Hwanho Lee"
+__email__ = "hanwho633@naver.com"
+__copyright__ = "Copyright (c) 2014 by Hwanho Lee"
+__desc__ = "Export TV schedule, programs and celebrities in MongoDB into " \
+           "a read-only snapshot file"
+
+
+import argparse
+import pymongo
+from restapi.snapshot import exportSnapshot
+
+
+def parseCmdLineArgs():
+    """
+    Parse command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(description=__desc__,
+                                     epilog="Contact {} <{}> for reporting "
+                                     "bugs and suggestions.\n"
+                                     "{}".format(__author__, __email__,
+                                                 __copyright__))
+
+    parser.add_argument("--host", default="localhost", help="MongoDB host",
+                        dest="host")
+    parser.add_argument("--port", type=int, default=27017, dest="port",
+                        help="MongoDB port")
+    parser.add_argument("--snapshot-file", dest="snapshotFile",
+                        required=True,
+                        help="snapshot file name; replaced atomically if "
+                        "exists")
+    args = parser.parse_args()
+
+    return args
+
+
+def main(host, port, snapshotFile):
+    """
+    Export TV schedule, programs and celebrities in MongoDB into a read-only
+    snapshot file.
+    """
+
+    client = pymongo.MongoClient(host=host, port=port)
+    db = client["tv-star-now"]
+
+    print("Exporting snapshot to {}".format(snapshotFile))
+    exportSnapshot(db, snapshotFile)
+
+#
+# main
+#
+
+
+if __name__ == "__main__":
+    args = parseCmdLineArgs()
+    main(args.host, args.port, args.snapshotFile)
@@ -9,10 +9,19 @@ __desc__ = "Insert crawled TV program information into MongoDB"
 
 
 import argparse
+import collections
 import logging
 import ujson
 import pymongo
 from tvinfo import ProgramInfo
+from restapi.datagen import bumpGeneration
+from restapi.participants import materializeParticipants
+from restapi.appearances import materializeAppearances
+from restapi.leaderboard import CELEBRITY_DELTAS_COLL
+from restapi.leaderboard import getEpisodePeriod
+from restapi.leaderboard import makeCelebrityDeltas
+from restapi.leaderboard import insertCelebrityDeltas
+from restapi.leaderboard import compactCelebrityDeltas
 
 
 def parseCmdLineArgs():
@@ -91,12 +100,13 @@ def createCelebrities(db):
     celebritiesColl = db["celebrities"]
 
     # Create index
-    celebritiesColl.ensure_index("appearCount", pymongo.DESCENDING)
+    celebritiesColl.ensure_index([("appearCount", pymongo.DESCENDING)])
 
     return celebritiesColl
 
 
-def insertProgramCelebs(programsColl, celebritiesColl, progInfo):
+def insertProgramCelebs(programsColl, celebritiesColl, deltasColl,
+                        progInfo):
     """
     Insert program basic information and celebrities.
     """
@@ -114,8 +124,15 @@ def insertProgramCelebs(programsColl, celebritiesColl, progInfo):
                                {"$inc": {"appearCount": celeb["appearCount"]}},
                                safe=True, upsert=True)
 
+    # Cast appearances count for the program's category in no period
+    celebCounts = collections.Counter((c["name"], "") for c in celebs)
+    insertCelebrityDeltas(deltasColl,
+                          makeCelebrityDeltas(celebCounts,
+                                              progBasicInfo["mainCatName"]))
 
-def insertEpisodesCelebs(episodesColl, celebritiesColl, progInfo):
+
+def insertEpisodesCelebs(episodesColl, celebritiesColl, deltasColl,
+                         progInfo):
     """
     Insert episodes and celebrities.
     """
@@ -134,6 +151,14 @@ def insertEpisodesCelebs(episodesColl, celebritiesColl, progInfo):
                                {"$inc": {"appearCount": celeb["appearCount"]}},
                                safe=True, upsert=True)
 
+    # Guest appearances count for the program's category in episode months
+    celebCounts = collections.Counter(
+        (celeb, getEpisodePeriod(episode["episodeDate"]))
+        for episode in episodes for celeb in episode["guests"])
+    insertCelebrityDeltas(deltasColl,
+                          makeCelebrityDeltas(celebCounts,
+                                              progInfo["mainCatName"]))
+
 
 def main(host, port, progInfoFiles):
     """
@@ -146,6 +171,13 @@ def main(host, port, progInfoFiles):
     programsColl = createPrograms(db)
     episodesColl = createEpisodes(db)
     celebritiesColl = createCelebrities(db)
+    deltasColl = db[CELEBRITY_DELTAS_COLL]
+    programIds = set()
+
+    # Sum the deltas API servers applied after the last ingest, so the
+    # collection does not grow with every ingest
+    print("Compacting celebrity deltas")
+    compactCelebrityDeltas(db)
 
     for progInfoFile in progInfoFiles:
         print("Reading program information from {}".format(progInfoFile.name))
@@ -153,9 +185,25 @@ def main(host, port, progInfoFiles):
         for line in progInfoFile:
             progInfo = ujson.loads(line.strip())
             print("Inserting program information and celebrities")
-            insertProgramCelebs(programsColl, celebritiesColl, progInfo)
+            insertProgramCelebs(programsColl, celebritiesColl, deltasColl,
+                                progInfo)
             print("Inserting episode information and celebrities")
-            insertEpisodesCelebs(episodesColl, celebritiesColl, progInfo)
+            insertEpisodesCelebs(episodesColl, celebritiesColl, deltasColl,
+                                 progInfo)
+            programIds.add(progInfo["programId"])
+
+    # Re-materialize participants of already inserted schedule items
+    print("Materializing participants")
+    materializeParticipants(db["schedule"], episodesColl, programsColl,
+                            programIds)
+
+    # Precompute upcoming appearances per celebrity
+    print("Materializing appearances")
+    materializeAppearances(db)
+
+    # Let API servers know the program information changed
+    for collName in ["programs", "episodes", "celebrities", "schedule"]:
+        bumpGeneration(db, collName)
 
 
 #
@@ -12,6 +12,9 @@ import argparse
 import ujson
 import pymongo
 from restapi.util import str2dateTime
+from restapi.datagen import bumpGeneration
+from restapi.participants import materializeParticipants
+from restapi.appearances import materializeAppearances
 
 
 def parseCmdLineArgs():
@@ -55,6 +58,21 @@ def main(host, port, scheduleFiles):
     coll.ensure_index("date")
     coll.ensure_index("time")
     coll.ensure_index("dateTime")
+    coll.ensure_index([("participants", pymongo.ASCENDING),
+                       ("dateTime", pymongo.ASCENDING)])
+    coll.ensure_index([("dateTime", pymongo.ASCENDING),
+                       ("_id", pymongo.ASCENDING)])
+    coll.ensure_index([("date", pymongo.ASCENDING),
+                       ("dateTime", pymongo.ASCENDING),
+                       ("_id", pymongo.ASCENDING)])
+    coll.ensure_index([("channelId", pymongo.ASCENDING),
+                       ("dateTime", pymongo.ASCENDING),
+                       ("_id", pymongo.ASCENDING)])
+    coll.ensure_index([("mainCategory", pymongo.ASCENDING),
+                       ("dateTime", pymongo.ASCENDING),
+                       ("_id", pymongo.ASCENDING)])
+
+    programIds = set()
 
     for scheduleFile in scheduleFiles:
         print("Inserting data from {}".format(scheduleFile.name))
@@ -67,8 +85,27 @@ def main(host, port, scheduleFiles):
             timeStr = scheduleItem["time"]
             scheduleItem["dateTime"] = str2dateTime(dateStr, timeStr)
 
+            # Add end datetime object property if the end is known
+            if scheduleItem.get("endTime"):
+                endDateStr = scheduleItem["endDate"]
+                endTimeStr = scheduleItem["endTime"]
+                scheduleItem["endDateTime"] = str2dateTime(endDateStr,
+                                                           endTimeStr)
+
             # Upsert
             coll.save(scheduleItem)
+            programIds.add(scheduleItem["programId"])
+
+    # Embed episode guests or program cast
+    print("Materializing participants")
+    materializeParticipants(coll, db["episodes"], db["programs"], programIds)
+
+    # Precompute upcoming appearances per celebrity
+    print("Materializing appearances")
+    materializeAppearances(db)
+
+    # Let API servers know the schedule changed
+    bumpGeneration(db, "schedule")
 
 #
 # main
@@ -1,6 +1,21 @@
 # -*- coding: utf-8 -*-
 
-from .scheduledb import ScheduleDB
-from .scheduledb import ScheduleSearch
-from .scheduledb import ScheduleList
-from .scheduledb import CelebritiesList
+import importlib.util
+from .storage import ScheduleStorage
+from .sqlitedb import SqliteScheduleDB
+from .snapshot import SnapshotScheduleDB
+from .notifier import WatchlistNotifier
+
+# The asyncio server imports this package without Flask installed
+if importlib.util.find_spec("flask"):
+    from .scheduledb import ScheduleDB
+    from .scheduledb import ScheduleSearch
+    from .scheduledb import ScheduleBatchSearch
+    from .scheduledb import ScheduleList
+    from .scheduledb import ScheduleNow
+    from .scheduledb import ScheduleWatch
+    from .scheduledb import WatchStats
+    from .scheduledb import CelebritiesList
+    from .scheduledb import CelebritiesSuggest
+    from .scheduledb import CelebIndexStatus
+    from .scheduledb import CacheStats
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+# Swagger parameter descriptions shared by the API servers
+
+
+SEARCH_PARAMS = [
+    {
+        "name": "date",
+        "description": u"날짜(YYYYMMDD)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "time",
+        "description": u"시간(HHMM)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "celebs",
+        "description": u"출연자(여러 명일 경우 '|'로 구분)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "mode",
+        "description": u"검색 방식. 'window'(기본값, 30분 전부터 "
+                       u"1시간 후까지 시작하는 프로그램), "
+                       u"'onair'(주어진 시각에 방송 중인 프로그램), "
+                       u"'range'(주어진 시각부터 endDate까지, 최대 31일) 또는 "
+                       u"'next'(주어진 시각 이후 31일 안의 다음 count개)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "endDate",
+        "description": u"'range' 방식의 마지막 날짜(YYYYMMDD)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "count",
+        "description": u"'next' 방식의 유명인별 결과 수, 기본값 10, 최대 100.",
+        "dataType": "integer",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "stream",
+        "description": u"'true'로 지정하면 'range', 'next' 방식의 결과를 "
+                       u"유명인별로 나누어 전송.",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "channelIds",
+        "description": u"채널 ID(여러 개일 경우 ','로 구분), 예: '105,106'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "mainCategory",
+        "description": u"프로그램 대분류, 예: '예능'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    }
+]
+
+
+LIST_PARAMS = [
+    {
+        "name": "date",
+        "description": u"날짜. YYYYMMDD 형식으로 입력",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "range",
+        "description": u"범위. 'day' 또는 'week'로 지정.",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "stream",
+        "description": u"'true'로 지정하면 조회와 동시에 결과를 나누어 전송.",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "limit",
+        "description": u"한 번에 받을 최대 결과 수, 최대 1000. 다음 결과는 "
+                       u"응답의 'next' 값을 'after'로 지정하여 받는다.",
+        "dataType": "integer",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "after",
+        "description": u"이전 응답의 'next' 값",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "fields",
+        "description": u"받을 항목(여러 개일 경우 ','로 구분), 예: "
+                       u"'title,time,channelName'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "channelIds",
+        "description": u"채널 ID(여러 개일 경우 ','로 구분), 예: '105,106'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "mainCategory",
+        "description": u"프로그램 대분류, 예: '예능'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    }
+]
+
+
+CELEBRITIES_PARAMS = [
+    {
+        "name": "topN",
+        "description": u"출연 횟수 기준 결과 수 지정, 최대 100.",
+        "dataType": "integer",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "category",
+        "description": u"프로그램 분류, 예: '예능'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "period",
+        "description": u"방송 월, 예: '201410'",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    }
+]
+
+
+NOW_PARAMS = [
+    {
+        "name": "date",
+        "description": u"날짜(YYYYMMDD), 지정하지 않으면 현재 날짜",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    },
+    {
+        "name": "time",
+        "description": u"시간(HHMM), 지정하지 않으면 현재 시각",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    }
+]
+
+
+WATCH_PARAMS = [
+    {
+        "name": "celebs",
+        "description": u"지켜볼 연예인 이름, '|'로 구분(최대 100명)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    }
+]
+
+
+BATCH_PARAMS = [
+    {
+        "name": "body",
+        "description": u"검색 목록(최대 100개), 예: "
+                       u"{\"searches\": [{\"date\": \"20141020\", "
+                       u"\"time\": \"2000\", \"celebs\": \"유재석|유희열\"}]}",
+        "dataType": "string",
+        "paramType": "body",
+        "required": True
+    }
+]
+
+
+SUGGEST_PARAMS = [
+    {
+        "name": "q",
+        "description": u"유명인 이름의 앞부분, 초성도 가능(예: '유재', 'ㅇㅈㅅ').",
+        "dataType": "string",
+        "paramType": "query",
+        "required": True
+    },
+    {
+        "name": "limit",
+        "description": u"결과 수 지정, 기본값 10, 최대 20.",
+        "dataType": "integer",
+        "paramType": "query",
+        "required": False
+    }
+]
+
+
+def _pickParams(params, names, replacements=()):
+    """
+    Pick parameters of given names, replacing some descriptions.
+    """
+
+    replacements = {p["name"]: p for p in replacements}
+
+    return [replacements.get(p["name"], p) for p in params
+            if p["name"] in names]
+
+
+# Subsets served by asyncapiserver.py, which has no range, next, streaming,
+# paging or leaderboard filters
+ASYNC_SEARCH_PARAMS = _pickParams(
+    SEARCH_PARAMS,
+    ["date", "time", "celebs", "mode", "channelIds", "mainCategory"],
+    [{
+        "name": "mode",
+        "description": u"검색 방식. 'window'(기본값, 30분 전부터 "
+                       u"1시간 후까지 시작하는 프로그램) 또는 "
+                       u"'onair'(주어진 시각에 방송 중인 프로그램)",
+        "dataType": "string",
+        "paramType": "query",
+        "required": False
+    }]
+)
+
+
+ASYNC_LIST_PARAMS = _pickParams(
+    LIST_PARAMS, ["date", "range", "channelIds", "mainCategory"])
+
+
+ASYNC_CELEBRITIES_PARAMS = _pickParams(CELEBRITIES_PARAMS, ["topN"])
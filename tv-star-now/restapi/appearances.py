@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+import datetime
+import pymongo
+from .datagen import METADATA_COLL
+from .queries import SCHEDULE_FIELDS
+
+
+# Collection holding one {"_id": celebrity name, "entries": [...]} document
+# per celebrity with upcoming appearances.
+APPEARANCES_COLL = "appearances"
+
+# Schedule item fields kept in appearance entries, the same as searches
+# return plus dateTime for range filtering
+APPEARANCE_FIELDS = ["dateTime"] + SCHEDULE_FIELDS
+
+
+def materializeAppearances(db, fromDateTime=None):
+    """
+    Write the schedule items each celebrity participates in from given
+    dateTime, now by default, as a dateTime-sorted array per celebrity.
+
+    The collection is built aside and swapped in with a rename, so readers
+    see either the old or the new appearances.
+    """
+
+    if fromDateTime is None:
+        fromDateTime = datetime.datetime.now().replace(second=0,
+                                                       microsecond=0)
+
+    query = {
+        "dateTime": {"$gte": fromDateTime},
+        "participants": {"$exists": True, "$ne": []}
+    }
+    projection = dict.fromkeys(APPEARANCE_FIELDS, True)
+    projection["_id"] = False
+    celebEntries = collections.defaultdict(list)
+    scheduleItems = db["schedule"].find(query, projection).sort(
+        "dateTime", pymongo.ASCENDING)
+
+    for scheduleItem in scheduleItems:
+        for celeb in scheduleItem["participants"]:
+            celebEntries[celeb].append(scheduleItem)
+
+    newColl = db[APPEARANCES_COLL + "_new"]
+    newColl.drop()
+
+    if celebEntries:
+        newColl.insert([{"_id": celeb, "entries": entries}
+                        for celeb, entries in celebEntries.items()])
+        newColl.rename(APPEARANCES_COLL, dropTarget=True)
+    else:
+        db[APPEARANCES_COLL].drop()
+
+    # Let API servers know the appearances changed. The generation is bumped
+    # in the same update so the metadata document always has one.
+    db[METADATA_COLL].update({"_id": APPEARANCES_COLL},
+                             {"$set": {"fromDateTime": fromDateTime},
+                              "$inc": {"generation": 1}},
+                             upsert=True)
+
+
+def getAppearancesFromDateTime(db):
+    """
+    Get the dateTime appearances are materialized from, or None if they
+    have never been.
+    """
+
+    result = db[METADATA_COLL].find_one({"_id": APPEARANCES_COLL})
+
+    if not result:
+        return None
+
+    return result.get("fromDateTime")
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import pymongo
+from .util import str2dateTime
+from .queries import delDateTimeId
+from .queries import delMongoId
+from .queries import splitCelebs
+from .queries import formatSearchResults
+from .queries import getSearchWindow
+from .queries import getOnAirQuery
+from .queries import getListQuery
+from .queries import addScheduleFilter
+
+
+class AsyncScheduleDB(object):
+
+    """
+    TV information database class for asyncio servers.
+
+    Same queries as ScheduleDB on a non-blocking MongoDB client such as
+    motor's AsyncIOMotorClient.
+    """
+
+    def __init__(self, mongoClient, db="tv-star-now",
+                 episodeColl="episodes", scheduleColl="schedule",
+                 programsColl="programs", celebritiesColl="celebrities"):
+        """
+        Initialize members.
+        """
+
+        self._episodeColl = mongoClient[db][episodeColl]
+        self._scheduleColl = mongoClient[db][scheduleColl]
+        self._programsColl = mongoClient[db][programsColl]
+        self._celebritiesColl = mongoClient[db][celebritiesColl]
+
+    async def searchSchedule(self, dateStr, timeStr, celebs, channelIds=None,
+                             mainCategory=None):
+        """
+        Search TV schedule with given parameters.
+        """
+
+        curDateTime = str2dateTime(dateStr, timeStr)
+        lowerDateTime, upperDateTime = getSearchWindow(curDateTime)
+        query = {
+            "dateTime": {"$gte": lowerDateTime, "$lte": upperDateTime}
+        }
+        addScheduleFilter(query, channelIds, mainCategory)
+
+        return await self._searchCelebs(query, splitCelebs(celebs))
+
+    async def searchScheduleOnAir(self, dateStr, timeStr, celebs,
+                                  channelIds=None, mainCategory=None):
+        """
+        Search TV schedule on air at given date and time.
+        """
+
+        curDateTime = str2dateTime(dateStr, timeStr)
+        query = getOnAirQuery(curDateTime)
+        addScheduleFilter(query, channelIds, mainCategory)
+
+        return await self._searchCelebs(query, splitCelebs(celebs))
+
+    async def _searchCelebs(self, query, celebNames):
+        """
+        Find schedule items with given query and look up celebrities in them
+        concurrently.
+        """
+
+        scheduleItems = await self._scheduleColl.find(query).to_list(None)
+        scheduleItems = list(delDateTimeId(scheduleItems))
+        celebItemsList = await asyncio.gather(
+            *[self._searchCeleb(scheduleItems, c) for c in celebNames])
+        celebItems = dict(zip(celebNames, celebItemsList))
+
+        return formatSearchResults(celebNames, celebItems)
+
+    async def _searchCeleb(self, scheduleItems, celeb):
+        """
+        Find schedule items the celebrity appears in.
+        """
+
+        episodeKeys = {(s.get("programId"), s.get("episodeNum"))
+                       for s in scheduleItems if s.get("episodeNum")}
+        programIds = {s.get("programId") for s in scheduleItems
+                      if not s.get("episodeNum")}
+        guestEpisodeKeys, castProgramIds = await asyncio.gather(
+            self._searchEpisodes(episodeKeys, celeb),
+            self._searchPrograms(programIds, celeb))
+        celebItems = []
+
+        for scheduleItem in scheduleItems:
+            programId = scheduleItem.get("programId")
+            episodeNum = scheduleItem.get("episodeNum")
+
+            if episodeNum:
+                if (programId, episodeNum) in guestEpisodeKeys:
+                    celebItems.append(scheduleItem)
+            elif programId in castProgramIds:
+                celebItems.append(scheduleItem)
+
+        return celebItems
+
+    async def _searchEpisodes(self, episodeKeys, celeb):
+        """
+        Find (programId, episodeNum) pairs of given episodes the celebrity
+        guests in.
+        """
+
+        if not episodeKeys:
+            return set()
+
+        query = {
+            "programId": {"$in": list({k[0] for k in episodeKeys})},
+            "episodeNum": {"$in": list({k[1] for k in episodeKeys})},
+            "guests": celeb
+        }
+        projection = {"programId": True, "episodeNum": True}
+        episodeItems = await self._episodeColl.find(query,
+                                                    projection).to_list(None)
+
+        return {(e["programId"], e["episodeNum"]) for e in episodeItems}
+
+    async def _searchPrograms(self, programIds, celeb):
+        """
+        Find IDs of given programs the celebrity is cast in.
+        """
+
+        if not programIds:
+            return set()
+
+        query = {
+            "programId": {"$in": list(programIds)},
+            "cast": celeb
+        }
+        projection = {"programId": True}
+        programItems = await self._programsColl.find(query,
+                                                     projection).to_list(None)
+
+        return {p["programId"] for p in programItems}
+
+    async def listSchedule(self, dateStr, dateRange, channelIds=None,
+                           mainCategory=None):
+        """
+        Return TV schedule for given date.
+        """
+
+        query = getListQuery(dateStr, dateRange, channelIds, mainCategory)
+        scheduleItems = await self._scheduleColl.find(query).to_list(None)
+
+        return list(delDateTimeId(scheduleItems))
+
+    async def listCelebrities(self, topN):
+        """
+        Return celebrity items.
+        """
+
+        celebItems = self._celebritiesColl.find().sort("appearCount",
+                                                       pymongo.DESCENDING)
+        celebItems = await celebItems.limit(topN).to_list(None)
+
+        return list(delMongoId(celebItems))
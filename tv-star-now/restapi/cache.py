@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+
+import time
+import threading
+import collections
+
+
+class LRUCache(object):
+
+    """
+    Thread-safe LRU cache class with optional time-to-live.
+    """
+
+    def __init__(self, maxSize=128, ttl=0):
+        """
+        Initialize members. Entries never expire if ttl is 0.
+        """
+
+        self._maxSize = maxSize
+        self._ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """
+        Get cached value of given key, or None if missing or expired.
+        """
+
+        with self._lock:
+            item = self._items.get(key)
+
+            if item is None:
+                self._misses += 1
+                return None
+
+            value, expireTime = item
+
+            if expireTime and expireTime < time.time():
+                del self._items[key]
+                self._misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self._hits += 1
+
+            return value
+
+    def put(self, key, value):
+        """
+        Cache value of given key, evicting the least recently used one.
+        """
+
+        if self._maxSize <= 0:
+            return
+
+        expireTime = time.time() + self._ttl if self._ttl else 0
+
+        with self._lock:
+            self._items[key] = (value, expireTime)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self._maxSize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+
+        with self._lock:
+            self._items.clear()
+
+    def getStats(self):
+        """
+        Return cache statistics.
+        """
+
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxSize": self._maxSize,
+                "ttl": self._ttl,
+                "hits": self._hits,
+                "misses": self._misses
+            }
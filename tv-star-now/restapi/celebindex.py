@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+
+import sys
+import threading
+import pymongo
+
+
+class CelebrityIndex(object):
+
+    """
+    In-memory inverted index from celebrity name to the episodes the
+    celebrity guests in and the programs the celebrity is cast in.
+
+    Names are interned and every (programId, episodeNum) pair is mapped to a
+    small integer so each posting set only holds integers. The owner rebuilds
+    the index when episodes or programs change and may refresh it on a timer
+    in between.
+    """
+
+    def __init__(self, episodeColl, programsColl):
+        """
+        Initialize members and build the index.
+        """
+
+        self._episodeColl = episodeColl
+        self._programsColl = programsColl
+        self._lock = threading.Lock()
+        self._timer = None
+        self.rebuild()
+
+    def setColls(self, episodeColl, programsColl):
+        """
+        Set collections to build the index from.
+        """
+
+        self._episodeColl = episodeColl
+        self._programsColl = programsColl
+
+    def rebuild(self):
+        """
+        Build the whole index from scratch and swap it in.
+        """
+
+        episodeKeyIds = {}
+        episodeKeys = []
+        celebEpisodes = {}
+        celebPrograms = {}
+
+        episodeItems = self._findEpisodes(None)
+        lastEpisodeId = self._addEpisodes(episodeItems, episodeKeyIds,
+                                          episodeKeys, celebEpisodes)
+        programItems = self._findPrograms(None)
+        lastProgramId = self._addPrograms(programItems, celebPrograms)
+
+        with self._lock:
+            self._episodeKeyIds = episodeKeyIds
+            self._episodeKeys = episodeKeys
+            self._celebEpisodes = celebEpisodes
+            self._celebPrograms = celebPrograms
+            self._lastEpisodeId = lastEpisodeId
+            self._lastProgramId = lastProgramId
+
+    def refresh(self):
+        """
+        Add episodes and programs inserted since the last build or refresh.
+
+        Documents modified in place keep their _id and are only picked up by
+        rebuild().
+        """
+
+        # Read new documents before taking the lock requests wait on
+        episodeItems = list(self._findEpisodes(self._lastEpisodeId))
+        programItems = list(self._findPrograms(self._lastProgramId))
+
+        with self._lock:
+            lastEpisodeId = self._addEpisodes(episodeItems,
+                                              self._episodeKeyIds,
+                                              self._episodeKeys,
+                                              self._celebEpisodes)
+            lastProgramId = self._addPrograms(programItems,
+                                              self._celebPrograms)
+
+            if lastEpisodeId is not None:
+                self._lastEpisodeId = lastEpisodeId
+
+            if lastProgramId is not None:
+                self._lastProgramId = lastProgramId
+
+    def startAutoRefresh(self, interval):
+        """
+        Refresh the index every interval seconds in a background thread.
+        """
+
+        def refreshAndRearm():
+            try:
+                self.refresh()
+            finally:
+                self.startAutoRefresh(interval)
+
+        self._timer = threading.Timer(interval, refreshAndRearm)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stopAutoRefresh(self):
+        """
+        Stop refreshing the index in background.
+        """
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def hasEpisodeGuest(self, celeb, programId, episodeNum):
+        """
+        Check if given celebrity guests in given episode.
+        """
+
+        episodeKeyId = self._episodeKeyIds.get((programId, episodeNum))
+
+        if episodeKeyId is None:
+            return False
+
+        return episodeKeyId in self._celebEpisodes.get(celeb, ())
+
+    def hasProgramCast(self, celeb, programId):
+        """
+        Check if given celebrity is cast in given program.
+        """
+
+        return programId in self._celebPrograms.get(celeb, ())
+
+    def getEpisodeKeys(self, celeb):
+        """
+        Return (programId, episodeNum) pairs the celebrity guests in.
+        """
+
+        # refresh() adds to the sets in place
+        with self._lock:
+            episodeKeys = self._episodeKeys
+
+            return [episodeKeys[i]
+                    for i in self._celebEpisodes.get(celeb, ())]
+
+    def getProgramIds(self, celeb):
+        """
+        Return IDs of the programs the celebrity is cast in.
+        """
+
+        with self._lock:
+            return list(self._celebPrograms.get(celeb, ()))
+
+    def getStats(self):
+        """
+        Return index statistics including its approximate size in bytes.
+        """
+
+        with self._lock:
+            numBytes = sys.getsizeof(self._episodeKeyIds) + \
+                sys.getsizeof(self._episodeKeys) + \
+                sys.getsizeof(self._celebEpisodes) + \
+                sys.getsizeof(self._celebPrograms)
+            numBytes += sum(sys.getsizeof(k) for k in self._episodeKeys)
+
+            celebs = set(self._celebEpisodes) | set(self._celebPrograms)
+            numBytes += sum(sys.getsizeof(c) for c in celebs)
+            numBytes += sum(sys.getsizeof(s)
+                            for s in self._celebEpisodes.values())
+            numBytes += sum(sys.getsizeof(s)
+                            for s in self._celebPrograms.values())
+
+            stats = {
+                "celebrities": len(celebs),
+                "episodes": len(self._episodeKeys),
+                "programs": len({p for s in self._celebPrograms.values()
+                                 for p in s}),
+                "bytes": numBytes
+            }
+
+        return stats
+
+    def _findEpisodes(self, lastId):
+        """
+        Find episodes inserted after given _id.
+        """
+
+        query = {"_id": {"$gt": lastId}} if lastId else {}
+        projection = {"programId": True, "episodeNum": True, "guests": True}
+
+        return self._episodeColl.find(query, projection).sort(
+            "_id", pymongo.ASCENDING)
+
+    def _findPrograms(self, lastId):
+        """
+        Find programs inserted after given _id.
+        """
+
+        query = {"_id": {"$gt": lastId}} if lastId else {}
+        projection = {"programId": True, "cast": True}
+
+        return self._programsColl.find(query, projection).sort(
+            "_id", pymongo.ASCENDING)
+
+    def _addEpisodes(self, episodeItems, episodeKeyIds, episodeKeys,
+                     celebEpisodes):
+        """
+        Add episode guests to the index and return the last _id seen.
+        """
+
+        lastId = None
+
+        for episodeItem in episodeItems:
+            lastId = episodeItem["_id"]
+            episodeKey = (episodeItem["programId"],
+                          sys.intern(episodeItem["episodeNum"]))
+            episodeKeyId = episodeKeyIds.get(episodeKey)
+
+            if episodeKeyId is None:
+                episodeKeyId = len(episodeKeys)
+                episodeKeyIds[episodeKey] = episodeKeyId
+                episodeKeys.append(episodeKey)
+
+            for celeb in episodeItem["guests"]:
+                celeb = sys.intern(celeb)
+                celebEpisodes.setdefault(celeb, set()).add(episodeKeyId)
+
+        return lastId
+
+    def _addPrograms(self, programItems, celebPrograms):
+        """
+        Add program cast to the index and return the last _id seen.
+        """
+
+        lastId = None
+
+        for programItem in programItems:
+            lastId = programItem["_id"]
+
+            for celeb in programItem["cast"]:
+                celeb = sys.intern(celeb)
+                celebPrograms.setdefault(celeb, set()).add(
+                    programItem["programId"])
+
+        return lastId
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+
+import re
+import sys
+
+
+# Initial consonants in the order of Hangul syllable composition
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+_CHOSUNG_SET = frozenset(CHOSUNG)
+_HANGUL_FIRST = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+# Number of syllables sharing an initial consonant (21 vowels x 28 finals)
+_SYLLABLES_PER_CHOSUNG = 588
+
+# Number of suggestions kept at each trie node
+SUGGEST_TOP_K = 20
+
+
+def getChosung(text):
+    """
+    Replace Hangul syllables of text with their initial consonants.
+    """
+
+    chars = []
+
+    for c in text:
+        code = ord(c)
+
+        if _HANGUL_FIRST <= code <= _HANGUL_LAST:
+            c = CHOSUNG[(code - _HANGUL_FIRST) // _SYLLABLES_PER_CHOSUNG]
+
+        chars.append(c)
+
+    return "".join(chars)
+
+
+def normalizeName(name):
+    """
+    Normalize a celebrity name or query for matching.
+    """
+
+    return "".join(name.split()).lower()
+
+
+def matchesQuery(key, query):
+    """
+    Check if normalized name starts with query whose initial consonants
+    match any syllable beginning with them.
+    """
+
+    if len(key) < len(query):
+        return False
+
+    for k, q in zip(key, query):
+        if k != q and not (q in _CHOSUNG_SET and getChosung(k) == q):
+            return False
+
+    return True
+
+
+def getSuggestQuery(query):
+    """
+    Make a MongoDB query of celebrities whose names match query as
+    matchesQuery does, for serving without the index.
+    """
+
+    parts = ["^"]
+
+    for c in normalizeName(query):
+        if c in _CHOSUNG_SET:
+            first = _HANGUL_FIRST + CHOSUNG.index(c) * _SYLLABLES_PER_CHOSUNG
+            parts.append("[{}{}-{}]".format(
+                c, chr(first), chr(first + _SYLLABLES_PER_CHOSUNG - 1)))
+        else:
+            parts.append(re.escape(c))
+
+        parts.append(r"\s*")
+
+    return {"name": {"$regex": "".join(parts[:-1]), "$options": "i"}}
+
+
+class _TrieNode(object):
+
+    """
+    Trie node holding the best suggestions below it.
+    """
+
+    __slots__ = ("children", "top", "names")
+
+    def __init__(self):
+        """
+        Initialize members.
+        """
+
+        self.children = {}
+        self.top = []
+        self.names = []
+
+
+class CelebritySuggestIndex(object):
+
+    """
+    In-memory celebrity name suggestion index class.
+
+    Names are kept in a trie of their characters and a trie of their initial
+    consonants, and every node keeps its top names by appearCount so prefix
+    queries only walk the query. The tries are built from scratch and
+    swapped in whole, so readers never take a lock.
+    """
+
+    def __init__(self, celebritiesColl, topK=SUGGEST_TOP_K):
+        """
+        Initialize members and build the index.
+        """
+
+        self._celebritiesColl = celebritiesColl
+        self._topK = topK
+        self._state = (_TrieNode(), _TrieNode(), {})
+        self.rebuild()
+
+    def setColl(self, celebritiesColl):
+        """
+        Set collection to build the index from.
+        """
+
+        self._celebritiesColl = celebritiesColl
+
+    def rebuild(self):
+        """
+        Build the whole index from scratch and swap it in.
+        """
+
+        projection = {"_id": False, "name": True, "appearCount": True}
+        celebItems = []
+
+        for celebItem in self._celebritiesColl.find({}, projection):
+            name = celebItem.get("name")
+
+            if name:
+                celebItems.append((celebItem.get("appearCount", 0),
+                                   sys.intern(name)))
+
+        # Most frequent first, so a name only joins the top lists not full yet
+        celebItems.sort(key=lambda c: (-c[0], c[1]))
+        nameTrie = _TrieNode()
+        chosungTrie = _TrieNode()
+        counts = {}
+
+        for count, name in celebItems:
+            if name in counts:
+                continue
+
+            counts[name] = count
+            key = normalizeName(name)
+            self._add(nameTrie, key, name)
+            self._add(chosungTrie, getChosung(key), name)
+
+        self._state = (nameTrie, chosungTrie, counts)
+
+    def suggest(self, query, limit):
+        """
+        Return up to limit celebrities whose names start with query, most
+        frequent first. Initial consonants in query match any syllable
+        beginning with them, e.g. "ㅇㅈ" or "유ㅈ" matches "유재석".
+        """
+
+        query = normalizeName(query)
+
+        if not query:
+            return []
+
+        nameTrie, chosungTrie, counts = self._state
+        hasChosung = any(c in _CHOSUNG_SET for c in query)
+        isChosungOnly = all(c in _CHOSUNG_SET for c in query)
+
+        if not hasChosung:
+            names = self._findTop(nameTrie, query)
+        elif isChosungOnly:
+            names = self._findTop(chosungTrie, query)
+        else:
+            names = self._findMixed(chosungTrie, counts, query, limit)
+
+        return [{"name": n, "appearCount": counts[n]} for n in names[:limit]]
+
+    def getStats(self):
+        """
+        Return index statistics.
+        """
+
+        return {
+            "celebrities": len(self._state[2]),
+            "topK": self._topK
+        }
+
+    def _add(self, root, key, name):
+        """
+        Put name along the path of key and add it to the top names of the
+        nodes on the path not full yet.
+        """
+
+        node = root
+
+        if len(node.top) < self._topK:
+            node.top.append(name)
+
+        for c in key:
+            child = node.children.get(c)
+
+            if child is None:
+                child = _TrieNode()
+                node.children[c] = child
+
+            node = child
+
+            if len(node.top) < self._topK:
+                node.top.append(name)
+
+        node.names.append(name)
+
+    def _findNode(self, root, key):
+        """
+        Find the node of given key.
+        """
+
+        node = root
+
+        for c in key:
+            node = node.children.get(c)
+
+            if node is None:
+                return None
+
+        return node
+
+    def _findTop(self, root, key):
+        """
+        Return the top names below the node of given key.
+        """
+
+        node = self._findNode(root, key)
+
+        return list(node.top) if node else []
+
+    def _findMixed(self, chosungTrie, counts, query, limit):
+        """
+        Return the top names matching a query mixing syllables and initial
+        consonants, checking the names below its initial consonant node.
+        """
+
+        node = self._findNode(chosungTrie, getChosung(query))
+
+        if node is None:
+            return []
+
+        # The node's top names usually suffice; walk the subtree otherwise
+        names = [n for n in node.top if matchesQuery(normalizeName(n), query)]
+
+        if len(names) >= limit or len(node.top) < self._topK:
+            return names
+
+        names = []
+        stack = [node]
+
+        while stack:
+            node = stack.pop()
+            names.extend(n for n in node.names
+                         if matchesQuery(normalizeName(n), query))
+            stack.extend(node.children.values())
+
+        names.sort(key=lambda n: (-counts[n], n))
+
+        return names
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+
+import threading
+
+
+# Collection holding one {"_id": collection name, "generation": n} document
+# per data collection.
+METADATA_COLL = "metadata"
+
+
+def bumpGeneration(db, collName):
+    """
+    Increase the data generation of given collection after writing to it.
+    """
+
+    db[METADATA_COLL].update({"_id": collName},
+                             {"$inc": {"generation": 1}},
+                             upsert=True)
+
+
+def getGeneration(db, collName):
+    """
+    Get the data generation of given collection.
+    """
+
+    result = db[METADATA_COLL].find_one({"_id": collName})
+
+    if not result:
+        return 0
+
+    return result["generation"]
+
+
+class GenerationWatcher(object):
+
+    """
+    Data generation watcher class.
+
+    Polls the metadata collection and calls listeners of the collections
+    whose generation changed since the last poll. A changed generation is
+    seen by get() once the listeners of its collection have returned.
+    """
+
+    def __init__(self, metadataColl):
+        """
+        Initialize members.
+        """
+
+        self._metadataColl = metadataColl
+        self._generations = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self.poll()
+
+    def setColl(self, metadataColl):
+        """
+        Set metadata collection to poll.
+        """
+
+        self._metadataColl = metadataColl
+
+    def get(self, collName):
+        """
+        Get the last seen data generation of given collection.
+        """
+
+        return self._generations.get(collName, 0)
+
+    def addListener(self, collName, listener):
+        """
+        Call listener with no argument when given collection changes.
+        """
+
+        self._listeners.setdefault(collName, []).append(listener)
+
+    def poll(self):
+        """
+        Read generations and notify listeners of changed collections.
+        """
+
+        with self._lock:
+            generations = {}
+
+            for result in self._metadataColl.find():
+                generations[result["_id"]] = result["generation"]
+
+            changedCollNames = [n for n in generations
+                                if generations[n] != self.get(n)]
+
+            # Publish a generation only after its listeners rebuilt the data,
+            # so requests never key new generations to old data
+            for collName in changedCollNames:
+                for listener in self._listeners.get(collName, []):
+                    listener()
+
+                self._generations = dict(self._generations)
+                self._generations[collName] = generations[collName]
+
+            self._generations = generations
+
+    def start(self, interval):
+        """
+        Poll every interval seconds in a background thread.
+        """
+
+        def pollAndRearm():
+            try:
+                self.poll()
+            finally:
+                self.start(interval)
+
+        self._timer = threading.Timer(interval, pollAndRearm)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self):
+        """
+        Stop polling.
+        """
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+
+import json
+import hashlib
+from flask import request
+from flask import Response
+
+
+def makeETag(endpoint, generations, args):
+    """
+    Make a strong ETag from the endpoint, data generations of the collections
+    it reads and request arguments.
+    """
+
+    key = json.dumps([endpoint, sorted(generations.items()),
+                      sorted(args.items(multi=True))])
+
+    return '"{}"'.format(hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+
+def makeRequestETag(endpoint, generations):
+    """
+    Make the ETag of the current request.
+    """
+
+    return makeETag(endpoint, generations, request.args)
+
+
+def isNotModified(etag):
+    """
+    Check if the current request's If-None-Match header matches the ETag.
+    """
+
+    ifNoneMatch = request.headers.get("If-None-Match")
+
+    if not ifNoneMatch:
+        return False
+
+    tags = [t.strip() for t in ifNoneMatch.split(",")]
+
+    # If-None-Match uses the weak comparison
+    return "*" in tags or etag in tags or "W/" + etag in tags
+
+
+def notModifiedResponse(etag):
+    """
+    Make a 304 response with no body.
+    """
+
+    return Response(status=304,
+                    headers={"ETag": etag,
+                             "Access-Control-Allow-Origin": "*"})
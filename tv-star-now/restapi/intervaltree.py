@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+
+import operator
+
+
+_getStart = operator.itemgetter(0)
+_getEnd = operator.itemgetter(1)
+
+
+class _Node(object):
+
+    """
+    Interval tree node holding the intervals that contain its center.
+    """
+
+    __slots__ = ("center", "byStart", "byEnd", "left", "right")
+
+    def __init__(self, center, intervals, left, right):
+        """
+        Initialize members.
+        """
+
+        self.center = center
+        self.byStart = sorted(intervals, key=_getStart)
+        self.byEnd = sorted(intervals, key=_getEnd, reverse=True)
+        self.left = left
+        self.right = right
+
+
+class IntervalTree(object):
+
+    """
+    Static centered interval tree class.
+
+    Intervals are (start, end, value) tuples covering [start, end). A point
+    query visits O(log n) nodes and returns the k matching values.
+    """
+
+    def __init__(self, intervals):
+        """
+        Build the tree. Empty intervals are ignored.
+        """
+
+        intervals = [i for i in intervals if i[0] < i[1]]
+        self._root = self._build(intervals)
+        self._size = len(intervals)
+
+    def __len__(self):
+        """
+        Return the number of intervals.
+        """
+
+        return self._size
+
+    def _build(self, intervals):
+        """
+        Build a subtree of given intervals.
+        """
+
+        if not intervals:
+            return None
+
+        # The median start is contained by at least one interval, so every
+        # level takes at least one interval out.
+        starts = sorted(i[0] for i in intervals)
+        center = starts[len(starts)//2]
+        leftIntervals = []
+        rightIntervals = []
+        centerIntervals = []
+
+        for interval in intervals:
+            if interval[1] <= center:
+                leftIntervals.append(interval)
+            elif interval[0] > center:
+                rightIntervals.append(interval)
+            else:
+                centerIntervals.append(interval)
+
+        return _Node(center, centerIntervals, self._build(leftIntervals),
+                     self._build(rightIntervals))
+
+    def findPoint(self, point):
+        """
+        Find values of the intervals containing given point.
+        """
+
+        found = []
+        node = self._root
+
+        while node:
+            if point < node.center:
+                for start, end, value in node.byStart:
+                    if start > point:
+                        break
+                    found.append(value)
+                node = node.left
+            else:
+                for start, end, value in node.byEnd:
+                    if end <= point:
+                        break
+                    found.append(value)
+                node = node.right
+
+        return found
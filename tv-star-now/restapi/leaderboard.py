@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+
+
+# Collection of appearance count increments written at ingest time
+CELEBRITY_DELTAS_COLL = "celebrityDeltas"
+
+# Number of celebrities kept on each leaderboard
+LEADERBOARD_SIZE = 100
+
+
+def getEpisodePeriod(episodeDate):
+    """
+    Get the month period, e.g. "201410", of an episode date like "20141020".
+    Returns "" if the date is unknown.
+    """
+
+    if not episodeDate or len(episodeDate) != 8 or not episodeDate.isdigit():
+        return ""
+
+    return episodeDate[:6]
+
+
+def makeCelebrityDeltas(celebCounts, category):
+    """
+    Make delta documents from a Counter of (name, period) appearance counts.
+    """
+
+    return [{"name": name, "category": category or "", "period": period,
+             "count": count}
+            for (name, period), count in celebCounts.items()]
+
+
+def insertCelebrityDeltas(deltasColl, deltas):
+    """
+    Write delta documents for API servers to apply.
+    """
+
+    if deltas:
+        deltasColl.insert(deltas)
+
+
+def compactCelebrityDeltas(db):
+    """
+    Replace the deltas with one document per name, category and period
+    summing them. Run before writing new deltas, so API servers have
+    applied the compacted ones.
+
+    Compacted documents take their key as _id, which MongoDB orders before
+    every ObjectId, so servers adding deltas inserted after the last
+    ObjectId they applied do not read them again. The collection is built
+    aside and swapped in with a rename, so readers see either the old or
+    the compacted deltas with the same sums.
+    """
+
+    pipeline = [{
+        "$group": {
+            "_id": {"name": "$name", "category": "$category",
+                    "period": "$period"},
+            "count": {"$sum": "$count"}
+        }
+    }]
+    deltas = [dict(d["_id"], _id=d["_id"], count=d["count"])
+              for d in db[CELEBRITY_DELTAS_COLL].aggregate(pipeline)]
+    newColl = db[CELEBRITY_DELTAS_COLL + "_new"]
+    newColl.drop()
+
+    if deltas:
+        newColl.insert(deltas)
+        newColl.rename(CELEBRITY_DELTAS_COLL, dropTarget=True)
+    else:
+        db[CELEBRITY_DELTAS_COLL].drop()
+
+
+class _Board(object):
+
+    """
+    Appearance counts of celebrities and the names ranked highest.
+    """
+
+    def __init__(self, board=None):
+        """
+        Initialize members, copying given board.
+        """
+
+        self.counts = collections.Counter(board.counts if board else ())
+        self.top = board.top if board else ()
+
+
+class CelebrityLeaderboard(object):
+
+    """
+    In-memory celebrity leaderboard class.
+
+    Counts are summed from delta documents per (category, period), where ""
+    stands for all categories or periods, and the top names of each board
+    are kept sorted so listing is a slice. Only deltas inserted after the
+    last one applied are added on refresh, to copies of the boards they
+    change. The boards are summed from scratch when the deltas no longer add
+    up to the appearance counts, e.g. after they were dropped.
+    """
+
+    def __init__(self, deltasColl, celebritiesColl, size=LEADERBOARD_SIZE):
+        """
+        Initialize members and build the leaderboards.
+        """
+
+        self._deltasColl = deltasColl
+        self._celebritiesColl = celebritiesColl
+        self._size = size
+        self._boards = {}
+        self._lastDeltaId = None
+        self._isComplete = False
+        self.rebuild()
+
+    def setColls(self, deltasColl, celebritiesColl):
+        """
+        Set collections to read deltas and appearance counts from.
+        """
+
+        self._deltasColl = deltasColl
+        self._celebritiesColl = celebritiesColl
+
+    def rebuild(self):
+        """
+        Sum all deltas into new leaderboards and swap them in.
+        """
+
+        boards = {}
+        lastDeltaId = self._addDeltas(boards, self._findDeltas(None))
+
+        self._boards = boards
+        self._lastDeltaId = lastDeltaId
+        self._isComplete = self._checkComplete(boards)
+
+    def refresh(self):
+        """
+        Add deltas inserted since the last build or refresh, rebuilding if
+        the counts do not add up.
+        """
+
+        # Only compacted deltas were seen, which are all summed anyway
+        if self._lastDeltaId is None:
+            self.rebuild()
+            return
+
+        boards = dict(self._boards)
+        lastDeltaId = self._addDeltas(boards,
+                                      self._findDeltas(self._lastDeltaId))
+
+        # Deltas dropped, or compacted before this server applied them
+        if not self._checkComplete(boards):
+            self.rebuild()
+            return
+
+        self._boards = boards
+        self._isComplete = True
+
+        if lastDeltaId is not None:
+            self._lastDeltaId = lastDeltaId
+
+    def getTop(self, topN, category="", period=""):
+        """
+        Return the topN celebrities of given category and period.
+        """
+
+        board = self._boards.get((category or "", period or ""))
+
+        if board is None:
+            return []
+
+        counts = board.counts
+
+        return [{"name": n, "appearCount": counts[n]}
+                for n in board.top[:topN]]
+
+    def isComplete(self):
+        """
+        Check if the deltas add up to the appearance counts of all
+        celebrities.
+        """
+
+        return self._isComplete
+
+    def getStats(self):
+        """
+        Return leaderboard statistics.
+        """
+
+        return {
+            "boards": len(self._boards),
+            "celebrities": len(self._boards.get(("", ""), _Board()).counts),
+            "complete": self._isComplete
+        }
+
+    def _findDeltas(self, lastId):
+        """
+        Find deltas inserted after given _id, all if None.
+        """
+
+        query = {"_id": {"$gt": lastId}} if lastId is not None else {}
+
+        return self._deltasColl.find(query)
+
+    def _addDeltas(self, boards, deltas):
+        """
+        Add deltas to copies of the boards they change and return the
+        greatest _id of the deltas not compacted.
+        """
+
+        changedNames = {}
+        lastId = None
+
+        for delta in deltas:
+            if not isinstance(delta["_id"], dict) and \
+                    (lastId is None or delta["_id"] > lastId):
+                lastId = delta["_id"]
+
+            name = delta["name"]
+            category = delta.get("category", "")
+            period = delta.get("period", "")
+
+            for key in {("", ""), (category, ""), ("", period),
+                        (category, period)}:
+                if key not in changedNames:
+                    boards[key] = _Board(boards.get(key))
+                    changedNames[key] = set()
+
+                boards[key].counts[name] += delta["count"]
+                changedNames[key].add(name)
+
+        # Counts only grow, so only the changed names can enter the top
+        for key, names in changedNames.items():
+            counts = boards[key].counts
+            boards[key].top = tuple(sorted(set(boards[key].top) | names,
+                                           key=lambda n: (-counts[n], n))
+                                    [:self._size])
+
+        return lastId
+
+    def _checkComplete(self, boards):
+        """
+        Check if the deltas of given boards add up to the appearance counts.
+        """
+
+        # Every appearance count is written with its deltas, so the totals
+        # differ if some celebrities were ingested before deltas were
+        totalCount = sum(c.get("appearCount", 0)
+                         for c in self._celebritiesColl.find(
+                             {}, {"_id": False, "appearCount": True}))
+        deltaCount = sum(boards[("", "")].counts.values()) \
+            if ("", "") in boards else 0
+
+        return bool(boards) and deltaCount == totalCount
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import bisect
+import shutil
+import tempfile
+import threading
+import time
+import ujson
+from flask import g
+from flask import request
+from flask import Response
+from pymongo import monitoring
+
+
+# Histogram upper bounds of request latency in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+# Histogram upper bounds of response size in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Histogram upper bounds of MongoDB commands per request
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Route label of MongoDB commands run outside of requests
+BACKGROUND_ROUTE = "background"
+
+# Seconds between writes of a process's metrics to the shared directory
+SAVE_INTERVAL = 1.0
+
+
+def formatLabels(labels):
+    """
+    Format labels in Prometheus text format.
+    """
+
+    def escape(value):
+        return "{}".format(value).replace("\\", "\\\\").replace(
+            "\"", "\\\"").replace("\n", "\\n")
+
+    return ",".join("{}=\"{}\"".format(k, escape(v)) for k, v in labels)
+
+
+class Histogram(object):
+
+    """
+    Prometheus histogram class.
+    """
+
+    def __init__(self, buckets):
+        """
+        Initialize members.
+        """
+
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0
+        self._count = 0
+
+    def observe(self, value):
+        """
+        Count a value.
+        """
+
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    def render(self, name, labels):
+        """
+        Return lines of the histogram in Prometheus text format.
+        """
+
+        lines = []
+        cumCount = 0
+
+        for bound, count in zip(self._buckets + ("+Inf",), self._counts):
+            cumCount += count
+            lines.append("{}_bucket{{{}}} {}".format(
+                name, formatLabels(labels + (("le", bound),)), cumCount))
+
+        lines.append("{}_sum{{{}}} {}".format(name, formatLabels(labels),
+                                              self._sum))
+        lines.append("{}_count{{{}}} {}".format(name, formatLabels(labels),
+                                                self._count))
+
+        return lines
+
+    def getState(self):
+        """
+        Return the counts as a JSON-serializable list.
+        """
+
+        return [self._counts, self._sum, self._count]
+
+    def merge(self, state):
+        """
+        Add counts returned by getState() of another histogram.
+        """
+
+        counts, total, count = state
+
+        for i, c in enumerate(counts):
+            self._counts[i] += c
+
+        self._sum += total
+        self._count += count
+
+
+# Histogram tables of RequestMetrics and their buckets
+_HISTOGRAM_TABLES = (("latency", LATENCY_BUCKETS), ("sizes", SIZE_BUCKETS),
+                     ("commandCounts", COMMAND_COUNT_BUCKETS),
+                     ("commandDuration", LATENCY_BUCKETS))
+
+
+class _MongoCommandListener(monitoring.CommandListener):
+
+    """
+    pymongo command listener passing finished commands to RequestMetrics.
+    """
+
+    def __init__(self, metrics):
+        """
+        Initialize members.
+        """
+
+        self._metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._metrics.recordCommand(event.command_name,
+                                    event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self._metrics.recordCommand(event.command_name,
+                                    event.duration_micros / 1e6)
+
+
+class RequestMetrics(object):
+
+    """
+    Request and MongoDB command metrics class.
+
+    MongoDB commands are attributed to the route of the request being served
+    by the thread running them. Processes sharing a directory each write
+    their metrics to it when scraped and render the sum of all of them.
+    """
+
+    def __init__(self):
+        """
+        Initialize members.
+        """
+
+        self._shareDir = None
+        self._nextSaveTime = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._latency = {}
+        self._sizes = {}
+        self._responses = {}
+        self._commandCounts = {}
+        self._commandDuration = {}
+
+    def shareAcrossProcesses(self):
+        """
+        Sum metrics of the processes forked afterwards through files in a
+        temporary directory.
+        """
+
+        self._shareDir = tempfile.mkdtemp(prefix="tvstar-metrics-")
+
+    def close(self):
+        """
+        Remove the shared directory.
+        """
+
+        if self._shareDir:
+            shutil.rmtree(self._shareDir, ignore_errors=True)
+            self._shareDir = None
+
+    def listenMongoCommands(self):
+        """
+        Record commands of every MongoClient created afterwards.
+        """
+
+        monitoring.register(_MongoCommandListener(self))
+
+    def beginRequest(self, route):
+        """
+        Start counting MongoDB commands of a request in this thread.
+        """
+
+        self._local.route = route
+        self._local.commandCount = 0
+
+    def recordCommand(self, commandName, seconds):
+        """
+        Record a finished MongoDB command.
+        """
+
+        route = getattr(self._local, "route", None) or BACKGROUND_ROUTE
+
+        if route != BACKGROUND_ROUTE:
+            self._local.commandCount += 1
+
+        with self._lock:
+            key = (route, commandName)
+
+            if key not in self._commandDuration:
+                self._commandDuration[key] = Histogram(LATENCY_BUCKETS)
+
+            self._commandDuration[key].observe(seconds)
+
+    def endRequest(self, method, status, seconds, size):
+        """
+        Record a served request. size is None for streamed responses.
+        """
+
+        route = self._local.route
+        commandCount = self._local.commandCount
+        self._local.route = None
+
+        with self._lock:
+            key = (route, method)
+
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+
+            self._latency[key].observe(seconds)
+
+            if size is not None:
+                if route not in self._sizes:
+                    self._sizes[route] = Histogram(SIZE_BUCKETS)
+
+                self._sizes[route].observe(size)
+
+            key = (route, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+            if route not in self._commandCounts:
+                self._commandCounts[route] = Histogram(COMMAND_COUNT_BUCKETS)
+
+            self._commandCounts[route].observe(commandCount)
+
+        # Keep the file fresh for scrapes served by other processes
+        if self._shareDir and time.monotonic() >= self._nextSaveTime:
+            self._saveState()
+
+    def render(self):
+        """
+        Return all metrics in Prometheus text format, summed over the
+        processes sharing the directory if shared.
+        """
+
+        if not self._shareDir:
+            return self._render()
+
+        # Every process, this one included, is summed from its last file so
+        # the sums never decrease whichever process is scraped
+        self._saveState()
+        merged = RequestMetrics()
+
+        for fileName in os.listdir(self._shareDir):
+            if fileName.endswith(".json"):
+                with open(os.path.join(self._shareDir, fileName)) as f:
+                    merged._mergeState(ujson.load(f))
+
+        return merged._render()
+
+    def _saveState(self):
+        """
+        Write metrics of this process to the shared directory.
+        """
+
+        with self._lock:
+            self._nextSaveTime = time.monotonic() + SAVE_INTERVAL
+            state = {
+                name: [[getStateKey(k), h.getState()]
+                       for k, h in getattr(self, "_" + name).items()]
+                for name, buckets in _HISTOGRAM_TABLES
+            }
+            state["responses"] = [[list(k), c]
+                                  for k, c in self._responses.items()]
+
+        fileName = os.path.join(self._shareDir, "{}.json".format(os.getpid()))
+        tmpFileName = "{}.{}.tmp".format(fileName, threading.get_ident())
+
+        with open(tmpFileName, "w") as f:
+            ujson.dump(state, f)
+
+        os.replace(tmpFileName, fileName)
+
+    def _mergeState(self, state):
+        """
+        Add metrics saved by _saveState().
+        """
+
+        for name, buckets in _HISTOGRAM_TABLES:
+            table = getattr(self, "_" + name)
+
+            for key, histState in state[name]:
+                key = tuple(key) if isinstance(key, list) else key
+
+                if key not in table:
+                    table[key] = Histogram(buckets)
+
+                table[key].merge(histState)
+
+        for key, count in state["responses"]:
+            key = tuple(key)
+            self._responses[key] = self._responses.get(key, 0) + count
+
+    def _render(self):
+        """
+        Return metrics of this instance in Prometheus text format.
+        """
+
+        lines = []
+
+        with self._lock:
+            lines.append("# HELP tvstar_http_request_duration_seconds "
+                         "Request latency.")
+            lines.append("# TYPE tvstar_http_request_duration_seconds "
+                         "histogram")
+
+            for (route, method), hist in sorted(self._latency.items()):
+                lines.extend(hist.render(
+                    "tvstar_http_request_duration_seconds",
+                    (("route", route), ("method", method))))
+
+            lines.append("# HELP tvstar_http_response_size_bytes "
+                         "Response body size.")
+            lines.append("# TYPE tvstar_http_response_size_bytes histogram")
+
+            for route, hist in sorted(self._sizes.items()):
+                lines.extend(hist.render("tvstar_http_response_size_bytes",
+                                         (("route", route),)))
+
+            lines.append("# HELP tvstar_http_responses_total "
+                         "Responses by status code.")
+            lines.append("# TYPE tvstar_http_responses_total counter")
+
+            for (route, method, status), count in \
+                    sorted(self._responses.items()):
+                lines.append("tvstar_http_responses_total{{{}}} {}".format(
+                    formatLabels((("route", route), ("method", method),
+                                  ("status", status))), count))
+
+            lines.append("# HELP tvstar_mongo_commands_per_request "
+                         "MongoDB commands run by a request.")
+            lines.append("# TYPE tvstar_mongo_commands_per_request "
+                         "histogram")
+
+            for route, hist in sorted(self._commandCounts.items()):
+                lines.extend(hist.render(
+                    "tvstar_mongo_commands_per_request", (("route", route),)))
+
+            lines.append("# HELP tvstar_mongo_command_duration_seconds "
+                         "MongoDB command latency.")
+            lines.append("# TYPE tvstar_mongo_command_duration_seconds "
+                         "histogram")
+
+            for (route, commandName), hist in \
+                    sorted(self._commandDuration.items()):
+                lines.extend(hist.render(
+                    "tvstar_mongo_command_duration_seconds",
+                    (("route", route), ("command", commandName))))
+
+        return "\n".join(lines) + "\n"
+
+
+def getStateKey(key):
+    """
+    Get a JSON-serializable metrics table key.
+    """
+
+    return list(key) if isinstance(key, tuple) else key
+
+
+def enableMetrics(app, metrics):
+    """
+    Record requests served by the app and expose metrics on /metrics.
+    """
+
+    @app.before_request
+    def beginRequest():
+        g.metricsStartTime = time.perf_counter()
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.beginRequest(route)
+
+    @app.after_request
+    def endRequest(response):
+        startTime = g.pop("metricsStartTime", None)
+
+        if startTime is not None:
+            metrics.endRequest(request.method, response.status_code,
+                               time.perf_counter() - startTime,
+                               response.calculate_content_length())
+
+        return response
+
+    # Requests that raise skip after_request and are recorded as 500 here
+    @app.teardown_request
+    def endFailedRequest(exc):
+        startTime = g.pop("metricsStartTime", None)
+
+        if exc is not None and startTime is not None:
+            metrics.endRequest(request.method, 500,
+                               time.perf_counter() - startTime, None)
+
+    @app.route("/metrics")
+    def getMetrics():
+        return Response(metrics.render(),
+                        mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import queue
+import threading
+import ujson
+from .util import str2dateTime
+
+
+# Minutes covered by the timer wheel, one slot per minute
+WHEEL_SLOTS = 60
+
+# Minutes before the start of a schedule item its watchers are notified
+DEFAULT_LEAD_MINUTES = 5
+
+# Events kept for a subscriber not reading them; newer ones are dropped
+MAX_PENDING_EVENTS = 100
+
+# Maximum number of celebrities a subscriber watches
+MAX_WATCH_CELEBS = 100
+
+# Seconds between keep-alive comments of an idle event stream
+KEEPALIVE_SECONDS = 15
+
+# Milliseconds clients wait before reconnecting a closed event stream
+RETRY_MILLISECONDS = 10000
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MINUTE = datetime.timedelta(minutes=1)
+
+
+def getMinute(dateTime):
+    """
+    Get the number of minutes since the epoch of given dateTime.
+    """
+
+    return (dateTime - _EPOCH) // _MINUTE
+
+
+def formatEvent(event, data, eventId=None):
+    """
+    Format a server-sent event.
+    """
+
+    lines = ["event: {}".format(event)]
+
+    if eventId:
+        lines.append("id: {}".format(eventId))
+
+    lines.append("data: {}".format(ujson.dumps(data, ensure_ascii=False)))
+
+    return "\n".join(lines) + "\n\n"
+
+
+class TimerWheel(object):
+
+    """
+    Hashed timer wheel with one slot per minute.
+
+    Entries are added to the slot of their minute and popped when the wheel
+    turns to it, so each turn only touches the entries due then.
+    """
+
+    def __init__(self, numSlots=WHEEL_SLOTS):
+        """
+        Initialize members.
+        """
+
+        self._slots = [[] for i in range(numSlots)]
+
+    def add(self, minute, entry):
+        """
+        Add an entry due at given minute.
+        """
+
+        self._slots[minute % len(self._slots)].append((minute, entry))
+
+    def pop(self, minute):
+        """
+        Remove and return the entries due at given minute.
+        """
+
+        index = minute % len(self._slots)
+        slot = self._slots[index]
+        self._slots[index] = [(m, e) for m, e in slot if m > minute]
+
+        return [e for m, e in slot if m == minute]
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+
+        self._slots = [[] for i in range(len(self._slots))]
+
+    def __len__(self):
+        """
+        Get the number of entries.
+        """
+
+        return sum(len(s) for s in self._slots)
+
+
+class WatchlistSubscriber(object):
+
+    """
+    Subscriber watching celebrities, holding events not read yet.
+    """
+
+    def __init__(self, celebNames):
+        """
+        Initialize members.
+        """
+
+        self.celebNames = celebNames
+        self._events = queue.Queue(MAX_PENDING_EVENTS)
+
+    def put(self, event):
+        """
+        Add an event, dropping it if too many are pending.
+        """
+
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def get(self, timeout):
+        """
+        Wait for an event up to timeout seconds, returning None on timeout.
+        """
+
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class WatchlistNotifier(object):
+
+    """
+    Watchlist notifier class.
+
+    Upcoming schedule items are loaded into a timer wheel at the minute
+    their watchers should be notified. Every tick turns the wheel once and
+    matches the due items' participants against the subscribers watching
+    them, so the cost of a tick does not grow with the number of
+    subscribers but only with the number of notifications.
+
+    Every event stream holds a server thread while its client is connected,
+    so at most maxSubscribers are served at once when given.
+    """
+
+    def __init__(self, db, leadMinutes=DEFAULT_LEAD_MINUTES,
+                 maxSubscribers=None):
+        """
+        Initialize members.
+        """
+
+        self._db = db
+        self._leadMinutes = leadMinutes
+        self._maxSubscribers = maxSubscribers
+        self._wheel = TimerWheel()
+        self._subscribers = {}
+        self._allSubscribers = set()
+        self._lock = threading.Lock()
+        self._tickLock = threading.Lock()
+        self._generation = None
+        self._lastMinute = None
+        self._loadedUntil = None
+        self._timer = None
+
+    def subscribe(self, celebNames):
+        """
+        Register a subscriber watching given celebrities, returning None if
+        too many are subscribed.
+        """
+
+        subscriber = WatchlistSubscriber(celebNames)
+
+        with self._lock:
+            if self._maxSubscribers is not None and \
+                    len(self._allSubscribers) >= self._maxSubscribers:
+                return None
+
+            self._allSubscribers.add(subscriber)
+
+            for celeb in celebNames:
+                self._subscribers.setdefault(celeb, set()).add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        Remove a subscriber.
+        """
+
+        with self._lock:
+            self._allSubscribers.discard(subscriber)
+
+            for celeb in subscriber.celebNames:
+                subscribers = self._subscribers.get(celeb)
+
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+
+                    if not subscribers:
+                        del self._subscribers[celeb]
+
+    def tick(self, curDateTime):
+        """
+        Notify watchers of the items due up to given dateTime.
+        """
+
+        minute = getMinute(curDateTime)
+
+        with self._tickLock:
+            generation = self._db.getGeneration("schedule")
+
+            # Reload the wheel from the next due minute on schedule changes
+            if self._lastMinute is None or generation != self._generation:
+                firstMinute = minute if self._lastMinute is None \
+                    else self._lastMinute + 1
+                self._wheel.clear()
+                self._generation = generation
+                self._loadedUntil = firstMinute
+
+            if self._loadedUntil - minute < WHEEL_SLOTS // 2:
+                self._load(self._loadedUntil, minute + WHEEL_SLOTS)
+
+            # Catch up with minutes missed by a late tick
+            firstMinute = minute if self._lastMinute is None \
+                else max(self._lastMinute + 1, minute - WHEEL_SLOTS + 1)
+
+            for dueMinute in range(firstMinute, minute + 1):
+                for scheduleItem in self._wheel.pop(dueMinute):
+                    self._notify(scheduleItem)
+
+            self._lastMinute = max(minute, self._lastMinute or minute)
+
+    def start(self):
+        """
+        Tick at the start of every minute in a background thread.
+        """
+
+        def tickAndRearm():
+            try:
+                self.tick(datetime.datetime.now())
+            finally:
+                self.start()
+
+        now = datetime.datetime.now()
+        self._timer = threading.Timer(60 - now.second - now.microsecond / 1e6,
+                                      tickAndRearm)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self):
+        """
+        Stop ticking.
+        """
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def getStats(self):
+        """
+        Get the numbers of watched celebrities, subscribers and pending
+        schedule items, and the subscriber limit.
+        """
+
+        with self._lock:
+            return {
+                "celebrities": len(self._subscribers),
+                "subscribers": len(self._allSubscribers),
+                "maxSubscribers": self._maxSubscribers,
+                "scheduleItems": len(self._wheel)
+            }
+
+    def streamEvents(self, subscriber):
+        """
+        Generate server-sent events of a subscriber until the client goes
+        away.
+        """
+
+        try:
+            yield "retry: {}\n\n".format(RETRY_MILLISECONDS)
+
+            while True:
+                event = subscriber.get(KEEPALIVE_SECONDS)
+
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield event
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _load(self, fromMinute, toMinute):
+        """
+        Add the items whose watchers are due within given minutes to the
+        wheel.
+        """
+
+        lowerDateTime = _EPOCH + (fromMinute + self._leadMinutes) * _MINUTE
+        upperDateTime = _EPOCH + (toMinute + self._leadMinutes) * _MINUTE
+        date = lowerDateTime.date()
+
+        while date <= upperDateTime.date():
+            for scheduleItem in self._db.listSchedule(
+                    date.strftime("%Y%m%d"), "day"):
+                if not scheduleItem.get("participants"):
+                    continue
+
+                dueMinute = getMinute(str2dateTime(scheduleItem["date"],
+                                                   scheduleItem["time"])) - \
+                    self._leadMinutes
+
+                if fromMinute <= dueMinute < toMinute:
+                    self._wheel.add(dueMinute, scheduleItem)
+
+            date += datetime.timedelta(days=1)
+
+        self._loadedUntil = toMinute
+
+    def _notify(self, scheduleItem):
+        """
+        Send an event to the subscribers watching participants of a schedule
+        item.
+        """
+
+        matches = {}
+
+        with self._lock:
+            for celeb in scheduleItem["participants"]:
+                for subscriber in self._subscribers.get(celeb, ()):
+                    matches.setdefault(subscriber, []).append(celeb)
+
+        if not matches:
+            return
+
+        eventId = "{}-{}{}".format(scheduleItem["channelId"],
+                                   scheduleItem["date"], scheduleItem["time"])
+
+        for subscriber, celebNames in matches.items():
+            subscriber.put(formatEvent("onair", {
+                "celebrities": celebNames,
+                "scheduleItem": scheduleItem
+            }, eventId))
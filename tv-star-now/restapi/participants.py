@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+
+
+def getParticipants(episodeGuests, programCast, programId, episodeNum):
+    """
+    Get participants of a schedule item: the episode guests when the episode
+    number is known, the program cast otherwise.
+    """
+
+    if episodeNum:
+        return sorted(episodeGuests.get((programId, episodeNum), ()))
+
+    return sorted(programCast.get(programId, ()))
+
+
+def loadEpisodeGuestsProgramCast(episodesColl, programsColl, programIds):
+    """
+    Load episode guests and program cast of given programs.
+    """
+
+    episodeGuests = collections.defaultdict(set)
+    programCast = collections.defaultdict(set)
+    query = {"programId": {"$in": list(programIds)}}
+
+    for episode in episodesColl.find(query, {"programId": True,
+                                             "episodeNum": True,
+                                             "guests": True}):
+        episodeKey = (episode["programId"], episode["episodeNum"])
+        episodeGuests[episodeKey].update(episode["guests"])
+
+    for program in programsColl.find(query, {"programId": True,
+                                             "cast": True}):
+        programCast[program["programId"]].update(program["cast"])
+
+    return episodeGuests, programCast
+
+
+def materializeParticipants(scheduleColl, episodesColl, programsColl,
+                            programIds):
+    """
+    Write participants arrays and main categories onto schedule items of
+    given programs.
+    """
+
+    programIds = list(set(programIds))
+    episodeGuests, programCast = \
+        loadEpisodeGuestsProgramCast(episodesColl, programsColl, programIds)
+    query = {"programId": {"$in": programIds}}
+    episodeKeys = {(s["programId"], s.get("episodeNum", ""))
+                   for s in scheduleColl.find(query, {"programId": True,
+                                                      "episodeNum": True})}
+
+    for programId, episodeNum in episodeKeys:
+        participants = getParticipants(episodeGuests, programCast, programId,
+                                       episodeNum)
+        scheduleColl.update({"programId": programId,
+                             "episodeNum": episodeNum},
+                            {"$set": {"participants": participants}},
+                            multi=True)
+
+    # Denormalize the main category of programs for filtered queries
+    for program in programsColl.find(query, {"programId": True,
+                                             "mainCatName": True}):
+        if program.get("mainCatName"):
+            scheduleColl.update({"programId": program["programId"]},
+                                {"$set": {"mainCategory":
+                                          program["mainCatName"]}},
+                                multi=True)
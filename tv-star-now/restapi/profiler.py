@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+
+import cProfile
+import glob
+import hmac
+import os
+import pstats
+import random
+import threading
+import time
+from flask import g
+from flask import request
+from flask.ext.restful import Resource
+from flask.ext.restful import reqparse
+from flask_restful_swagger import swagger
+
+
+# Requests carrying this header with the profile token are always profiled
+DEBUG_HEADER = "X-Profile"
+
+# Addresses allowed to use the debug header when no token is configured
+LOOPBACK_ADDRS = ("127.0.0.1", "::1")
+
+# Sort keys of the hotspot report
+SORT_KEYS = ["cumulative", "tottime", "ncalls"]
+
+
+class RequestProfiler(object):
+
+    """
+    Sampled request profiler class.
+
+    Profiles a fraction of requests, and the authorized requests carrying
+    the debug header, with cProfile and keeps the latest dumps in a
+    directory. Requests are authorized by the configured token in the debug
+    header, or by coming from the loopback address if there is no token.
+    """
+
+    def __init__(self, dumpDir, sampleRate=0.0, maxDumps=100, token=None):
+        """
+        Initialize members.
+        """
+
+        self._dumpDir = dumpDir
+        self._sampleRate = sampleRate
+        self._maxDumps = maxDumps
+        self._token = token
+        self._lock = threading.Lock()
+
+        os.makedirs(dumpDir, exist_ok=True)
+
+    def isAuthorized(self):
+        """
+        Check if the current request may force profiling or read the report.
+        """
+
+        if self._token:
+            return hmac.compare_digest(request.headers.get(DEBUG_HEADER, ""),
+                                       self._token)
+
+        return request.remote_addr in LOOPBACK_ADDRS
+
+    def shouldProfile(self):
+        """
+        Check if the current request is to be profiled.
+        """
+
+        if request.headers.get(DEBUG_HEADER) and self.isAuthorized():
+            return True
+
+        return random.random() < self._sampleRate
+
+    def begin(self):
+        """
+        Start profiling the current request if it is to be profiled.
+        """
+
+        if not self.shouldProfile():
+            return
+
+        profile = cProfile.Profile()
+
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this interpreter
+            return
+
+        g.profile = profile
+        g.profileStartTime = time.time()
+
+    def end(self, exc=None):
+        """
+        Stop profiling the current request and dump the profile.
+        """
+
+        profile = getattr(g, "profile", None)
+
+        if profile is None:
+            return
+
+        profile.disable()
+        g.profile = None
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        elapsedMs = int((time.time() - g.profileStartTime) * 1000)
+        fileName = "{:.6f}-{}-{}-{}ms.prof".format(
+            g.profileStartTime, os.getpid(),
+            route.strip("/").replace("/", "_") or "root", elapsedMs)
+        profile.dump_stats(os.path.join(self._dumpDir, fileName))
+        self._rotate()
+
+    def _rotate(self):
+        """
+        Remove the oldest dumps beyond the maximum number.
+        """
+
+        with self._lock:
+            dumpFiles = sorted(glob.glob(os.path.join(self._dumpDir,
+                                                      "*.prof")))
+
+            for dumpFile in dumpFiles[:-self._maxDumps]:
+                try:
+                    os.remove(dumpFile)
+                except OSError:
+                    # Removed by another worker
+                    pass
+
+    def getHotspots(self, topN, sortKey="cumulative"):
+        """
+        Aggregate the dumps and return the top N functions.
+        """
+
+        stats = None
+        dumpFiles = glob.glob(os.path.join(self._dumpDir, "*.prof"))
+
+        for dumpFile in dumpFiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(dumpFile)
+                else:
+                    stats.add(dumpFile)
+            except (OSError, EOFError, TypeError, ValueError):
+                # Rotated out or partially written
+                continue
+
+        if stats is None:
+            return {"profiles": 0, "hotspots": []}
+
+        sortIndex = {"ncalls": 1, "tottime": 2, "cumulative": 3}[sortKey]
+        rows = sorted(stats.stats.items(), key=lambda s: s[1][sortIndex],
+                      reverse=True)
+        hotspots = []
+
+        for (fileName, lineNum, funcName), stat in rows[:topN]:
+            hotspots.append({
+                "function": "{}:{}({})".format(fileName, lineNum, funcName),
+                "ncalls": stat[1],
+                "tottime": stat[2],
+                "cumtime": stat[3]
+            })
+
+        return {"profiles": len(dumpFiles), "hotspots": hotspots}
+
+
+def enableProfiler(app, profiler):
+    """
+    Profile requests served by the app.
+    """
+
+    # Teardown also runs for requests that raise, so profiling always stops
+    app.before_request(profiler.begin)
+    app.teardown_request(profiler.end)
+
+
+class ProfileReport(Resource):
+
+    """
+    Profile hotspot report class.
+    """
+
+    @classmethod
+    def make(cls, profiler):
+        """
+        Make profiler.
+        """
+
+        cls._profiler = profiler
+        return cls
+
+    @swagger.operation(
+        summary=u"프로파일 보기",
+        parameters=[
+            {
+                "name": "topN",
+                "description": u"보일 함수의 수, 최대 100",
+                "dataType": "integer",
+                "paramType": "query",
+                "required": False
+            },
+            {
+                "name": "sort",
+                "description": u"정렬 기준: 'cumulative'(기본값), "
+                               u"'tottime', 'ncalls'",
+                "dataType": "string",
+                "paramType": "query",
+                "required": False
+            }
+        ]
+    )
+    def get(self):
+        """
+        최근에 프로파일한 요청들을 모아 수행 시간이 긴 함수를 보인다.
+        """
+
+        if not self._profiler.isAuthorized():
+            data = {"error": "Not authorized"}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("topN", type=int, location="args", default=20)
+        parser.add_argument("sort", type=str, location="args",
+                            default="cumulative")
+        args = parser.parse_args()
+        topN = args["topN"]
+        sortKey = args["sort"]
+
+        if not 0 < topN <= 100:
+            data = {"error": "Invalid topN: {}".format(topN)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        if sortKey not in SORT_KEYS:
+            data = {"error": "Invalid sort: {}".format(sortKey)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        data = {"data": self._profiler.getHotspots(topN, sortKey)}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*"}
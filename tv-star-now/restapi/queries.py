@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import base64
+import binascii
+import ujson
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from .util import str2dateTime
+from .util import getThisWeekSunSatDateTime
+from .scheduleindex import DEFAULT_DURATION
+
+
+# Schedule item fields clients can select
+SCHEDULE_FIELDS = ["date", "time", "endDate", "endTime", "channelId",
+                   "channelName", "programId", "title", "episodeNum",
+                   "mainCategory", "participants"]
+
+
+def dumpJson(data):
+    """
+    Serialize data into JSON leaving non-ASCII characters unescaped.
+    """
+
+    return ujson.dumps(data, ensure_ascii=False)
+
+
+def delDateTimeId(results):
+    """
+    Delete datetime and _id objects.
+    """
+
+    for result in results:
+        del result["_id"]
+        del result["dateTime"]
+        result.pop("endDateTime", None)
+        yield result
+
+
+def delDateTime(result):
+    """
+    Delete datetime object of a result.
+    """
+
+    del result["dateTime"]
+
+    return result
+
+
+def delMongoId(results):
+    """
+    Delete MongoDB _id objects.
+    """
+
+    for result in results:
+        del result["_id"]
+        yield result
+
+
+def splitCelebs(celebs):
+    """
+    Split '|'-separated celebrity names.
+    """
+
+    return [c.strip() for c in celebs.split("|")]
+
+
+def formatSearchResults(celebNames, celebItems):
+    """
+    Format schedule items found for each celebrity as search results.
+    """
+
+    results = []
+
+    for celeb in celebNames:
+        if celebItems.get(celeb):
+            results.append({"celebrity": celeb,
+                            "scheduleItems": {celeb: celebItems[celeb]}})
+
+    return results
+
+
+def getSearchWindow(curDateTime):
+    """
+    Get the dateTime range searched around given dateTime.
+    """
+
+    lowerDateTime = curDateTime - datetime.timedelta(minutes=30)
+    upperDateTime = curDateTime + datetime.timedelta(hours=1)
+
+    return lowerDateTime, upperDateTime
+
+
+def getBucketSearchWindow(bucketDateTime, bucketSize):
+    """
+    Get the dateTime range covering the search windows of every minute in
+    given time bucket.
+    """
+
+    lastDateTime = bucketDateTime + bucketSize - datetime.timedelta(minutes=1)
+
+    return getSearchWindow(bucketDateTime)[0], getSearchWindow(lastDateTime)[1]
+
+
+def filterSearchWindow(scheduleItems, lowerDateTime, upperDateTime):
+    """
+    Keep schedule items starting within given closed dateTime range.
+    """
+
+    def isInWindow(scheduleItem):
+        dateTime = str2dateTime(scheduleItem["date"], scheduleItem["time"])
+        return lowerDateTime <= dateTime <= upperDateTime
+
+    return [s for s in scheduleItems if isInWindow(s)]
+
+
+def mergeSearchWindows(windows):
+    """
+    Merge overlapping (lower, upper) dateTime windows. Returns a list of
+    merged (lower, upper, indices of the windows merged) tuples.
+    """
+
+    merged = []
+
+    for i in sorted(range(len(windows)), key=lambda i: windows[i]):
+        lowerDateTime, upperDateTime = windows[i]
+
+        if merged and lowerDateTime <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], upperDateTime)
+            merged[-1][2].append(i)
+        else:
+            merged.append([lowerDateTime, upperDateTime, [i]])
+
+    return [tuple(m) for m in merged]
+
+
+def getOnAirQuery(curDateTime):
+    """
+    Get schedule query of items on air at given dateTime.
+    """
+
+    query = {
+        "dateTime": {"$lte": curDateTime},
+        "$or": [
+            {"endDateTime": {"$gt": curDateTime}},
+            {"endDateTime": {"$exists": False},
+             "dateTime": {"$gt": curDateTime-DEFAULT_DURATION}}
+        ]
+    }
+
+    return query
+
+
+def parseChannelIds(channelIdsStr):
+    """
+    Parse comma-separated channel IDs.
+    """
+
+    try:
+        channelIds = [int(c) for c in channelIdsStr.split(",") if c.strip()]
+    except ValueError:
+        channelIds = None
+
+    if not channelIds:
+        raise ValueError("Invalid channelIds: {}".format(channelIdsStr))
+
+    return channelIds
+
+
+def addScheduleFilter(query, channelIds=None, mainCategory=None):
+    """
+    Narrow schedule query down to given channels and main category, so it
+    reads the (channelId, dateTime) or (mainCategory, dateTime) index ranges.
+    """
+
+    if channelIds:
+        query["channelId"] = {"$in": list(channelIds)}
+
+    if mainCategory:
+        query["mainCategory"] = mainCategory
+
+
+def getListQuery(dateStr, dateRange, channelIds=None, mainCategory=None):
+    """
+    Get schedule query of given date and range, optionally only on given
+    channels and of given main category.
+    """
+
+    if dateRange == "day" and not (channelIds or mainCategory):
+        query = {
+            "date": dateStr
+        }
+    elif dateRange == "day":
+        # Filtered days are queried by dateTime to bound the compound indexes
+        dayDateTime = str2dateTime(dateStr, "0000")
+        query = {
+            "dateTime": {"$gte": dayDateTime,
+                         "$lt": dayDateTime + datetime.timedelta(days=1)}
+        }
+    else:
+        sunDateTime, satDateTime = getThisWeekSunSatDateTime(dateStr)
+        query = {
+            "dateTime": {"$gte": sunDateTime, "$lte": satDateTime}
+        }
+
+    addScheduleFilter(query, channelIds, mainCategory)
+
+    return query
+
+
+def getTimeBucket(dateTime, bucketSize):
+    """
+    Round dateTime down to the start of its time bucket.
+    """
+
+    minutes = dateTime.hour * 60 + dateTime.minute
+    minutes -= minutes % (bucketSize.seconds // 60)
+
+    return dateTime.replace(hour=minutes // 60, minute=minutes % 60,
+                            second=0, microsecond=0)
+
+
+def isParticipant(celeb, scheduleItem):
+    """
+    Check if celebrity is among participants embedded in schedule item.
+    """
+
+    return celeb in scheduleItem.get("participants", ())
+
+
+def streamJsonData(records):
+    """
+    Serialize records as {"data": [...]} one record at a time.
+    """
+
+    yield '{"data": ['
+
+    for i, record in enumerate(records):
+        if i:
+            yield ", "
+        yield dumpJson(record)
+
+    yield "]}"
+
+
+def encodeListCursor(dateTime, itemId):
+    """
+    Encode the position of a schedule item as a list cursor.
+    """
+
+    position = "{}:{}".format(dateTime.strftime("%Y%m%d%H%M"), itemId)
+
+    return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii")
+
+
+def decodeListCursor(cursor, parseId=ObjectId):
+    """
+    Decode list cursor into dateTime and ID of a schedule item, parsing the
+    ID with given function.
+    """
+
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        dateTimeStr, itemIdStr = position.decode("ascii").split(":")
+        dateTime = datetime.datetime.strptime(dateTimeStr, "%Y%m%d%H%M")
+        itemId = parseId(itemIdStr)
+    except (binascii.Error, UnicodeError, ValueError, InvalidId):
+        raise ValueError("Invalid cursor: {}".format(cursor))
+
+    return dateTime, itemId
+
+
+def parseFields(fieldsStr):
+    """
+    Parse comma-separated schedule item field names.
+    """
+
+    fields = [f.strip() for f in fieldsStr.split(",") if f.strip()]
+
+    for field in fields:
+        if field not in SCHEDULE_FIELDS:
+            raise ValueError("Invalid field: {}".format(field))
+
+    return fields
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+
+import gzip
+from flask import request
+from flask import make_response
+from .queries import dumpJson
+
+
+# Smallest response body worth compressing in bytes
+GZIP_MIN_SIZE = 1024
+
+
+def makeJsonRepresentation(dumps=dumpJson):
+    """
+    Make a Flask-RESTful JSON representation serializing with given encoder.
+    """
+
+    def outputJson(data, code, headers=None):
+        response = make_response(dumps(data), code)
+        response.headers.extend(headers or {})
+        response.mimetype = "application/json"
+
+        return response
+
+    return outputJson
+
+
+def acceptsGzip():
+    """
+    Check if the client of the current request accepts gzip encoding.
+    """
+
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def compressBody(body, minSize=GZIP_MIN_SIZE):
+    """
+    Compress a serialized body with gzip, or return None if it is smaller
+    than minSize or compression is disabled.
+    """
+
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    if minSize <= 0 or len(body) < minSize:
+        return None
+
+    return gzip.compress(body, compresslevel=6)
+
+
+def setGzipBody(response, gzipBody):
+    """
+    Replace body of given response with its gzip-compressed bytes.
+    """
+
+    response.set_data(gzipBody)
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+
+    # Encoded bodies differ byte by byte, so the validator becomes weak
+    etag = response.headers.get("ETag")
+
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = "W/" + etag
+
+
+def gzipResponse(response, minSize=GZIP_MIN_SIZE):
+    """
+    Compress body of given response if the client accepts gzip encoding and
+    the body is large enough.
+    """
+
+    if response.status_code != 200 or response.is_streamed or \
+            response.direct_passthrough or \
+            "Content-Encoding" in response.headers:
+        return response
+
+    body = response.get_data()
+
+    if len(body) < minSize:
+        return response
+
+    # Shared caches must keep the plain and compressed variants apart
+    response.vary.add("Accept-Encoding")
+
+    if acceptsGzip():
+        setGzipBody(response, compressBody(body, minSize))
+
+    return response
+
+
+def enableFastJson(app, api, gzipMinSize=GZIP_MIN_SIZE):
+    """
+    Serialize API responses with the fast encoder and compress large ones.
+    Compression is disabled if gzipMinSize is 0.
+    """
+
+    api.representations["application/json"] = makeJsonRepresentation()
+
+    if gzipMinSize > 0:
+        app.after_request(lambda r: gzipResponse(r, gzipMinSize))
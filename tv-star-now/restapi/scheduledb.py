@@ -4,6 +4,10 @@
 import datetime
 import urllib.parse
 import collections
+import itertools
+from flask import request
+from flask import Response
+from flask import stream_with_context
 from flask.ext.restful import Resource
 from flask.ext.restful import reqparse
 from flask_restful_swagger import swagger
@@ -11,29 +15,103 @@ import pymongo
 from .util import str2dateTime
 from .util import validateDate
 from .util import getThisWeekSunSatDateTime
+from .celebindex import CelebrityIndex
+from .celebsuggest import CelebritySuggestIndex
+from .celebsuggest import SUGGEST_TOP_K
+from .celebsuggest import getSuggestQuery
+from .leaderboard import CelebrityLeaderboard
+from .leaderboard import CELEBRITY_DELTAS_COLL
+from .leaderboard import LEADERBOARD_SIZE
+from .appearances import APPEARANCES_COLL
+from .appearances import getAppearancesFromDateTime
+from .slottable import SlotTable
+from .slottable import getSlotStartDateTime
+from .scheduleindex import ScheduleIndex
+from .scheduleindex import isScheduleFilterMatch
+from .datagen import METADATA_COLL
+from .datagen import GenerationWatcher
+from .cache import LRUCache
+from .storage import ScheduleStorage
+from .notifier import MAX_WATCH_CELEBS
+from .etag import makeRequestETag
+from .etag import isNotModified
+from .etag import notModifiedResponse
+from .queries import dumpJson
+from .representation import acceptsGzip
+from .representation import compressBody
+from .representation import setGzipBody
+from .queries import delDateTimeId
+from .queries import delDateTime
+from .queries import delMongoId
+from .queries import splitCelebs
+from .queries import formatSearchResults
+from .queries import getSearchWindow
+from .queries import getBucketSearchWindow
+from .queries import filterSearchWindow
+from .queries import mergeSearchWindows
+from .queries import getOnAirQuery
+from .queries import parseChannelIds
+from .queries import addScheduleFilter
+from .queries import getListQuery
+from .queries import getTimeBucket
+from .queries import isParticipant
+from .queries import streamJsonData
+from .queries import encodeListCursor
+from .queries import decodeListCursor
+from .queries import parseFields
+from .apiparams import SEARCH_PARAMS
+from .apiparams import LIST_PARAMS
+from .apiparams import CELEBRITIES_PARAMS
+from .apiparams import NOW_PARAMS
+from .apiparams import WATCH_PARAMS
+from .apiparams import BATCH_PARAMS
+from .apiparams import SUGGEST_PARAMS
+
+
+# Time bucket size of the search cache
+SEARCH_CACHE_BUCKET = datetime.timedelta(minutes=5)
+
+# Maximum number of schedule items in a page
+MAX_PAGE_SIZE = 1000
+
+# Maximum number of searches in a batch
+MAX_BATCH_SIZE = 100
+
+# Longest dateTime range of appearance searches
+MAX_SEARCH_RANGE = datetime.timedelta(days=31)
+
+# Maximum number of next appearances per celebrity
+MAX_NEXT_COUNT = 100
 
 
 # Convinient functions
 
-def delDateTimeId(results):
+def makeJsonResponse(body, etag=None):
     """
-    Delete datetime and _id objects.
+    Make a JSON response from serialized body.
     """
 
-    for result in results:
-        del result["_id"]
-        del result["dateTime"]
-        yield result
+    headers = {"Access-Control-Allow-Origin": "*"}
 
+    if etag:
+        headers["ETag"] = etag
 
-def delMongoId(results):
+    return Response(body, status=200, mimetype="application/json",
+                    headers=headers)
+
+
+def makeStreamingJsonResponse(records, etag=None):
     """
-    Delete MongoDB _id objects.
+    Make a chunked JSON response serializing records while they are read.
     """
 
-    for result in results:
-        del result["_id"]
-        yield result
+    headers = {"Access-Control-Allow-Origin": "*"}
+
+    if etag:
+        headers["ETag"] = etag
+
+    return Response(stream_with_context(streamJsonData(records)), status=200,
+                    mimetype="application/json", headers=headers)
 
 
 def getCountVal(celebItem):
@@ -41,18 +119,23 @@ def getCountVal(celebItem):
     Get count value from celebrity item.
     """
 
-    return celebItem["AppearCount"]
+    return celebItem["appearCount"]
 
 
-class ScheduleDB(object):
+class ScheduleDB(ScheduleStorage):
 
     """
-    TV information database class.
+    TV information database class on MongoDB.
     """
 
+    supportsPaging = True
+
     def __init__(self, mongoClient, db="tv-star-now",
                  episodeColl="episodes", scheduleColl="schedule",
-                 programsColl="programs", celebritiesColl="celebrities"):
+                 programsColl="programs", celebritiesColl="celebrities",
+                 metadataColl=METADATA_COLL,
+                 celebrityDeltasColl=CELEBRITY_DELTAS_COLL,
+                 appearancesColl=APPEARANCES_COLL):
         """
         Initialize members.
         """
@@ -61,114 +144,713 @@ class ScheduleDB(object):
         self._scheduleColl = mongoClient[db][scheduleColl]
         self._programsColl = mongoClient[db][programsColl]
         self._celebritiesColl = mongoClient[db][celebritiesColl]
+        self._metadataColl = mongoClient[db][metadataColl]
+        self._celebrityDeltasColl = mongoClient[db][celebrityDeltasColl]
+        self._appearancesColl = mongoClient[db][appearancesColl]
+        self._generations = GenerationWatcher(self._metadataColl)
+        self._celebIndex = None
+        self._scheduleIndex = None
+        self._participantsSearch = False
+        self._searchCache = None
+        self._celebSuggest = None
+        self._leaderboard = None
+        self._appearancesSearch = False
+        self._appearancesFrom = None
+        self._slotTable = None
+
+    def connect(self, mongoClient):
+        """
+        Use collections of given MongoDB client, e.g. one created after fork.
+        """
+
+        db = mongoClient[self._scheduleColl.database.name]
+        self._episodeColl = db[self._episodeColl.name]
+        self._scheduleColl = db[self._scheduleColl.name]
+        self._programsColl = db[self._programsColl.name]
+        self._celebritiesColl = db[self._celebritiesColl.name]
+        self._metadataColl = db[self._metadataColl.name]
+        self._celebrityDeltasColl = db[self._celebrityDeltasColl.name]
+        self._appearancesColl = db[self._appearancesColl.name]
+        self._generations.setColl(self._metadataColl)
 
-    def searchSchedule(self, dateStr, timeStr, celebs):
+        if self._celebIndex:
+            self._celebIndex.setColls(self._episodeColl, self._programsColl)
+
+        if self._scheduleIndex:
+            self._scheduleIndex.setColl(self._scheduleColl)
+
+        if self._slotTable:
+            self._slotTable.setColl(self._scheduleColl)
+
+        if self._celebSuggest:
+            self._celebSuggest.setColl(self._celebritiesColl)
+
+        if self._leaderboard:
+            self._leaderboard.setColls(self._celebrityDeltasColl,
+                                       self._celebritiesColl)
+
+    def watchGenerations(self, interval):
         """
-        Search TV schedule with given parameters.
+        Poll data generations every interval seconds so in-memory data is
+        rebuilt after ingest.
         """
 
-        results = []
+        self._generations.start(interval)
+
+    def enableScheduleIndex(self):
+        """
+        Build the in-memory schedule index and serve time range queries with
+        it. The index is rebuilt whenever the schedule generation changes.
+        """
 
-        for celeb in celebs.split("|"):
-            scheduleItems = self._searchSchedule(dateStr, timeStr)
-            celeb = celeb.strip()
-            subResults = collections.defaultdict(list)
-            for scheduleItem in scheduleItems:
-                programId = scheduleItem.get("programId")
-                episodeNum = scheduleItem.get("episodeNum")
+        self._scheduleIndex = ScheduleIndex(self._scheduleColl)
+        self._generations.addListener(self._scheduleColl.name,
+                                      self._scheduleIndex.rebuild)
+
+    def enableCelebSuggest(self):
+        """
+        Build the in-memory celebrity name suggestion index. The index is
+        rebuilt whenever the celebrities generation changes.
+        """
+
+        self._celebSuggest = CelebritySuggestIndex(self._celebritiesColl)
+        self._generations.addListener(self._celebritiesColl.name,
+                                      self._celebSuggest.rebuild)
+
+    def enableLeaderboard(self):
+        """
+        Sum appearance count deltas written at ingest into in-memory
+        leaderboards. New deltas are added whenever the celebrities
+        generation changes.
+        """
+
+        self._leaderboard = CelebrityLeaderboard(self._celebrityDeltasColl,
+                                                 self._celebritiesColl)
+        self._generations.addListener(self._celebritiesColl.name,
+                                      self._leaderboard.refresh)
+
+    def enableAppearancesSearch(self):
+        """
+        Search appearances from the materialized appearances collection,
+        reading one document per celebrity, when the searched range starts
+        after the appearances were materialized from.
+        """
+
+        self._appearancesSearch = True
+        self._loadAppearancesFrom()
+        self._generations.addListener(self._appearancesColl.name,
+                                      self._loadAppearancesFrom)
+
+    def _loadAppearancesFrom(self):
+        """
+        Load the dateTime appearances are materialized from.
+        """
+
+        self._appearancesFrom = getAppearancesFromDateTime(
+            self._appearancesColl.database)
+
+    def enableSlotTable(self):
+        """
+        Build the in-memory on-air slot table. The table is rebuilt whenever
+        the schedule generation changes.
+        """
+
+        self._slotTable = SlotTable(self._scheduleColl)
+        self._generations.addListener(self._scheduleColl.name,
+                                      self._slotTable.rebuild)
+
+    def enableParticipantsSearch(self):
+        """
+        Search with participants embedded into schedule items at ingest time
+        instead of joining episodes and programs.
+        """
+
+        self._participantsSearch = True
+
+    def enableSearchCache(self, maxSize, ttl):
+        """
+        Cache search results per celebrity and time bucket.
+        """
+
+        self._searchCache = LRUCache(maxSize, ttl)
+
+    def getSearchCacheStats(self):
+        """
+        Return search cache statistics.
+        """
+
+        if not self._searchCache:
+            return {}
+
+        return self._searchCache.getStats()
+
+    def getGeneration(self, collName):
+        """
+        Get the last seen data generation of given collection.
+        """
+
+        return self._generations.get(collName)
+
+    def getScheduleIndexStats(self):
+        """
+        Return schedule index statistics.
+        """
+
+        if not self._scheduleIndex:
+            return {}
+
+        return self._scheduleIndex.getStats()
+
+    def enableCelebIndex(self, refreshInterval=0):
+        """
+        Build the in-memory celebrity index and search with it. The index is
+        rebuilt whenever the episodes or programs generation changes.
+        """
 
-                if episodeNum:
-                    if self._searchEpisodes(programId, episodeNum, celeb):
-                        del scheduleItem["dateTime"]
-                        del scheduleItem["_id"]
-                        subResults[celeb].append(scheduleItem)
-                else:
-                    if self._searchPrograms(programId, celeb):
-                        del scheduleItem["dateTime"]
-                        del scheduleItem["_id"]
-                        subResults[celeb].append(scheduleItem)
+        self._celebIndex = CelebrityIndex(self._episodeColl,
+                                          self._programsColl)
 
-            if subResults:
-                results.append({"celebrity": celeb,
-                                "scheduleItems": subResults})
+        for collName in [self._episodeColl.name, self._programsColl.name]:
+            self._generations.addListener(collName, self._celebIndex.rebuild)
+
+        self.startCelebIndexRefresh(refreshInterval)
+
+    def startCelebIndexRefresh(self, interval):
+        """
+        Refresh the celebrity index every interval seconds, picking up
+        documents inserted without a generation change.
+        """
+
+        if interval > 0:
+            self._celebIndex.startAutoRefresh(interval)
+
+    def refreshCelebIndex(self):
+        """
+        Refresh the celebrity index on demand.
+        """
+
+        if not self._celebIndex:
+            raise RuntimeError("Celebrity index not enabled")
+
+        self._celebIndex.refresh()
+
+    def getCelebIndexStats(self):
+        """
+        Return celebrity index statistics.
+        """
+
+        if not self._celebIndex:
+            return {}
+
+        return self._celebIndex.getStats()
+
+    def searchSchedule(self, dateStr, timeStr, celebs, channelIds=None,
+                       mainCategory=None):
+        """
+        Search TV schedule with given parameters, optionally only on given
+        channels and of given main category.
+        """
+
+        celebNames = splitCelebs(celebs)
+        curDateTime = str2dateTime(dateStr, timeStr)
+
+        if not self._searchCache:
+            scheduleItems = self._searchSchedule(curDateTime, celebNames,
+                                                 channelIds, mainCategory)
+            celebItems = self._matchCelebs(scheduleItems, celebNames)
+
+            return formatSearchResults(celebNames, celebItems)
+
+        # Searches within the same time bucket share items of the windows of
+        # the whole bucket, narrowed down to the window of each search
+        bucketDateTime = getTimeBucket(curDateTime, SEARCH_CACHE_BUCKET)
+        lowerDateTime, upperDateTime = getSearchWindow(curDateTime)
+        generations = tuple(self.getGeneration(c.name)
+                            for c in [self._scheduleColl, self._episodeColl,
+                                      self._programsColl])
+        scheduleFilter = (tuple(sorted(set(channelIds or ()))),
+                          mainCategory)
+        celebItems = {}
+        missingCelebs = []
+
+        for celeb in celebNames:
+            items = self._searchCache.get((celeb, bucketDateTime,
+                                           generations, scheduleFilter))
+            if items is None:
+                missingCelebs.append(celeb)
+            else:
+                celebItems[celeb] = items
+
+        if missingCelebs:
+            bucketLower, bucketUpper = getBucketSearchWindow(
+                bucketDateTime, SEARCH_CACHE_BUCKET)
+            scheduleItems = list(self._findScheduleRange(
+                bucketLower, bucketUpper, missingCelebs, channelIds,
+                mainCategory))
+            missingItems = self._matchCelebs(scheduleItems, missingCelebs)
+
+            for celeb, items in missingItems.items():
+                self._searchCache.put((celeb, bucketDateTime, generations,
+                                       scheduleFilter), items)
+
+            celebItems.update(missingItems)
+
+        celebItems = {c: filterSearchWindow(items, lowerDateTime,
+                                            upperDateTime)
+                      for c, items in celebItems.items()}
+
+        return formatSearchResults(celebNames, celebItems)
+
+    def searchScheduleBatch(self, searches):
+        """
+        Search TV schedule for each of (dateStr, timeStr, celebs) tuples and
+        return the results in the same order.
+
+        Overlapping windows are merged and looked up once, and each
+        celebrity is matched once per merged window.
+        """
+
+        curDateTimes = [str2dateTime(d, t) for d, t, _ in searches]
+        celebNamesList = [splitCelebs(c) for _, _, c in searches]
+        windows = [getSearchWindow(d) for d in curDateTimes]
+        results = [None] * len(searches)
+
+        for lowerDateTime, upperDateTime, indices in \
+                mergeSearchWindows(windows):
+            celebNames = list(collections.OrderedDict.fromkeys(
+                c for i in indices for c in celebNamesList[i]))
+            scheduleItems = list(self._findScheduleRange(
+                lowerDateTime, upperDateTime, celebNames))
+            celebItems = self._matchCelebs(scheduleItems, celebNames)
+
+            # Narrowed down to each search's window as searchSchedule() does
+            for i in indices:
+                lower, upper = windows[i]
+                results[i] = formatSearchResults(celebNamesList[i], {
+                    c: filterSearchWindow(celebItems[c], lower, upper)
+                    for c in celebNamesList[i]
+                })
 
         return results
 
-    def _searchSchedule(self, dateStr, timeStr):
+    def searchScheduleRange(self, celebs, lowerDateTime, upperDateTime,
+                            limit=0, channelIds=None, mainCategory=None):
+        """
+        Search TV schedule items the celebrities appear in within given
+        dateTime range, up to limit items per celebrity if limit is given.
+        Results are yielded per celebrity as they are found, with items
+        sorted by dateTime.
+        """
+
+        for celeb in splitCelebs(celebs):
+            scheduleItems = self._findCelebAppearances(
+                celeb, lowerDateTime, upperDateTime, channelIds, mainCategory)
+
+            if limit:
+                scheduleItems = itertools.islice(scheduleItems, limit)
+
+            scheduleItems = list(scheduleItems)
+
+            if scheduleItems:
+                yield {"celebrity": celeb,
+                       "scheduleItems": {celeb: scheduleItems}}
+
+    def searchScheduleOnAir(self, dateStr, timeStr, celebs, channelIds=None,
+                            mainCategory=None):
         """
-        Search schedule with given parameters.
+        Search TV schedule on air at given date and time, optionally only on
+        given channels and of given main category.
         """
 
+        celebNames = splitCelebs(celebs)
         curDateTime = str2dateTime(dateStr, timeStr)
-        lowerDateTime = curDateTime - datetime.timedelta(minutes=30)
-        upperDateTime = curDateTime + datetime.timedelta(hours=1)
+
+        if self._scheduleIndex:
+            scheduleItems = self._scheduleIndex.findOnAir(
+                curDateTime, channelIds, mainCategory)
+        else:
+            query = getOnAirQuery(curDateTime)
+            self._addParticipantsFilter(query, celebNames)
+            addScheduleFilter(query, channelIds, mainCategory)
+            scheduleItems = list(delDateTimeId(self._scheduleColl.find(query)))
+
+        celebItems = self._matchCelebs(scheduleItems, celebNames)
+
+        return formatSearchResults(celebNames, celebItems)
+
+    def _matchCelebs(self, scheduleItems, celebNames):
+        """
+        Group schedule items by celebrities appearing in them.
+        """
+
+        isCelebOnAir = self._makeCelebMatcher(scheduleItems)
+        celebItems = {}
+
+        for celeb in celebNames:
+            celebItems[celeb] = [s for s in scheduleItems
+                                 if isCelebOnAir(celeb, s)]
+
+        return celebItems
+
+    def _searchSchedule(self, curDateTime, celebNames=None, channelIds=None,
+                        mainCategory=None):
+        """
+        Search schedule around given dateTime.
+        """
+
+        lowerDateTime, upperDateTime = getSearchWindow(curDateTime)
+
+        return list(self._findScheduleRange(lowerDateTime, upperDateTime,
+                                            celebNames, channelIds,
+                                            mainCategory))
+
+    def _findScheduleRange(self, lowerDateTime, upperDateTime,
+                           celebNames=None, channelIds=None,
+                           mainCategory=None):
+        """
+        Find schedule items within given dateTime range.
+        """
+
+        if self._scheduleIndex:
+            return self._scheduleIndex.findRange(lowerDateTime, upperDateTime,
+                                                 channelIds, mainCategory)
+
         query = {
             "dateTime": {"$gte": lowerDateTime, "$lte": upperDateTime}
         }
+        self._addParticipantsFilter(query, celebNames)
+        addScheduleFilter(query, channelIds, mainCategory)
 
         scheduleItems = self._scheduleColl.find(query)
 
-        return scheduleItems
+        return delDateTimeId(scheduleItems)
 
-    def _searchEpisodes(self, programId, episodeNum, celeb):
+    def _findCelebAppearances(self, celeb, lowerDateTime, upperDateTime,
+                              channelIds=None, mainCategory=None):
         """
-        Search episodes with given paremeters.
+        Find schedule items the celebrity appears in within given dateTime
+        range in dateTime order.
         """
 
+        appearancesFrom = self._appearancesFrom
+
+        if self._appearancesSearch and appearancesFrom and \
+                lowerDateTime >= appearancesFrom:
+            result = self._appearancesColl.find_one({"_id": celeb})
+            entries = result["entries"] if result else []
+
+            return (delDateTime(e) for e in entries
+                    if lowerDateTime <= e["dateTime"] <= upperDateTime and
+                    isScheduleFilterMatch(e, channelIds, mainCategory))
+
         query = {
-            "programId": programId,
-            "episodeNum": episodeNum,
+            "dateTime": {"$gte": lowerDateTime, "$lte": upperDateTime}
         }
+        addScheduleFilter(query, channelIds, mainCategory)
+
+        if self._participantsSearch and not self._scheduleIndex:
+            query["participants"] = celeb
+            scheduleItems = self._scheduleColl.find(query).sort(
+                "dateTime", pymongo.ASCENDING)
+
+            return delDateTimeId(scheduleItems)
+
+        # Look up only the programs and episodes of the celebrity
+        episodeKeys, programIds = self._getCelebAppearanceKeys(celeb)
 
-        episodeItems = self._episodeColl.find(query)
+        def isCelebOnAir(scheduleItem):
+            programId = scheduleItem.get("programId")
+            episodeNum = scheduleItem.get("episodeNum")
+
+            if episodeNum:
+                return (programId, episodeNum) in episodeKeys
+
+            return programId in programIds
+
+        if self._scheduleIndex:
+            scheduleItems = self._scheduleIndex.findPrograms(
+                programIds | {k[0] for k in episodeKeys}, lowerDateTime,
+                upperDateTime, channelIds, mainCategory)
+
+            return filter(isCelebOnAir, scheduleItems)
+
+        conditions = []
+
+        if programIds:
+            conditions.append({"programId": {"$in": list(programIds)},
+                               "episodeNum": {"$in": ["", None]}})
+
+        if episodeKeys:
+            conditions.append({
+                "programId": {"$in": list({k[0] for k in episodeKeys})},
+                "episodeNum": {"$in": list({k[1] for k in episodeKeys})}
+            })
+
+        if not conditions:
+            return iter(())
+
+        query["$or"] = conditions
+        scheduleItems = self._scheduleColl.find(query).sort(
+            "dateTime", pymongo.ASCENDING)
+
+        return filter(isCelebOnAir, delDateTimeId(scheduleItems))
+
+    def _getCelebAppearanceKeys(self, celeb):
+        """
+        Get (programId, episodeNum) pairs of the episodes the celebrity
+        guests in and IDs of the programs the celebrity is cast in.
+        """
+
+        if self._celebIndex:
+            return set(self._celebIndex.getEpisodeKeys(celeb)), \
+                set(self._celebIndex.getProgramIds(celeb))
+
+        episodeItems = self._episodeColl.find(
+            {"guests": celeb}, {"programId": True, "episodeNum": True})
+        programItems = self._programsColl.find(
+            {"cast": celeb}, {"programId": True})
+        episodeKeys = {(e["programId"], e["episodeNum"])
+                       for e in episodeItems}
+        programIds = {p["programId"] for p in programItems}
+
+        return episodeKeys, programIds
+
+    def _addParticipantsFilter(self, query, celebNames):
+        """
+        Narrow schedule query down to given celebrities when participants
+        are embedded.
+        """
+
+        if self._participantsSearch and celebNames:
+            query["participants"] = {"$in": celebNames}
+
+    def _makeCelebMatcher(self, scheduleItems):
+        """
+        Make a function telling whether a celebrity appears in a schedule
+        item, fetching all the needed episodes and programs at once.
+        """
+
+        if self._participantsSearch:
+            return isParticipant
+
+        if self._celebIndex:
+            return self._makeCelebIndexMatcher()
+
+        episodeKeys = set()
+        programIds = set()
+
+        for scheduleItem in scheduleItems:
+            programId = scheduleItem.get("programId")
+            episodeNum = scheduleItem.get("episodeNum")
+
+            if episodeNum:
+                episodeKeys.add((programId, episodeNum))
+            else:
+                programIds.add(programId)
+
+        episodeGuests = self._searchEpisodes(episodeKeys)
+        programCast = self._searchPrograms(programIds)
+
+        def isCelebOnAir(celeb, scheduleItem):
+            programId = scheduleItem.get("programId")
+            episodeNum = scheduleItem.get("episodeNum")
+
+            if episodeNum:
+                return celeb in episodeGuests.get((programId, episodeNum), ())
+
+            return celeb in programCast.get(programId, ())
+
+        return isCelebOnAir
+
+    def _makeCelebIndexMatcher(self):
+        """
+        Make a celebrity matcher backed by the celebrity index.
+        """
+
+        celebIndex = self._celebIndex
+
+        def isCelebOnAir(celeb, scheduleItem):
+            programId = scheduleItem.get("programId")
+            episodeNum = scheduleItem.get("episodeNum")
+
+            if episodeNum:
+                return celebIndex.hasEpisodeGuest(celeb, programId,
+                                                  episodeNum)
+
+            return celebIndex.hasProgramCast(celeb, programId)
+
+        return isCelebOnAir
+
+    def _searchEpisodes(self, episodeKeys):
+        """
+        Search episodes for given (programId, episodeNum) pairs and return
+        their guests.
+        """
+
+        episodeGuests = collections.defaultdict(set)
+
+        if not episodeKeys:
+            return episodeGuests
+
+        query = {
+            "programId": {"$in": list({k[0] for k in episodeKeys})},
+            "episodeNum": {"$in": list({k[1] for k in episodeKeys})}
+        }
+        projection = {"programId": True, "episodeNum": True, "guests": True}
+
+        episodeItems = self._episodeColl.find(query, projection)
 
         for episodeItem in episodeItems:
-            if celeb in episodeItem["guests"]:
-                return True
+            episodeKey = (episodeItem["programId"], episodeItem["episodeNum"])
+
+            if episodeKey in episodeKeys:
+                episodeGuests[episodeKey].update(episodeItem["guests"])
 
-        return False
+        return episodeGuests
 
-    def _searchPrograms(self, programId, celeb):
+    def _searchPrograms(self, programIds):
         """
-        Search programs witn given parameters.
+        Search programs for given program IDs and return their cast.
         """
 
+        programCast = collections.defaultdict(set)
+
+        if not programIds:
+            return programCast
+
         query = {
-            "programId": programId,
+            "programId": {"$in": list(programIds)}
         }
+        projection = {"programId": True, "cast": True}
 
-        programItems = self._programsColl.find(query)
+        programItems = self._programsColl.find(query, projection)
 
         for programItem in programItems:
-            if celeb in programItem["cast"]:
-                return True
+            programCast[programItem["programId"]].update(programItem["cast"])
 
-        return False
+        return programCast
 
-    def listSchedule(self, dateStr, dateRange):
+    def listSchedule(self, dateStr, dateRange, channelIds=None,
+                     mainCategory=None):
         """
-        Return TV schedule for given date.
+        Return TV schedule for given date, optionally only on given channels
+        and of given main category.
         """
 
         if dateRange == "day":
-            query = {
-                "date": dateStr
-            }
+            if self._scheduleIndex:
+                return self._scheduleIndex.findDate(dateStr, channelIds,
+                                                    mainCategory)
+
+            query = getListQuery(dateStr, dateRange, channelIds,
+                                 mainCategory)
             scheduleItems = self._scheduleColl.find(query)
-        else:
-            sunDateTime, satDateTime = getThisWeekSunSatDateTime(dateStr)
+
+            return delDateTimeId(scheduleItems)
+
+        sunDateTime, satDateTime = getThisWeekSunSatDateTime(dateStr)
+
+        return self._findScheduleRange(sunDateTime, satDateTime, None,
+                                       channelIds, mainCategory)
+
+    def listSchedulePage(self, dateStr, dateRange, limit=0, after=None,
+                         fields=None, channelIds=None, mainCategory=None):
+        """
+        Return TV schedule for given date ordered by dateTime, starting after
+        the position of given cursor and holding up to limit items, along
+        with the cursor of the next page.
+        """
+
+        query = getListQuery(dateStr, dateRange, channelIds, mainCategory)
+
+        # Keyset pagination on the (dateTime, _id) index
+        if after:
+            afterDateTime, afterId = decodeListCursor(after)
             query = {
-                "dateTime": {"$gte": sunDateTime, "$lte": satDateTime}
+                "$and": [
+                    query,
+                    {"$or": [{"dateTime": {"$gt": afterDateTime}},
+                             {"dateTime": afterDateTime,
+                              "_id": {"$gt": afterId}}]}
+                ]
             }
-            scheduleItems = self._scheduleColl.find(query)
 
-        return delDateTimeId(scheduleItems)
+        projection = None
+
+        if fields:
+            projection = dict.fromkeys(fields, True)
+            projection["dateTime"] = True
+
+        scheduleItems = self._scheduleColl.find(query, projection).sort(
+            [("dateTime", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+
+        if limit:
+            scheduleItems = scheduleItems.limit(limit+1)
+
+        scheduleItems = list(scheduleItems)
+        nextCursor = None
+
+        if limit and len(scheduleItems) > limit:
+            scheduleItems = scheduleItems[:limit]
+            lastItem = scheduleItems[-1]
+            nextCursor = encodeListCursor(lastItem["dateTime"],
+                                          lastItem["_id"])
+
+        return list(delDateTimeId(scheduleItems)), nextCursor
+
+    def suggestCelebrities(self, query, limit):
+        """
+        Return celebrities whose names start with query.
+        """
+
+        if self._celebSuggest:
+            return self._celebSuggest.suggest(query, limit)
+
+        if not query.strip():
+            return []
+
+        projection = {"_id": False, "name": True, "appearCount": True}
+        celebItems = self._celebritiesColl.find(getSuggestQuery(query),
+                                                projection)
+        celebItems = celebItems.sort("appearCount",
+                                     pymongo.DESCENDING).limit(limit)
 
-    def listCelebrities(self, topN):
+        return list(celebItems)
+
+    def listOnAirNow(self, curDateTime):
         """
-        Return celebrity items.
+        Return the items airing on every channel at given dateTime, sorted
+        by channel.
         """
 
+        if self._slotTable:
+            return self._slotTable.findNow(curDateTime)
+
+        chanItems = {}
+        scheduleItems = self._scheduleColl.find(getOnAirQuery(curDateTime))
+
+        # The latest starting item wins where air times overlap
+        for scheduleItem in scheduleItems.sort("dateTime",
+                                               pymongo.ASCENDING):
+            scheduleItem.setdefault("participants", [])
+            chanItems[scheduleItem["channelId"]] = scheduleItem
+
+        return list(delDateTimeId(chanItems[c] for c in sorted(chanItems)))
+
+    def listCelebrities(self, topN, category=None, period=None):
+        """
+        Return celebrity items, optionally of given program category and
+        month period such as "201410".
+        """
+
+        # Databases ingested before deltas were written miss some
+        if self._leaderboard and self._leaderboard.isComplete() and \
+                topN <= LEADERBOARD_SIZE:
+            return self._leaderboard.getTop(topN, category, period)
+
+        if category or period:
+            raise RuntimeError("Celebrity leaderboard is not available")
+
         celebItems = \
             self._celebritiesColl.find().sort("appearCount",
                                               pymongo.DESCENDING).limit(topN)
@@ -193,54 +875,268 @@ class ScheduleSearch(Resource):
 
     @swagger.operation(
         summary=u"방송 편성표 검색",
-        parameters=[
-            {
-                "name": "date",
-                "description": u"날짜(YYYYMMDD)",
-                "dataType": "string",
-                "paramType": "query",
-                "required": True
-            },
-            {
-                "name": "time",
-                "description": u"시간(HHMM)",
-                "dataType": "string",
-                "paramType": "query",
-                "required": True
-            },
-            {
-                "name": "celebs",
-                "description": u"출연자(여러 명일 경우 '|'로 구분)",
-                "dataType": "string",
-                "paramType": "query",
-                "required": True
-            }
-        ]
+        parameters=SEARCH_PARAMS
     )
     def get(self):
         """
         주어진 시간과 날짜, 그리고 연예인 목록을 기준으로 방송 편성 정보를 검색한다.
         """
 
+        etag = makeRequestETag("search", {
+            c: self._db.getGeneration(c)
+            for c in ["schedule", "episodes", "programs"]
+        })
+
+        if isNotModified(etag):
+            return notModifiedResponse(etag)
+
         parser = reqparse.RequestParser()
         parser.add_argument("date", type=str, location="args")
         parser.add_argument("time", type=str, location="args")
         parser.add_argument("celebs", type=str, location="args")
+        parser.add_argument("mode", type=str, location="args",
+                            default="window")
+        parser.add_argument("endDate", type=str, location="args")
+        parser.add_argument("count", type=int, location="args", default=10)
+        parser.add_argument("stream", type=str, location="args")
+        parser.add_argument("channelIds", type=str, location="args")
+        parser.add_argument("mainCategory", type=str, location="args")
         args = parser.parse_args()
         dateStr = args["date"]
         timeStr = args["time"]
         celebs = urllib.parse.unquote(args["celebs"], encoding="utf-8")
+        mode = args["mode"]
+        channelIds = args["channelIds"]
+        mainCategory = args["mainCategory"]
+
+        if channelIds is not None:
+            try:
+                channelIds = parseChannelIds(channelIds)
+            except ValueError as e:
+                data = {"error": "{}".format(e)}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        if mode in ["range", "next"]:
+            return self._searchRange(dateStr, timeStr, celebs, mode, args,
+                                     etag, channelIds, mainCategory)
+
+        if mode == "window":
+            records = self._db.searchSchedule(dateStr, timeStr, celebs,
+                                              channelIds, mainCategory)
+        elif mode == "onair":
+            records = self._db.searchScheduleOnAir(dateStr, timeStr, celebs,
+                                                   channelIds, mainCategory)
+        else:
+            data = {"error": "Invalid mode: {}".format(mode)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
 
-        records = self._db.searchSchedule(dateStr, timeStr, celebs)
         data = {"data": records}
 
+        return data, 200, {"Access-Control-Allow-Origin": "*", "ETag": etag}
+
+    def _searchRange(self, dateStr, timeStr, celebs, mode, args, etag,
+                     channelIds=None, mainCategory=None):
+        """
+        Search appearances from given date and time until endDate, or the
+        next count appearances.
+        """
+
+        try:
+            lowerDateTime = str2dateTime(dateStr, timeStr)
+        except (TypeError, ValueError):
+            data = {"error": "Invalid date and time: {} {}".format(dateStr,
+                                                                   timeStr)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        limit = 0
+
+        if mode == "range":
+            try:
+                validateDate(args["endDate"])
+                upperDateTime = str2dateTime(args["endDate"], "2359")
+            except (TypeError, ValueError):
+                data = {"error": "Invalid endDate: {}".format(args["endDate"])}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+            if not lowerDateTime <= upperDateTime <= \
+                    lowerDateTime + MAX_SEARCH_RANGE:
+                data = {"error": "endDate must be within {} days from "
+                                 "date".format(MAX_SEARCH_RANGE.days)}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+        else:
+            limit = args["count"]
+
+            if not 0 < limit <= MAX_NEXT_COUNT:
+                data = {"error": "Invalid count: {}".format(limit)}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+            upperDateTime = lowerDateTime + MAX_SEARCH_RANGE
+
+        records = self._db.searchScheduleRange(celebs, lowerDateTime,
+                                               upperDateTime, limit,
+                                               channelIds, mainCategory)
+
+        if args["stream"] in ["true", "1"]:
+            return makeStreamingJsonResponse(records, etag)
+
+        data = {"data": list(records)}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*", "ETag": etag}
+
+
+class ScheduleNow(Resource):
+
+    """
+    TV schedule on air now class.
+    """
+
+    @classmethod
+    def make(cls, db):
+        """
+        Make db.
+        """
+
+        cls._db = db
+        return cls
+
+    @swagger.operation(
+        summary=u"지금 방송 중인 프로그램 보기",
+        parameters=NOW_PARAMS
+    )
+    def get(self):
+        """
+        주어진 시각(기본값은 현재 시각)에 모든 채널에서 방송 중인 프로그램과 출연자를 보인다.
+        """
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("date", type=str, location="args")
+        parser.add_argument("time", type=str, location="args")
+        args = parser.parse_args()
+        dateStr = args["date"]
+        timeStr = args["time"]
+
+        if dateStr or timeStr:
+            try:
+                if not (dateStr and timeStr):
+                    raise ValueError("date and time are required together")
+
+                validateDate(dateStr)
+
+                if len(timeStr) != 4 or not timeStr.isdigit():
+                    raise ValueError("Invalid time: {}".format(timeStr))
+
+                curDateTime = str2dateTime(dateStr, timeStr)
+            except (TypeError, ValueError) as e:
+                data = {"error": "{}".format(e)}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+        else:
+            curDateTime = datetime.datetime.now()
+
+        # Responses only change with the slot and the schedule
+        slotStr = getSlotStartDateTime(curDateTime).strftime("%Y%m%d%H%M")
+        etag = makeRequestETag("now", {
+            "schedule": self._db.getGeneration("schedule"),
+            "slot": slotStr
+        })
+
+        if isNotModified(etag):
+            return notModifiedResponse(etag)
+
+        data = {"data": self._db.listOnAirNow(curDateTime)}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*", "ETag": etag}
+
+
+class ScheduleWatch(Resource):
+
+    """
+    TV schedule watchlist notification class.
+    """
+
+    @classmethod
+    def make(cls, notifier):
+        """
+        Make notifier.
+        """
+
+        cls._notifier = notifier
+        return cls
+
+    @swagger.operation(
+        summary=u"연예인 출연 방송 시작 알림 받기",
+        parameters=WATCH_PARAMS
+    )
+    def get(self):
+        """
+        주어진 연예인이 출연하는 프로그램이 시작하기 몇 분 전마다 server-sent events로 알린다.
+        """
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("celebs", type=str, location="args")
+        args = parser.parse_args()
+
+        if not args["celebs"]:
+            data = {"error": "celebs is required"}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        celebs = urllib.parse.unquote(args["celebs"], encoding="utf-8")
+        celebNames = [c for c in splitCelebs(celebs) if c]
+
+        if not 0 < len(celebNames) <= MAX_WATCH_CELEBS:
+            data = {"error": "celebs must have 1 to {} "
+                             "names".format(MAX_WATCH_CELEBS)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        subscriber = self._notifier.subscribe(celebNames)
+
+        # Every stream holds a thread; keep the rest for other requests
+        if subscriber is None:
+            data = {"error": "Too many watchers, try again later"}
+            return data, 503, {"Access-Control-Allow-Origin": "*",
+                               "Retry-After": "60"}
+
+        headers = {
+            "Access-Control-Allow-Origin": "*",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+
+        return Response(self._notifier.streamEvents(subscriber), status=200,
+                        mimetype="text/event-stream", headers=headers)
+
+
+class WatchStats(Resource):
+
+    """
+    Watchlist statistics class.
+    """
+
+    @classmethod
+    def make(cls, notifier):
+        """
+        Make notifier.
+        """
+
+        cls._notifier = notifier
+        return cls
+
+    @swagger.operation(
+        summary=u"출연 알림 상태 보기"
+    )
+    def get(self):
+        """
+        출연 알림을 기다리는 연예인과 구독자 수, 타이머 휠에 올라간 방송 편성 수를 보인다.
+        """
+
+        data = {"data": self._notifier.getStats()}
+
         return data, 200, {"Access-Control-Allow-Origin": "*"}
 
 
-class ScheduleList(Resource):
+class ScheduleBatchSearch(Resource):
 
     """
-    TV schedule list class.
+    TV schedule batch search class.
     """
 
     @classmethod
@@ -252,36 +1148,111 @@ class ScheduleList(Resource):
         cls._db = db
         return cls
 
+    @swagger.operation(
+        summary=u"방송 편성표 일괄 검색",
+        parameters=BATCH_PARAMS
+    )
+    def post(self):
+        """
+        여러 개의 날짜, 시간, 연예인 목록으로 방송 편성 정보를 한 번에 검색하여 요청 순서대로 보인다.
+        """
+
+        body = request.get_json(force=True, silent=True) or {}
+        searches = body.get("searches") if isinstance(body, dict) else None
+
+        if not isinstance(searches, list) or \
+                not 0 < len(searches) <= MAX_BATCH_SIZE:
+            data = {"error": "searches must be a list of 1 to {} "
+                             "searches".format(MAX_BATCH_SIZE)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        params = []
+
+        for i, search in enumerate(searches):
+            try:
+                if not isinstance(search, dict) or \
+                        not all(isinstance(search.get(k), str)
+                                for k in ["date", "time", "celebs"]):
+                    raise ValueError("date, time and celebs are required")
+
+                dateStr = search["date"]
+                timeStr = search["time"]
+                celebs = search["celebs"]
+                validateDate(dateStr)
+
+                if len(timeStr) != 4 or not timeStr.isdigit():
+                    raise ValueError("Invalid time: {}".format(timeStr))
+
+                str2dateTime(dateStr, timeStr)
+                params.append((dateStr, timeStr, celebs.strip()))
+            except ValueError as e:
+                data = {"error": "Invalid search {}: {}".format(i, e)}
+                return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        data = {"data": self._db.searchScheduleBatch(params)}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+
+class ScheduleList(Resource):
+
+    """
+    TV schedule list class.
+    """
+
+    @classmethod
+    def make(cls, db, cacheSize=0, cacheTtl=0, gzipMinSize=0):
+        """
+        Make db and response cache. Cached bodies of at least gzipMinSize
+        bytes are kept compressed as well.
+        """
+
+        cls._db = db
+        cls._cache = LRUCache(cacheSize, cacheTtl)
+        cls._gzipMinSize = gzipMinSize
+        return cls
+
+    @classmethod
+    def getCacheStats(cls):
+        """
+        Return response cache statistics.
+        """
+
+        return cls._cache.getStats()
+
     @swagger.operation(
         summary=u"방송 편성 정보 보기",
-        parameters=[
-            {
-                "name": "date",
-                "description": u"날짜. YYYYMMDD 형식으로 입력",
-                "dataType": "string",
-                "paramType": "query",
-                "required": True
-            },
-            {
-                "name": "range",
-                "description": u"범위. 'day' 또는 'week'로 지정.",
-                "dataType": "string",
-                "paramType": "query",
-                "required": True
-            }
-       ]
+        parameters=LIST_PARAMS
     )
     def get(self):
         """
         주어진 날짜의 방송 편성 정보를 보인다.
         """
 
+        generation = self._db.getGeneration("schedule")
+        etag = makeRequestETag("list", {"schedule": generation})
+
+        if isNotModified(etag):
+            return notModifiedResponse(etag)
+
         parser = reqparse.RequestParser()
         parser.add_argument("date", type=str, location="args")
         parser.add_argument("range", type=str, location="args")
+        parser.add_argument("stream", type=str, location="args")
+        parser.add_argument("limit", type=int, location="args")
+        parser.add_argument("after", type=str, location="args")
+        parser.add_argument("fields", type=str, location="args")
+        parser.add_argument("channelIds", type=str, location="args")
+        parser.add_argument("mainCategory", type=str, location="args")
         args = parser.parse_args()
         dateStr = args["date"]
         dateRange = args["range"]
+        stream = args["stream"] in ["true", "1"]
+        limit = args["limit"]
+        after = args["after"]
+        fields = args["fields"]
+        channelIds = args["channelIds"]
+        mainCategory = args["mainCategory"]
 
         try:
             validateDate(dateStr)
@@ -293,10 +1264,76 @@ class ScheduleList(Resource):
             data = {"error": "Invalid range: {}".format(dateRange)}
             return data, 200, {"Access-Control-Allow-Origin": "*"}
 
-        records = self._db.listSchedule(dateStr, dateRange)
-        data = {"data": list(records)}
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            data = {"error": "Invalid limit: {}".format(limit)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
 
-        return data, 200, {"Access-Control-Allow-Origin": "*"}
+        paged = limit or after or fields
+
+        if paged and not self._db.supportsPaging:
+            data = {"error": "limit, after and fields are not supported by "
+                             "the storage"}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        try:
+            if fields:
+                fields = parseFields(fields)
+            if channelIds is not None:
+                channelIds = parseChannelIds(channelIds)
+        except ValueError as e:
+            data = {"error": "{}".format(e)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        if stream and not paged:
+            records = self._db.listSchedule(dateStr, dateRange, channelIds,
+                                            mainCategory)
+            return makeStreamingJsonResponse(records, etag)
+
+        # Cached responses of older data generations are never hit again
+        cacheKey = (dateStr, dateRange, limit, after,
+                    tuple(fields) if fields else None,
+                    tuple(channelIds) if channelIds else None, mainCategory,
+                    generation)
+        cached = self._cache.get(cacheKey)
+
+        if cached:
+            body, gzipBody = cached
+        else:
+            if paged:
+                try:
+                    records, nextCursor = self._db.listSchedulePage(
+                        dateStr, dateRange, limit, after, fields, channelIds,
+                        mainCategory)
+                except ValueError as e:
+                    data = {"error": "{}".format(e)}
+                    return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+                data = {"data": records}
+
+                if limit:
+                    data["next"] = nextCursor
+            else:
+                records = self._db.listSchedule(dateStr, dateRange,
+                                                channelIds, mainCategory)
+                data = {"data": list(records)}
+
+            body = dumpJson(data)
+            gzipBody = compressBody(body, self._gzipMinSize)
+
+            # A body built while the schedule changed may mix generations
+            if self._db.getGeneration("schedule") == generation:
+                self._cache.put(cacheKey, (body, gzipBody))
+
+        response = makeJsonResponse(body, etag)
+
+        # Compressed once when cached instead of on every hit
+        if gzipBody:
+            if acceptsGzip():
+                setGzipBody(response, gzipBody)
+            else:
+                response.vary.add("Accept-Encoding")
+
+        return response
 
 
 class CelebritiesList(Resource):
@@ -316,31 +1353,178 @@ class CelebritiesList(Resource):
 
     @swagger.operation(
         summary=u"방송 출연 유명인 보기",
-        parameters=[
-            {
-                "name": "topN",
-                "description": u"출연 횟수 기준 결과 수 지정, 최대 100.",
-                "dataType": "integer",
-                "paramType": "query",
-                "required": True
-            }
-       ]
+        parameters=CELEBRITIES_PARAMS
     )
     def get(self):
         """
         방송 출연 유명인의 목록을 출연 빈도순으로 보인다.
         """
 
+        etag = makeRequestETag("celebrities", {
+            "celebrities": self._db.getGeneration("celebrities")
+        })
+
+        if isNotModified(etag):
+            return notModifiedResponse(etag)
+
         parser = reqparse.RequestParser()
         parser.add_argument("topN", type=int, location="args")
+        parser.add_argument("category", type=str, location="args")
+        parser.add_argument("period", type=str, location="args")
         args = parser.parse_args()
         topN = args["topN"]
+        category = args["category"]
+        period = args["period"]
+
+        if category:
+            category = urllib.parse.unquote(category, encoding="utf-8")
 
         if topN > 100:
             data = {"error": "Invalid topN: {}".format(topN)}
             return data, 200, {"Access-Control-Allow-Origin": "*"}
 
-        records = self._db.listCelebrities(topN)
+        if period and not (len(period) == 6 and period.isdigit()):
+            data = {"error": "Invalid period: {}".format(period)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        try:
+            records = self._db.listCelebrities(topN, category, period)
+        except RuntimeError as e:
+            data = {"error": "{}".format(e)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
         data = {"data": list(records)}
 
+        return data, 200, {"Access-Control-Allow-Origin": "*", "ETag": etag}
+
+
+class CelebritiesSuggest(Resource):
+
+    """
+    Celebrity name suggestion class.
+    """
+
+    @classmethod
+    def make(cls, db):
+        """
+        Make db.
+        """
+
+        cls._db = db
+        return cls
+
+    @swagger.operation(
+        summary=u"유명인 이름 자동 완성",
+        parameters=SUGGEST_PARAMS
+    )
+    def get(self):
+        """
+        주어진 글자나 초성으로 시작하는 유명인을 출연 빈도순으로 보인다.
+        """
+
+        etag = makeRequestETag("suggest", {
+            "celebrities": self._db.getGeneration("celebrities")
+        })
+
+        if isNotModified(etag):
+            return notModifiedResponse(etag)
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("q", type=str, location="args", default="")
+        parser.add_argument("limit", type=int, location="args", default=10)
+        args = parser.parse_args()
+        query = urllib.parse.unquote(args["q"], encoding="utf-8")
+        limit = args["limit"]
+
+        if not 0 < limit <= SUGGEST_TOP_K:
+            data = {"error": "Invalid limit: {}".format(limit)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        try:
+            records = self._db.suggestCelebrities(query, limit)
+        except RuntimeError as e:
+            data = {"error": "{}".format(e)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        data = {"data": records}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*", "ETag": etag}
+
+
+class CelebIndexStatus(Resource):
+
+    """
+    Celebrity index status class.
+    """
+
+    @classmethod
+    def make(cls, db):
+        """
+        Make db.
+        """
+
+        cls._db = db
+        return cls
+
+    @swagger.operation(
+        summary=u"유명인 색인 상태 보기"
+    )
+    def get(self):
+        """
+        메모리에 적재된 유명인 색인의 크기를 보인다.
+        """
+
+        data = {"data": self._db.getCelebIndexStats()}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+    @swagger.operation(
+        summary=u"유명인 색인 갱신"
+    )
+    def post(self):
+        """
+        새로 적재된 에피소드와 프로그램을 유명인 색인에 추가한다.
+        """
+
+        try:
+            self._db.refreshCelebIndex()
+        except RuntimeError as e:
+            data = {"error": "{}".format(e)}
+            return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+        data = {"data": self._db.getCelebIndexStats()}
+
+        return data, 200, {"Access-Control-Allow-Origin": "*"}
+
+
+class CacheStats(Resource):
+
+    """
+    Cache statistics class.
+    """
+
+    @classmethod
+    def make(cls, db):
+        """
+        Make db.
+        """
+
+        cls._db = db
+        return cls
+
+    @swagger.operation(
+        summary=u"캐시 상태 보기"
+    )
+    def get(self):
+        """
+        편성표 검색과 보기 캐시의 크기와 적중 횟수를 보인다.
+        """
+
+        data = {
+            "data": {
+                "search": self._db.getSearchCacheStats(),
+                "list": ScheduleList.getCacheStats()
+            }
+        }
+
         return data, 200, {"Access-Control-Allow-Origin": "*"}
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+
+import bisect
+import datetime
+from .intervaltree import IntervalTree
+
+
+_MINUTES_PER_WEEK = 7 * 24 * 60
+
+# Air time assumed for items whose end is unknown
+DEFAULT_DURATION = datetime.timedelta(hours=1)
+
+
+def getWeekStartDateTime(dateTime):
+    """
+    Get the dateTime of Sunday midnight of the week given dateTime belongs.
+    """
+
+    sunDate = dateTime.date() - \
+        datetime.timedelta(days=dateTime.isoweekday() % 7)
+
+    return datetime.datetime(sunDate.year, sunDate.month, sunDate.day)
+
+
+def getMinuteOfWeek(dateTime, weekStartDateTime):
+    """
+    Get minutes elapsed since the start of the week.
+    """
+
+    return int((dateTime - weekStartDateTime).total_seconds()) // 60
+
+
+def isScheduleFilterMatch(scheduleItem, channelIds=None, mainCategory=None):
+    """
+    Check if schedule item is on one of given channels and of given main
+    category. Missing filters match every item.
+    """
+
+    if channelIds and scheduleItem["channelId"] not in channelIds:
+        return False
+
+    if mainCategory and scheduleItem.get("mainCategory") != mainCategory:
+        return False
+
+    return True
+
+
+class _ChanBucket(object):
+
+    """
+    Schedule items of a channel in a week sorted by minute of the week.
+    """
+
+    def __init__(self):
+        """
+        Initialize members.
+        """
+
+        self.minutes = []
+        self.items = []
+
+
+class _ProgramBucket(object):
+
+    """
+    Schedule items of a program sorted by dateTime.
+    """
+
+    def __init__(self):
+        """
+        Initialize members.
+        """
+
+        self.dateTimes = []
+        self.items = []
+
+
+class ScheduleIndex(object):
+
+    """
+    In-memory schedule index class.
+
+    Schedule items are bucketed by week and channel and kept sorted by minute
+    of the week, so time range lookups are served with bisect. They are also
+    bucketed by program for looking up the airings of given programs. Air time
+    intervals are kept in an interval tree for on-air lookups. rebuild()
+    builds a complete new index before swapping it in, so readers never see
+    a partially built index.
+    """
+
+    def __init__(self, scheduleColl):
+        """
+        Initialize members and build the index.
+        """
+
+        self._scheduleColl = scheduleColl
+        self.rebuild()
+
+    def setColl(self, scheduleColl):
+        """
+        Set collection to build the index from.
+        """
+
+        self._scheduleColl = scheduleColl
+
+    def rebuild(self):
+        """
+        Build the index from the schedule collection and swap it in.
+        """
+
+        weekBuckets = {}
+        programBuckets = {}
+        dateItems = {}
+        intervals = []
+
+        for scheduleItem in self._scheduleColl.find():
+            dateTime = scheduleItem.pop("dateTime")
+            endDateTime = scheduleItem.pop("endDateTime",
+                                           dateTime + DEFAULT_DURATION)
+            del scheduleItem["_id"]
+            intervals.append((dateTime, endDateTime, scheduleItem))
+
+            weekStartDateTime = getWeekStartDateTime(dateTime)
+            chanBuckets = weekBuckets.setdefault(weekStartDateTime, {})
+            chanBucket = chanBuckets.setdefault(scheduleItem["channelId"],
+                                                _ChanBucket())
+            minute = getMinuteOfWeek(dateTime, weekStartDateTime)
+            pos = bisect.bisect_right(chanBucket.minutes, minute)
+            chanBucket.minutes.insert(pos, minute)
+            chanBucket.items.insert(pos, scheduleItem)
+
+            programBucket = programBuckets.setdefault(
+                scheduleItem["programId"], _ProgramBucket())
+            pos = bisect.bisect_right(programBucket.dateTimes, dateTime)
+            programBucket.dateTimes.insert(pos, dateTime)
+            programBucket.items.insert(pos, scheduleItem)
+
+            dateItems.setdefault(scheduleItem["date"], []).append(
+                scheduleItem)
+
+        self._weekBuckets, self._programBuckets, self._dateItems, \
+            self._onAirTree = weekBuckets, programBuckets, dateItems, \
+            IntervalTree(intervals)
+
+    def findRange(self, lowerDateTime, upperDateTime, channelIds=None,
+                  mainCategory=None):
+        """
+        Find schedule items whose dateTime is within given closed range,
+        optionally only on given channels and of given main category.
+        """
+
+        weekBuckets = self._weekBuckets
+        found = []
+        weekStartDateTime = getWeekStartDateTime(lowerDateTime)
+
+        while weekStartDateTime <= upperDateTime:
+            lowerMinute = max(getMinuteOfWeek(lowerDateTime,
+                                              weekStartDateTime), 0)
+            upperMinute = min(getMinuteOfWeek(upperDateTime,
+                                              weekStartDateTime),
+                              _MINUTES_PER_WEEK - 1)
+
+            chanBuckets = weekBuckets.get(weekStartDateTime, {})
+
+            # Only the buckets of the channels asked for are looked at
+            if channelIds:
+                chanBuckets = [chanBuckets[c] for c in set(channelIds)
+                               if c in chanBuckets]
+            else:
+                chanBuckets = chanBuckets.values()
+
+            for chanBucket in chanBuckets:
+                lo = bisect.bisect_left(chanBucket.minutes, lowerMinute)
+                hi = bisect.bisect_right(chanBucket.minutes, upperMinute)
+                found.extend((chanBucket.minutes[i], weekStartDateTime,
+                              chanBucket.items[i]) for i in range(lo, hi))
+
+            weekStartDateTime += datetime.timedelta(days=7)
+
+        found.sort(key=lambda f: (f[1], f[0]))
+
+        return [dict(f[2]) for f in found
+                if isScheduleFilterMatch(f[2], mainCategory=mainCategory)]
+
+    def findPrograms(self, programIds, lowerDateTime, upperDateTime,
+                     channelIds=None, mainCategory=None):
+        """
+        Find schedule items of given programs whose dateTime is within given
+        closed range, optionally only on given channels and of given main
+        category.
+        """
+
+        programBuckets = self._programBuckets
+        found = []
+
+        for programId in set(programIds):
+            programBucket = programBuckets.get(programId)
+
+            if programBucket is None:
+                continue
+
+            lo = bisect.bisect_left(programBucket.dateTimes, lowerDateTime)
+            hi = bisect.bisect_right(programBucket.dateTimes, upperDateTime)
+            found.extend((programBucket.dateTimes[i], programBucket.items[i])
+                         for i in range(lo, hi))
+
+        found.sort(key=lambda f: f[0])
+
+        return [dict(f[1]) for f in found
+                if isScheduleFilterMatch(f[1], channelIds, mainCategory)]
+
+    def findOnAir(self, dateTime, channelIds=None, mainCategory=None):
+        """
+        Find schedule items on air at given dateTime, optionally only on
+        given channels and of given main category.
+        """
+
+        return [dict(s) for s in self._onAirTree.findPoint(dateTime)
+                if isScheduleFilterMatch(s, channelIds, mainCategory)]
+
+    def findDate(self, dateStr, channelIds=None, mainCategory=None):
+        """
+        Find schedule items of given date, optionally only on given channels
+        and of given main category.
+        """
+
+        return [dict(s) for s in self._dateItems.get(dateStr, [])
+                if isScheduleFilterMatch(s, channelIds, mainCategory)]
+
+    def getStats(self):
+        """
+        Return index statistics.
+        """
+
+        return {
+            "weeks": len(self._weekBuckets),
+            "programs": len(self._programBuckets),
+            "items": sum(len(i) for i in self._dateItems.values())
+        }
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import pymongo
+from .scheduleindex import DEFAULT_DURATION
+from .scheduleindex import getWeekStartDateTime
+from .scheduleindex import getMinuteOfWeek
+
+
+SLOT_MINUTES = 5
+SLOTS_PER_WEEK = 7 * 24 * 60 // SLOT_MINUTES
+
+_SLOT = datetime.timedelta(minutes=SLOT_MINUTES)
+
+
+def getSlot(dateTime):
+    """
+    Get the start of the week and the index of the slot given dateTime
+    belongs to.
+    """
+
+    weekStartDateTime = getWeekStartDateTime(dateTime)
+    slot = getMinuteOfWeek(dateTime, weekStartDateTime) // SLOT_MINUTES
+
+    return weekStartDateTime, slot
+
+
+def getSlotStartDateTime(dateTime):
+    """
+    Round dateTime down to the start of its slot.
+    """
+
+    weekStartDateTime, slot = getSlot(dateTime)
+
+    return weekStartDateTime + slot * _SLOT
+
+
+class SlotTable(object):
+
+    """
+    On-air slot table class.
+
+    Every 5-minute slot of each week maps to the items airing on every
+    channel at the start of the slot, or starting within the slot where a
+    channel has a gap, sorted by channel and with participants attached.
+    rebuild() builds a complete new table before swapping it in.
+    """
+
+    def __init__(self, scheduleColl):
+        """
+        Initialize members and build the table.
+        """
+
+        self._scheduleColl = scheduleColl
+        self.rebuild()
+
+    def setColl(self, scheduleColl):
+        """
+        Set collection to build the table from.
+        """
+
+        self._scheduleColl = scheduleColl
+
+    def rebuild(self):
+        """
+        Build the table from the schedule collection and swap it in.
+        """
+
+        chanSlots = {}
+        numItems = 0
+
+        for scheduleItem in self._scheduleColl.find().sort(
+                "dateTime", pymongo.ASCENDING):
+            dateTime = scheduleItem.pop("dateTime")
+            endDateTime = scheduleItem.pop("endDateTime",
+                                           dateTime + DEFAULT_DURATION)
+            del scheduleItem["_id"]
+            scheduleItem.setdefault("participants", [])
+            numItems += 1
+
+            # Later items take over the slots starting within their air time
+            slots = chanSlots.setdefault(scheduleItem["channelId"], {})
+            slotDateTime = getSlotStartDateTime(dateTime)
+
+            if slotDateTime < dateTime:
+                slots.setdefault(getSlot(slotDateTime), scheduleItem)
+                slotDateTime += _SLOT
+
+            while slotDateTime < endDateTime:
+                slots[getSlot(slotDateTime)] = scheduleItem
+                slotDateTime += _SLOT
+
+        weekSlots = {}
+
+        for channelId in sorted(chanSlots):
+            for (weekStartDateTime, slot), scheduleItem in \
+                    chanSlots[channelId].items():
+                if weekStartDateTime not in weekSlots:
+                    weekSlots[weekStartDateTime] = \
+                        [[] for _ in range(SLOTS_PER_WEEK)]
+
+                weekSlots[weekStartDateTime][slot].append(scheduleItem)
+
+        self._weekSlots = {w: [tuple(s) for s in slots]
+                           for w, slots in weekSlots.items()}
+        self._numItems = numItems
+
+    def findNow(self, dateTime):
+        """
+        Find the items airing on every channel in the slot of dateTime.
+        """
+
+        weekStartDateTime, slot = getSlot(dateTime)
+        slots = self._weekSlots.get(weekStartDateTime)
+
+        if slots is None:
+            return []
+
+        return [dict(s) for s in slots[slot]]
+
+    def getStats(self):
+        """
+        Return table statistics.
+        """
+
+        return {
+            "weeks": len(self._weekSlots),
+            "items": self._numItems
+        }
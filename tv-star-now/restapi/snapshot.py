@@ -0,0 +1,612 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import sys
+import mmap
+import time
+import array
+import bisect
+import struct
+import datetime
+import threading
+import ujson
+import pymongo
+from .util import str2dateTime
+from .util import getThisWeekSunSatDateTime
+from .storage import ScheduleStorage
+from .queries import splitCelebs
+from .queries import formatSearchResults
+from .queries import getSearchWindow
+from .scheduleindex import DEFAULT_DURATION
+from .scheduleindex import isScheduleFilterMatch
+from .participants import getParticipants
+from .participants import loadEpisodeGuestsProgramCast
+from .datagen import getGeneration
+
+
+SNAPSHOT_MAGIC = b"TVSNAP\0\0"
+SNAPSHOT_VERSION = 1
+
+# Seconds between checks for a new snapshot file
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Header: magic, version, byte order (1 for little endian), section count
+_HEADER = struct.Struct("<8sIII")
+
+# Section table entry: name, offset, length in bytes
+_SECTION = struct.Struct("<8sQQ")
+
+# int32 fields of a schedule record. Strings are string table indexes,
+# dateTimes are minutes since the epoch and -1 stands for a missing value.
+_DATE_TIME, _END_DATE_TIME, _CHANNEL_ID, _CHANNEL_NAME, _PROGRAM_ID, \
+    _TITLE, _EPISODE_NUM, _DATE, _TIME, _END_DATE, _END_TIME, \
+    _MAIN_CATEGORY, _PARTS_OFFSET, _PARTS_COUNT = range(14)
+_RECORD_SIZE = 14
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MINUTE = datetime.timedelta(minutes=1)
+
+
+def toMinutes(dateTime):
+    """
+    Convert dateTime to minutes since the epoch.
+    """
+
+    return (dateTime - _EPOCH) // _MINUTE
+
+
+def _packInts(values):
+    """
+    Pack integers as int32 values in the native byte order.
+    """
+
+    return array.array("i", values).tobytes()
+
+
+def _getByteOrder():
+    """
+    Get the byte order flag of the running machine.
+    """
+
+    return 1 if sys.byteorder == "little" else 0
+
+
+class _StringTable(object):
+
+    """
+    Sorted table of the strings written to a snapshot.
+    """
+
+    def __init__(self, strings):
+        """
+        Sort the strings and index them.
+        """
+
+        self.strings = sorted(set(strings))
+        self._indexes = {s: i for i, s in enumerate(self.strings)}
+
+    def getIndex(self, string):
+        """
+        Get the index of a string, or -1 for None.
+        """
+
+        if string is None:
+            return -1
+
+        return self._indexes[string]
+
+    def pack(self):
+        """
+        Pack the table into offsets and UTF-8 data sections.
+        """
+
+        data = [s.encode("utf-8") for s in self.strings]
+        offsets = [0]
+
+        for d in data:
+            offsets.append(offsets[-1] + len(d))
+
+        return _packInts(offsets), b"".join(data)
+
+
+def _getStringFields(scheduleItem):
+    """
+    Get the string fields of a schedule item written to a snapshot.
+    """
+
+    return [scheduleItem.get("channelName"), scheduleItem.get("title"),
+            scheduleItem.get("episodeNum") or "", scheduleItem["date"],
+            scheduleItem["time"], scheduleItem.get("endDate"),
+            scheduleItem.get("endTime"), scheduleItem.get("mainCategory")]
+
+
+def exportSnapshot(db, fileName):
+    """
+    Write schedule items with their participants, and celebrities of the
+    database to a snapshot file.
+
+    Episode guests and program cast are folded into participants of the
+    schedule items and per-celebrity postings of the items. The file is
+    written aside and swapped in with a rename, so readers see either the
+    old or the new snapshot.
+    """
+
+    scheduleItems = list(db["schedule"].find({}, {"_id": False}).sort(
+        "dateTime", pymongo.ASCENDING))
+    programIds = list({s["programId"] for s in scheduleItems})
+    episodeGuests, programCast = loadEpisodeGuestsProgramCast(
+        db["episodes"], db["programs"], programIds)
+    mainCategories = {p["programId"]: p.get("mainCatName")
+                      for p in db["programs"].find(
+                          {"programId": {"$in": programIds}},
+                          {"programId": True, "mainCatName": True})}
+    celebItems = list(db["celebrities"].find({}, {"_id": False}).sort(
+        [("appearCount", pymongo.DESCENDING), ("name", pymongo.ASCENDING)]))
+
+    for scheduleItem in scheduleItems:
+        scheduleItem["participants"] = getParticipants(
+            episodeGuests, programCast, scheduleItem["programId"],
+            scheduleItem.get("episodeNum"))
+        scheduleItem.setdefault("mainCategory",
+                                mainCategories.get(scheduleItem["programId"]))
+
+    strings = [f for s in scheduleItems for f in _getStringFields(s)
+               if f is not None]
+    strings.extend(c for s in scheduleItems for c in s["participants"])
+    strings.extend(c["name"] for c in celebItems)
+    strings = _StringTable(strings)
+
+    records = []
+    participants = []
+    postings = {}
+    maxDuration = DEFAULT_DURATION
+
+    for i, scheduleItem in enumerate(scheduleItems):
+        endDateTime = scheduleItem.get("endDateTime")
+
+        if endDateTime:
+            maxDuration = max(maxDuration,
+                              endDateTime - scheduleItem["dateTime"])
+
+        nameIndexes = [strings.getIndex(c)
+                       for c in scheduleItem["participants"]]
+
+        for nameIndex in nameIndexes:
+            postings.setdefault(nameIndex, []).append(i)
+
+        records.append(toMinutes(scheduleItem["dateTime"]))
+        records.append(toMinutes(endDateTime) if endDateTime else -1)
+        records.append(scheduleItem["channelId"])
+        records.append(strings.getIndex(scheduleItem.get("channelName")))
+        records.append(scheduleItem["programId"])
+        records.extend(strings.getIndex(f)
+                       for f in _getStringFields(scheduleItem)[1:])
+        records.append(len(participants))
+        records.append(len(nameIndexes))
+        participants.extend(nameIndexes)
+
+    # Postings are sorted by celebrity so names are found with bisect
+    postingKeys = []
+    postingItems = []
+
+    for nameIndex in sorted(postings):
+        postingKeys.extend([nameIndex, len(postingItems),
+                            len(postings[nameIndex])])
+        postingItems.extend(postings[nameIndex])
+
+    stringOffsets, stringData = strings.pack()
+    meta = {
+        "generations": {c: getGeneration(db, c)
+                        for c in ["schedule", "episodes", "programs",
+                                  "celebrities"]},
+        "maxDurationMinutes": maxDuration // _MINUTE,
+        "exportedAt": datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    }
+    sections = [
+        (b"META", ujson.dumps(meta).encode("utf-8")),
+        (b"STROFFS", stringOffsets),
+        (b"STRDATA", stringData),
+        (b"SCHED", _packInts(records)),
+        (b"PARTS", _packInts(participants)),
+        (b"POSTKEYS", _packInts(postingKeys)),
+        (b"POSTS", _packInts(postingItems)),
+        (b"CELEBS", _packInts([x for c in celebItems
+                               for x in (strings.getIndex(c["name"]),
+                                         c.get("appearCount", 0))]))
+    ]
+
+    tmpFileName = fileName + ".tmp"
+
+    with open(tmpFileName, "wb") as f:
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                             _getByteOrder(), len(sections)))
+
+        # Sections start at 8-byte boundaries so they can be cast in place
+        offsets = []
+
+        for name, data in sections:
+            offset += -offset % 8
+            offsets.append(offset)
+            f.write(_SECTION.pack(name, offset, len(data)))
+            offset += len(data)
+
+        for (name, data), offset in zip(sections, offsets):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmpFileName, fileName)
+
+
+class _Snapshot(object):
+
+    """
+    Memory-mapped snapshot file.
+    """
+
+    def __init__(self, fileName):
+        """
+        Map the file and cast its sections in place.
+        """
+
+        with open(fileName, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mmap)
+        magic, version, byteOrder, numSections = _HEADER.unpack_from(buf)
+
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a snapshot file: {}".format(fileName))
+
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version: {}".format(
+                version))
+
+        if byteOrder != _getByteOrder():
+            raise ValueError("Snapshot byte order does not match: "
+                             "{}".format(fileName))
+
+        sections = {}
+
+        for i in range(numSections):
+            name, offset, length = _SECTION.unpack_from(
+                buf, _HEADER.size + i * _SECTION.size)
+            sections[name.rstrip(b"\0")] = buf[offset:offset + length]
+
+        self.meta = ujson.loads(bytes(sections[b"META"]).decode("utf-8"))
+        self.stringOffsets = sections[b"STROFFS"].cast("i")
+        self.stringData = sections[b"STRDATA"]
+        self.records = sections[b"SCHED"].cast("i")
+        self.participants = sections[b"PARTS"].cast("i")
+        self.postingKeys = sections[b"POSTKEYS"].cast("i")
+        self.postings = sections[b"POSTS"].cast("i")
+        self.celebs = sections[b"CELEBS"].cast("i")
+        self.numRecords = len(self.records) // _RECORD_SIZE
+        self.numStrings = len(self.stringOffsets) - 1
+        self.maxDuration = self.meta["maxDurationMinutes"]
+
+    def getString(self, index):
+        """
+        Get the string of a string table index.
+        """
+
+        offsets = self.stringOffsets
+
+        return str(self.stringData[offsets[index]:offsets[index + 1]],
+                   "utf-8")
+
+    def findString(self, string):
+        """
+        Find the string table index of a string, or -1.
+        """
+
+        lo, hi = 0, self.numStrings
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if self.getString(mid) < string:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self.numStrings and self.getString(lo) == string:
+            return lo
+
+        return -1
+
+    def getField(self, record, field):
+        """
+        Get a field of a schedule record.
+        """
+
+        return self.records[record * _RECORD_SIZE + field]
+
+    def findFirstRecord(self, minutes):
+        """
+        Find the first schedule record starting at or after given minutes.
+        """
+
+        lo, hi = 0, self.numRecords
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if self.getField(mid, _DATE_TIME) < minutes:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def getPostings(self, celeb):
+        """
+        Get the schedule records the celebrity participates in, in dateTime
+        order.
+        """
+
+        nameIndex = self.findString(celeb)
+        keys = self.postingKeys
+        lo, hi = 0, len(keys) // 3
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if keys[mid * 3] < nameIndex:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if nameIndex < 0 or lo == len(keys) // 3 or keys[lo * 3] != nameIndex:
+            return self.postings[0:0]
+
+        offset, count = keys[lo * 3 + 1], keys[lo * 3 + 2]
+
+        return self.postings[offset:offset + count]
+
+    def makeScheduleItem(self, record):
+        """
+        Make a schedule item of a record.
+        """
+
+        fields = self.records[record * _RECORD_SIZE:
+                              (record + 1) * _RECORD_SIZE]
+        scheduleItem = {
+            "date": self.getString(fields[_DATE]),
+            "time": self.getString(fields[_TIME]),
+            "channelId": fields[_CHANNEL_ID],
+            "programId": fields[_PROGRAM_ID],
+            "episodeNum": self.getString(fields[_EPISODE_NUM])
+        }
+
+        for key, field in [("channelName", _CHANNEL_NAME), ("title", _TITLE),
+                           ("endDate", _END_DATE), ("endTime", _END_TIME),
+                           ("mainCategory", _MAIN_CATEGORY)]:
+            if fields[field] >= 0:
+                scheduleItem[key] = self.getString(fields[field])
+
+        offset = fields[_PARTS_OFFSET]
+        scheduleItem["participants"] = [
+            self.getString(i) for i in
+            self.participants[offset:offset + fields[_PARTS_COUNT]]]
+
+        return scheduleItem
+
+    def isOnAir(self, record, minutes):
+        """
+        Check if a schedule record is on air at given minutes.
+        """
+
+        dateTime = self.getField(record, _DATE_TIME)
+        endDateTime = self.getField(record, _END_DATE_TIME)
+
+        if endDateTime < 0:
+            endDateTime = dateTime + DEFAULT_DURATION // _MINUTE
+
+        return dateTime <= minutes < endDateTime
+
+
+class SnapshotScheduleDB(ScheduleStorage):
+
+    """
+    TV information database class on a memory-mapped snapshot file.
+
+    Worker processes mapping the same file share one copy of it in the page
+    cache. A new file swapped in by exportSnapshot() is mapped on the first
+    request after RELOAD_CHECK_INTERVAL, and the old one is unmapped when no
+    request uses it anymore.
+    """
+
+    def __init__(self, fileName):
+        """
+        Initialize members and map the snapshot file.
+        """
+
+        self._fileName = fileName
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(fileName)
+        self._checkedAt = time.time()
+
+    def _getSnapshot(self):
+        """
+        Get the current snapshot, mapping a new file if it was swapped in.
+        """
+
+        if time.time() - self._checkedAt < RELOAD_CHECK_INTERVAL:
+            return self._snapshot
+
+        with self._lock:
+            self._checkedAt = time.time()
+            stat = os.stat(self._fileName)
+            oldStat = self._snapshot.stat
+
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != \
+                    (oldStat.st_ino, oldStat.st_mtime_ns, oldStat.st_size):
+                self._snapshot = _Snapshot(self._fileName)
+
+        return self._snapshot
+
+    def getGeneration(self, collName):
+        """
+        Get the data generation of given collection when the snapshot was
+        exported.
+        """
+
+        return self._getSnapshot().meta["generations"].get(collName, 0)
+
+    def searchSchedule(self, dateStr, timeStr, celebs, channelIds=None,
+                       mainCategory=None):
+        """
+        Search TV schedule with given parameters.
+        """
+
+        snapshot = self._getSnapshot()
+        curDateTime = str2dateTime(dateStr, timeStr)
+        lowerDateTime, upperDateTime = getSearchWindow(curDateTime)
+        celebNames = splitCelebs(celebs)
+        celebItems = {}
+
+        for celeb in celebNames:
+            records = self._findRecords(snapshot, celeb, lowerDateTime,
+                                        upperDateTime)
+            celebItems[celeb] = self._makeScheduleItems(
+                snapshot, records, channelIds, mainCategory)
+
+        return formatSearchResults(celebNames, celebItems)
+
+    def searchScheduleOnAir(self, dateStr, timeStr, celebs, channelIds=None,
+                            mainCategory=None):
+        """
+        Search TV schedule on air at given date and time.
+        """
+
+        snapshot = self._getSnapshot()
+        curDateTime = str2dateTime(dateStr, timeStr)
+        minutes = toMinutes(curDateTime)
+        lowerDateTime = curDateTime - snapshot.maxDuration * _MINUTE
+        celebNames = splitCelebs(celebs)
+        celebItems = {}
+
+        for celeb in celebNames:
+            records = [r for r in self._findRecords(snapshot, celeb,
+                                                    lowerDateTime,
+                                                    curDateTime)
+                       if snapshot.isOnAir(r, minutes)]
+            celebItems[celeb] = self._makeScheduleItems(
+                snapshot, records, channelIds, mainCategory)
+
+        return formatSearchResults(celebNames, celebItems)
+
+    def searchScheduleRange(self, celebs, lowerDateTime, upperDateTime,
+                            limit=0, channelIds=None, mainCategory=None):
+        """
+        Search TV schedule items the celebrities appear in within given
+        dateTime range, up to limit items per celebrity if limit is given.
+        """
+
+        snapshot = self._getSnapshot()
+
+        for celeb in splitCelebs(celebs):
+            records = self._findRecords(snapshot, celeb, lowerDateTime,
+                                        upperDateTime)
+            scheduleItems = self._makeScheduleItems(
+                snapshot, records, channelIds, mainCategory, limit)
+
+            if scheduleItems:
+                yield {"celebrity": celeb,
+                       "scheduleItems": {celeb: scheduleItems}}
+
+    def listSchedule(self, dateStr, dateRange, channelIds=None,
+                     mainCategory=None):
+        """
+        Return TV schedule for given date.
+        """
+
+        snapshot = self._getSnapshot()
+
+        if dateRange == "day":
+            lowerDateTime = str2dateTime(dateStr, "0000")
+            upperDateTime = lowerDateTime + datetime.timedelta(days=1)
+        else:
+            lowerDateTime, upperDateTime = getThisWeekSunSatDateTime(dateStr)
+            upperDateTime += _MINUTE
+
+        lo = snapshot.findFirstRecord(toMinutes(lowerDateTime))
+        hi = snapshot.findFirstRecord(toMinutes(upperDateTime))
+
+        return self._makeScheduleItems(snapshot, range(lo, hi), channelIds,
+                                       mainCategory)
+
+    def listOnAirNow(self, curDateTime):
+        """
+        Return the items airing on every channel at given dateTime, sorted
+        by channel.
+        """
+
+        snapshot = self._getSnapshot()
+        minutes = toMinutes(curDateTime)
+        lo = snapshot.findFirstRecord(minutes - snapshot.maxDuration)
+        hi = snapshot.findFirstRecord(minutes + 1)
+        chanItems = {}
+
+        # The latest starting item wins where air times overlap
+        for record in range(lo, hi):
+            if snapshot.isOnAir(record, minutes):
+                scheduleItem = snapshot.makeScheduleItem(record)
+                chanItems[scheduleItem["channelId"]] = scheduleItem
+
+        return [chanItems[c] for c in sorted(chanItems)]
+
+    def listCelebrities(self, topN, category=None, period=None):
+        """
+        Return celebrity items with most appearances.
+        """
+
+        if category or period:
+            raise RuntimeError("Celebrity leaderboard is not available")
+
+        snapshot = self._getSnapshot()
+        celebs = snapshot.celebs[:topN * 2]
+
+        return [{"name": snapshot.getString(celebs[i]),
+                 "appearCount": celebs[i + 1]}
+                for i in range(0, len(celebs), 2)]
+
+    def _findRecords(self, snapshot, celeb, lowerDateTime, upperDateTime):
+        """
+        Find the schedule records the celebrity participates in within
+        given closed dateTime range.
+        """
+
+        postings = snapshot.getPostings(celeb)
+        lo = bisect.bisect_left(
+            postings, snapshot.findFirstRecord(toMinutes(lowerDateTime)))
+        hi = bisect.bisect_left(
+            postings, snapshot.findFirstRecord(toMinutes(upperDateTime) + 1))
+
+        return postings[lo:hi]
+
+    def _makeScheduleItems(self, snapshot, records, channelIds=None,
+                           mainCategory=None, limit=0):
+        """
+        Make schedule items of records on given channels and of given main
+        category, up to limit items if limit is given.
+        """
+
+        scheduleItems = []
+
+        for record in records:
+            scheduleItem = snapshot.makeScheduleItem(record)
+
+            if isScheduleFilterMatch(scheduleItem, channelIds, mainCategory):
+                scheduleItems.append(scheduleItem)
+
+                if len(scheduleItems) == limit:
+                    break
+
+        return scheduleItems
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import os
+import threading
+import sqlite3
+import ujson
+from .util import str2dateTime
+from .util import getThisWeekSunSatDateTime
+from .storage import ScheduleStorage
+from .queries import splitCelebs
+from .queries import formatSearchResults
+from .queries import getSearchWindow
+from .queries import encodeListCursor
+from .queries import decodeListCursor
+from .scheduleindex import DEFAULT_DURATION
+
+
+# dateTime values are stored as sortable text
+DATETIME_FORMAT = "%Y%m%d%H%M"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedule (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    dateTime TEXT NOT NULL,
+    endDate TEXT,
+    endTime TEXT,
+    endDateTime TEXT,
+    channelId INTEGER NOT NULL,
+    channelName TEXT,
+    programId INTEGER NOT NULL,
+    title TEXT,
+    episodeNum TEXT NOT NULL DEFAULT '',
+    mainCategory TEXT,
+    participants TEXT NOT NULL DEFAULT '[]',
+    -- Also the (channelId, dateTime) index of channel filters
+    UNIQUE (channelId, dateTime)
+);
+CREATE INDEX IF NOT EXISTS scheduleDate ON schedule (date, dateTime);
+CREATE INDEX IF NOT EXISTS scheduleDateTime ON schedule (dateTime);
+CREATE INDEX IF NOT EXISTS scheduleCategory
+    ON schedule (mainCategory, dateTime);
+CREATE INDEX IF NOT EXISTS scheduleEpisode
+    ON schedule (programId, episodeNum, dateTime);
+CREATE TABLE IF NOT EXISTS programs (
+    programId INTEGER PRIMARY KEY,
+    title TEXT,
+    mainCategory TEXT,
+    subCategory TEXT
+);
+CREATE TABLE IF NOT EXISTS programCast (
+    programId INTEGER NOT NULL,
+    celebrity TEXT NOT NULL,
+    PRIMARY KEY (programId, celebrity)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS programCastCelebrity
+    ON programCast (celebrity, programId);
+CREATE TABLE IF NOT EXISTS episodes (
+    programId INTEGER NOT NULL,
+    episodeNum TEXT NOT NULL,
+    episodeDate TEXT,
+    PRIMARY KEY (programId, episodeNum)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS episodeGuests (
+    programId INTEGER NOT NULL,
+    episodeNum TEXT NOT NULL,
+    celebrity TEXT NOT NULL,
+    PRIMARY KEY (programId, episodeNum, celebrity)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS episodeGuestsCelebrity
+    ON episodeGuests (celebrity, programId, episodeNum);
+CREATE TABLE IF NOT EXISTS celebrities (
+    name TEXT PRIMARY KEY,
+    appearCount INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS celebritiesCount
+    ON celebrities (appearCount DESC, name);
+CREATE TABLE IF NOT EXISTS celebrityDeltas (
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    period TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS celebrityDeltasKey
+    ON celebrityDeltas (category, period, name);
+CREATE INDEX IF NOT EXISTS celebrityDeltasPeriod
+    ON celebrityDeltas (period, name);
+CREATE TABLE IF NOT EXISTS metadata (
+    name TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_SCHEDULE_COLUMNS = ["date", "time", "endDate", "endTime", "channelId",
+                     "channelName", "programId", "title", "episodeNum",
+                     "mainCategory", "participants"]
+
+_SELECT_SCHEDULE = ", ".join("s." + c for c in _SCHEDULE_COLUMNS)
+
+# Celebrities match episode guests when the episode number is known and
+# program cast otherwise, as participants do.
+_SEARCH_SQL = """
+SELECT g.celebrity, s.dateTime, s.id, {columns} FROM schedule s
+JOIN episodeGuests g
+    ON g.programId = s.programId AND g.episodeNum = s.episodeNum
+WHERE s.episodeNum != '' AND g.celebrity IN ({celebs}) AND {where}
+UNION ALL
+SELECT c.celebrity, s.dateTime, s.id, {columns} FROM schedule s
+JOIN programCast c ON c.programId = s.programId
+WHERE s.episodeNum = '' AND c.celebrity IN ({celebs}) AND {where}
+ORDER BY 2, 3
+"""
+
+
+def createSqliteSchema(conn):
+    """
+    Create tables and indexes if they do not exist.
+    """
+
+    conn.executescript(SCHEMA)
+
+
+def formatDateTime(dateTime):
+    """
+    Format dateTime as stored.
+    """
+
+    return dateTime.strftime(DATETIME_FORMAT)
+
+
+def bumpSqliteGeneration(conn, name):
+    """
+    Increase the data generation of given table after writing to it.
+    """
+
+    conn.execute("INSERT OR IGNORE INTO metadata (name) VALUES (?)", (name,))
+    conn.execute("UPDATE metadata SET generation = generation + 1 "
+                 "WHERE name = ?", (name,))
+
+
+def makeScheduleItem(row):
+    """
+    Make a schedule item from the schedule columns of a row, leaving out
+    unknown values as documents do.
+    """
+
+    scheduleItem = {}
+
+    for column, value in zip(_SCHEDULE_COLUMNS, row):
+        if value is not None:
+            scheduleItem[column] = value
+
+    scheduleItem["participants"] = ujson.loads(scheduleItem["participants"])
+
+    return scheduleItem
+
+
+def getFilterSql(channelIds=None, mainCategory=None):
+    """
+    Get SQL conditions and parameters narrowing schedule rows down to given
+    channels and main category.
+    """
+
+    conditions = []
+    params = []
+
+    if channelIds:
+        conditions.append("s.channelId IN ({})".format(
+            ", ".join("?" * len(channelIds))))
+        params.extend(channelIds)
+
+    if mainCategory:
+        conditions.append("s.mainCategory = ?")
+        params.append(mainCategory)
+
+    return conditions, params
+
+
+def getListSql(dateStr, dateRange):
+    """
+    Get SQL conditions and parameters of schedule rows of the day or week
+    of given date.
+    """
+
+    if dateRange == "day":
+        return ["s.date = ?"], [dateStr]
+
+    sunDateTime, satDateTime = getThisWeekSunSatDateTime(dateStr)
+
+    return ["s.dateTime BETWEEN ? AND ?"], \
+        [formatDateTime(sunDateTime), formatDateTime(satDateTime)]
+
+
+def getOnAirSql(curDateTime):
+    """
+    Get SQL conditions and parameters of schedule rows on air at given
+    dateTime.
+    """
+
+    conditions = [
+        "s.dateTime <= ?",
+        "(s.endDateTime > ? OR (s.endDateTime IS NULL AND s.dateTime > ?))"
+    ]
+    params = [formatDateTime(curDateTime), formatDateTime(curDateTime),
+              formatDateTime(curDateTime - DEFAULT_DURATION)]
+
+    return conditions, params
+
+
+class SqliteScheduleDB(ScheduleStorage):
+
+    """
+    TV information database class on an SQLite file.
+
+    The file is written by convert_to_sqlite.py and opened read-only. Every
+    thread of every process opens its own connection.
+    """
+
+    supportsPaging = True
+
+    def __init__(self, fileName):
+        """
+        Initialize members and check the file.
+        """
+
+        self._fileName = fileName
+        self._local = threading.local()
+
+        if not os.path.exists(fileName):
+            raise IOError("Cannot find SQLite file: {}".format(fileName))
+
+    def _getConn(self):
+        """
+        Get the connection of the current thread, opening it after fork.
+        """
+
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect("file:{}?mode=ro".format(self._fileName),
+                                   uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        return conn
+
+    def getGeneration(self, collName):
+        """
+        Get the data generation of given table.
+        """
+
+        row = self._getConn().execute(
+            "SELECT generation FROM metadata WHERE name = ?",
+            (collName,)).fetchone()
+
+        return row[0] if row else 0
+
+    def searchSchedule(self, dateStr, timeStr, celebs, channelIds=None,
+                       mainCategory=None):
+        """
+        Search TV schedule with given parameters.
+        """
+
+        curDateTime = str2dateTime(dateStr, timeStr)
+        lowerDateTime, upperDateTime = getSearchWindow(curDateTime)
+        conditions = ["s.dateTime BETWEEN ? AND ?"]
+        params = [formatDateTime(lowerDateTime), formatDateTime(upperDateTime)]
+
+        return self._searchCelebs(splitCelebs(celebs), conditions, params,
+                                  channelIds, mainCategory)
+
+    def searchScheduleOnAir(self, dateStr, timeStr, celebs, channelIds=None,
+                            mainCategory=None):
+        """
+        Search TV schedule on air at given date and time.
+        """
+
+        conditions, params = getOnAirSql(str2dateTime(dateStr, timeStr))
+
+        return self._searchCelebs(splitCelebs(celebs), conditions, params,
+                                  channelIds, mainCategory)
+
+    def searchScheduleRange(self, celebs, lowerDateTime, upperDateTime,
+                            limit=0, channelIds=None, mainCategory=None):
+        """
+        Search TV schedule items the celebrities appear in within given
+        dateTime range, up to limit items per celebrity if limit is given.
+        """
+
+        conditions = ["s.dateTime BETWEEN ? AND ?"]
+        params = [formatDateTime(lowerDateTime), formatDateTime(upperDateTime)]
+
+        for celeb in splitCelebs(celebs):
+            celebItems = self._findCelebItems([celeb], conditions, params,
+                                              channelIds, mainCategory, limit)
+            scheduleItems = celebItems.get(celeb)
+
+            if scheduleItems:
+                yield {"celebrity": celeb,
+                       "scheduleItems": {celeb: scheduleItems}}
+
+    def _searchCelebs(self, celebNames, conditions, params, channelIds,
+                      mainCategory):
+        """
+        Find schedule items of given conditions the celebrities appear in
+        and format them as search results.
+        """
+
+        celebItems = self._findCelebItems(celebNames, conditions, params,
+                                          channelIds, mainCategory)
+
+        return formatSearchResults(celebNames, celebItems)
+
+    def _findCelebItems(self, celebNames, conditions, params, channelIds,
+                        mainCategory, limit=0):
+        """
+        Find schedule items of given conditions the celebrities appear in,
+        grouped by celebrity in dateTime order.
+        """
+
+        filterConditions, filterParams = getFilterSql(channelIds,
+                                                      mainCategory)
+        where = " AND ".join(conditions + filterConditions)
+        celebNames = list(set(celebNames))
+        sql = _SEARCH_SQL.format(columns=_SELECT_SCHEDULE,
+                                 celebs=", ".join("?" * len(celebNames)),
+                                 where=where)
+        branchParams = celebNames + params + filterParams
+
+        if limit:
+            sql += " LIMIT {:d}".format(limit)
+
+        celebItems = {}
+
+        for row in self._getConn().execute(sql, branchParams * 2):
+            celebItems.setdefault(row[0], []).append(
+                makeScheduleItem(row[3:]))
+
+        return celebItems
+
+    def listSchedule(self, dateStr, dateRange, channelIds=None,
+                     mainCategory=None):
+        """
+        Return TV schedule for given date.
+        """
+
+        conditions, params = getListSql(dateStr, dateRange)
+        filterConditions, filterParams = getFilterSql(channelIds,
+                                                      mainCategory)
+        sql = "SELECT {} FROM schedule s WHERE {} ORDER BY s.dateTime, " \
+              "s.id".format(_SELECT_SCHEDULE,
+                            " AND ".join(conditions + filterConditions))
+        rows = self._getConn().execute(sql, params + filterParams)
+
+        return [makeScheduleItem(r) for r in rows]
+
+    def listSchedulePage(self, dateStr, dateRange, limit=0, after=None,
+                         fields=None, channelIds=None, mainCategory=None):
+        """
+        Return TV schedule for given date ordered by dateTime, starting after
+        the position of given cursor and holding up to limit items, along
+        with the cursor of the next page.
+        """
+
+        conditions, params = getListSql(dateStr, dateRange)
+
+        # Keyset pagination on the (dateTime, id) order
+        if after:
+            afterDateTime, afterId = decodeListCursor(after, int)
+            conditions.append("(s.dateTime > ? OR "
+                              "(s.dateTime = ? AND s.id > ?))")
+            params.extend([formatDateTime(afterDateTime),
+                           formatDateTime(afterDateTime), afterId])
+
+        filterConditions, filterParams = getFilterSql(channelIds,
+                                                      mainCategory)
+        where = " AND ".join(conditions + filterConditions)
+        sql = "SELECT s.dateTime, s.id, {} FROM schedule s WHERE {} " \
+              "ORDER BY s.dateTime, s.id".format(_SELECT_SCHEDULE, where)
+
+        if limit:
+            sql += " LIMIT {:d}".format(limit + 1)
+
+        rows = self._getConn().execute(sql, params + filterParams).fetchall()
+        nextCursor = None
+
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            nextCursor = encodeListCursor(
+                datetime.datetime.strptime(rows[-1][0], DATETIME_FORMAT),
+                rows[-1][1])
+
+        scheduleItems = [makeScheduleItem(r[2:]) for r in rows]
+
+        if fields:
+            scheduleItems = [{f: s[f] for f in fields if f in s}
+                             for s in scheduleItems]
+
+        return scheduleItems, nextCursor
+
+    def listOnAirNow(self, curDateTime):
+        """
+        Return the items airing on every channel at given dateTime, sorted
+        by channel.
+        """
+
+        conditions, params = getOnAirSql(curDateTime)
+        sql = "SELECT {} FROM schedule s WHERE {} ORDER BY s.dateTime, " \
+              "s.id".format(_SELECT_SCHEDULE, " AND ".join(conditions))
+        chanItems = {}
+
+        # The latest starting item wins where air times overlap
+        for row in self._getConn().execute(sql, params):
+            scheduleItem = makeScheduleItem(row)
+            chanItems[scheduleItem["channelId"]] = scheduleItem
+
+        return [chanItems[c] for c in sorted(chanItems)]
+
+    def listCelebrities(self, topN, category=None, period=None):
+        """
+        Return celebrity items, optionally of given program category and
+        month period such as "201410".
+        """
+
+        if not (category or period):
+            rows = self._getConn().execute(
+                "SELECT name, appearCount FROM celebrities "
+                "ORDER BY appearCount DESC, name LIMIT ?", (topN,))
+        else:
+            conditions = []
+            params = []
+
+            if category:
+                conditions.append("category = ?")
+                params.append(category)
+
+            if period:
+                conditions.append("period = ?")
+                params.append(period)
+
+            rows = self._getConn().execute(
+                "SELECT name, SUM(count) AS appearCount FROM celebrityDeltas "
+                "WHERE {} GROUP BY name ORDER BY appearCount DESC, name "
+                "LIMIT ?".format(" AND ".join(conditions)), params + [topN])
+
+        return [{"name": name, "appearCount": count} for name, count in rows]
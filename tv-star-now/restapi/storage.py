@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+
+class ScheduleStorage(object):
+
+    """
+    TV information storage interface class.
+
+    API resources read schedule and celebrity data only through these
+    methods, so they serve any storage backend implementing them.
+    """
+
+    # Whether listSchedulePage() is implemented
+    supportsPaging = False
+
+    def getGeneration(self, collName):
+        """
+        Get the data generation of given collection.
+        """
+
+        raise NotImplementedError
+
+    def searchSchedule(self, dateStr, timeStr, celebs, channelIds=None,
+                       mainCategory=None):
+        """
+        Search TV schedule around given date and time for celebrities.
+        """
+
+        raise NotImplementedError
+
+    def searchScheduleOnAir(self, dateStr, timeStr, celebs, channelIds=None,
+                            mainCategory=None):
+        """
+        Search TV schedule on air at given date and time for celebrities.
+        """
+
+        raise NotImplementedError
+
+    def searchScheduleRange(self, celebs, lowerDateTime, upperDateTime,
+                            limit=0, channelIds=None, mainCategory=None):
+        """
+        Search TV schedule items the celebrities appear in within given
+        dateTime range, yielding results per celebrity.
+        """
+
+        raise NotImplementedError
+
+    def listSchedule(self, dateStr, dateRange, channelIds=None,
+                     mainCategory=None):
+        """
+        Return TV schedule for given date.
+        """
+
+        raise NotImplementedError
+
+    def listSchedulePage(self, dateStr, dateRange, limit=0, after=None,
+                         fields=None, channelIds=None, mainCategory=None):
+        """
+        Return a page of TV schedule for given date and the cursor of the
+        next page. Raises ValueError on an invalid cursor.
+        """
+
+        raise NotImplementedError
+
+    def listOnAirNow(self, curDateTime):
+        """
+        Return the items airing on every channel at given dateTime.
+        """
+
+        raise NotImplementedError
+
+    def listCelebrities(self, topN, category=None, period=None):
+        """
+        Return celebrity items with most appearances.
+        """
+
+        raise NotImplementedError
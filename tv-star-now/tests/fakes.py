@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+# MongoDB stand-ins and document builders shared by the tests
+
+
+import itertools
+
+
+def isMatch(doc, query):
+    """
+    Check if a document matches a query of equality, $gt and $in conditions.
+    Like MongoDB, $gt only matches values of the operand's type.
+    """
+
+    for key, cond in (query or {}).items():
+        value = doc.get(key)
+
+        if isinstance(cond, dict):
+            for op, operand in cond.items():
+                if op == "$gt":
+                    if type(value) is not type(operand) or \
+                            not value > operand:
+                        return False
+                elif op == "$in":
+                    if value not in operand:
+                        return False
+                else:
+                    raise NotImplementedError(op)
+        elif isinstance(value, list):
+            if cond not in value:
+                return False
+        elif value != cond:
+            return False
+
+    return True
+
+
+def project(doc, projection):
+    """
+    Copy the fields of a document selected by a projection.
+    """
+
+    if not projection:
+        return dict(doc)
+
+    if any(v for k, v in projection.items() if k != "_id"):
+        return {k: v for k, v in doc.items()
+                if projection.get(k, k == "_id")}
+
+    return {k: v for k, v in doc.items() if projection.get(k, True)}
+
+
+class FakeCursor(list):
+
+    """
+    Cursor stand-in over copies of the found documents.
+    """
+
+    def sort(self, keys, direction=None):
+        """
+        Sort documents by a key or a list of (key, direction) pairs.
+        """
+
+        if direction is not None:
+            keys = [(keys, direction)]
+
+        for key, direction in reversed(keys):
+            list.sort(self, key=lambda d: d[key], reverse=direction < 0)
+
+        return self
+
+    def limit(self, count):
+        """
+        Keep the first count documents, all if count is 0.
+        """
+
+        if count:
+            del self[count:]
+
+        return self
+
+
+class FakeColl(object):
+
+    """
+    Collection stand-in giving documents without an _id increasing ones.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, items=()):
+        """
+        Initialize members.
+        """
+
+        self.name = None
+        self.database = None
+        self.items = []
+        self.insert(list(items))
+
+    def insert(self, items):
+        """
+        Add a document or a list of documents.
+        """
+
+        if isinstance(items, dict):
+            items = [items]
+
+        for item in items:
+            item.setdefault("_id", next(self._ids))
+            self.items.append(item)
+
+    def find(self, query=None, projection=None):
+        """
+        Return copies of the matching documents.
+        """
+
+        return FakeCursor(project(i, projection) for i in self.items
+                          if isMatch(i, query))
+
+    def find_one(self, query=None, projection=None):
+        """
+        Return a copy of the first matching document, None if not found.
+        """
+
+        for item in self.find(query, projection):
+            return item
+
+        return None
+
+
+class FakeDatabase(dict):
+
+    """
+    Database stand-in creating empty collections on first use.
+    """
+
+    def __init__(self, colls=None):
+        """
+        Add given collections by name.
+        """
+
+        dict.__init__(self)
+
+        for name, coll in (colls or {}).items():
+            self[name] = coll
+
+    def __setitem__(self, name, coll):
+        coll.name = name
+        coll.database = self
+        dict.__setitem__(self, name, coll)
+
+    def __missing__(self, name):
+        self[name] = FakeColl()
+
+        return self[name]
+
+
+def makeScheduleItem(channelId, programId, dateTime, endDateTime=None,
+                     **fields):
+    """
+    Make a schedule document with extra fields, e.g. episodeNum.
+    """
+
+    scheduleItem = {
+        "date": dateTime.strftime("%Y%m%d"),
+        "time": dateTime.strftime("%H%M"),
+        "dateTime": dateTime,
+        "channelId": channelId,
+        "channelName": u"채널{}".format(channelId),
+        "programId": programId,
+        "title": u"프로그램{}".format(programId)
+    }
+
+    if endDateTime is not None:
+        scheduleItem["endDate"] = endDateTime.strftime("%Y%m%d")
+        scheduleItem["endTime"] = endDateTime.strftime("%H%M")
+        scheduleItem["endDateTime"] = endDateTime
+
+    scheduleItem.update(fields)
+
+    return scheduleItem
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+
+import unittest
+from unittest import mock
+from restapi.cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    """
+    LRU cache test class.
+    """
+
+    def testGetPut(self):
+        """
+        Cached values are returned and misses give None.
+        """
+
+        cache = LRUCache(2)
+        cache.put("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.getStats()["hits"], 1)
+        self.assertEqual(cache.getStats()["misses"], 1)
+
+    def testEvictsLeastRecentlyUsed(self):
+        """
+        The least recently read or written entry is evicted first.
+        """
+
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.getStats()["size"], 2)
+
+    def testTtlExpires(self):
+        """
+        Entries expire ttl seconds after they are put.
+        """
+
+        cache = LRUCache(2, ttl=10)
+
+        with mock.patch("restapi.cache.time.time", return_value=100.0):
+            cache.put("a", 1)
+
+        with mock.patch("restapi.cache.time.time", return_value=109.0):
+            self.assertEqual(cache.get("a"), 1)
+
+        with mock.patch("restapi.cache.time.time", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(cache.getStats()["size"], 0)
+
+    def testZeroSizeCachesNothing(self):
+        """
+        A cache of size 0 is disabled.
+        """
+
+        cache = LRUCache(0)
+        cache.put("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+
+    def testClear(self):
+        """
+        clear() removes every entry.
+        """
+
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.clear()
+
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+
+import re
+import unittest
+from restapi.celebsuggest import CelebritySuggestIndex
+from restapi.celebsuggest import getChosung
+from restapi.celebsuggest import getSuggestQuery
+from tests.fakes import FakeColl
+
+
+class CelebritySuggestIndexTest(unittest.TestCase):
+
+    """
+    Celebrity suggestion index test class.
+    """
+
+    def setUp(self):
+        """
+        Build an index of a few celebrities.
+        """
+
+        self.coll = FakeColl([
+            {"name": u"유재석", "appearCount": 30},
+            {"name": u"유지태", "appearCount": 10},
+            {"name": u"유희열", "appearCount": 20},
+            {"name": u"이재훈", "appearCount": 5},
+            {"name": u"Tiger JK", "appearCount": 7}
+        ])
+        self.index = CelebritySuggestIndex(self.coll, topK=2)
+
+    def getNames(self, query, limit=10):
+        """
+        Return the names suggested for query.
+        """
+
+        return [r["name"] for r in self.index.suggest(query, limit)]
+
+    def testGetChosung(self):
+        """
+        Hangul syllables are replaced with their initial consonants.
+        """
+
+        self.assertEqual(getChosung(u"유재석 a"), u"ㅇㅈㅅ a")
+
+    def testSyllablePrefix(self):
+        """
+        Names starting with the query come most frequent first.
+        """
+
+        self.assertEqual(self.getNames(u"유"), [u"유재석", u"유희열"])
+        self.assertEqual(self.getNames(u"유지"), [u"유지태"])
+        self.assertEqual(self.getNames(u"유", 1), [u"유재석"])
+        self.assertEqual(self.getNames(u"박"), [])
+
+    def testNormalizedQuery(self):
+        """
+        Spaces and case are ignored.
+        """
+
+        self.assertEqual(self.getNames(u"tiger j"), [u"Tiger JK"])
+        self.assertEqual(self.getNames(u"유 재"), [u"유재석"])
+        self.assertEqual(self.getNames(u" "), [])
+
+    def testChosungQuery(self):
+        """
+        Initial consonants match any syllable beginning with them.
+        """
+
+        self.assertEqual(self.getNames(u"ㅇㅈ"), [u"유재석", u"유지태"])
+        self.assertEqual(self.getNames(u"ㅇㅈㅎ"), [u"이재훈"])
+
+    def testMixedQuery(self):
+        """
+        Syllables and initial consonants can be mixed, walking the subtree
+        when the top names of the node do not suffice.
+        """
+
+        self.assertEqual(self.getNames(u"유ㅈ"), [u"유재석", u"유지태"])
+        self.assertEqual(self.getNames(u"이ㅈ"), [u"이재훈"])
+        self.assertEqual(self.getNames(u"유ㅎ"), [u"유희열"])
+
+    def testSuggestQuery(self):
+        """
+        The MongoDB query matches the names the index suggests.
+        """
+
+        names = [c["name"] for c in self.coll.items]
+
+        for query in [u"유재", u"tigerj", u"ㅇㅈㅎ", u"유ㅈ", u"이 재", u"j.k"]:
+            condition = getSuggestQuery(query)["name"]
+            matches = [n for n in names
+                       if re.match(condition["$regex"], n, re.IGNORECASE)]
+
+            self.assertEqual(sorted(matches), sorted(self.getNames(query)))
+
+    def testRebuildRemovesAndReranks(self):
+        """
+        Deleted names disappear and lowered counts are reranked on rebuild.
+        """
+
+        self.coll.items = [
+            {"name": u"유재석", "appearCount": 1},
+            {"name": u"유지태", "appearCount": 10}
+        ]
+        self.index.rebuild()
+
+        self.assertEqual(self.index.suggest(u"유", 10), [
+            {"name": u"유지태", "appearCount": 10},
+            {"name": u"유재석", "appearCount": 1}
+        ])
+        self.assertEqual(self.getNames(u"ㅇㅈㅎ"), [])
+        self.assertEqual(self.index.getStats()["celebrities"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
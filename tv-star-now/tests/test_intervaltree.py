@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+
+import random
+import unittest
+from restapi.intervaltree import IntervalTree
+
+
+class IntervalTreeTest(unittest.TestCase):
+
+    """
+    Interval tree test class.
+    """
+
+    def testFindPointHalfOpen(self):
+        """
+        Intervals contain their start but not their end.
+        """
+
+        tree = IntervalTree([(10, 20, "a"), (20, 30, "b")])
+
+        self.assertEqual(tree.findPoint(9), [])
+        self.assertEqual(tree.findPoint(10), ["a"])
+        self.assertEqual(tree.findPoint(19), ["a"])
+        self.assertEqual(tree.findPoint(20), ["b"])
+        self.assertEqual(tree.findPoint(30), [])
+
+    def testEmptyIntervalsIgnored(self):
+        """
+        Empty and reversed intervals are left out.
+        """
+
+        tree = IntervalTree([(5, 5, "empty"), (7, 3, "reversed"),
+                             (1, 9, "a")])
+
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree.findPoint(5), ["a"])
+
+    def testEmptyTree(self):
+        """
+        An empty tree finds nothing.
+        """
+
+        tree = IntervalTree([])
+
+        self.assertEqual(len(tree), 0)
+        self.assertEqual(tree.findPoint(0), [])
+
+    def testFindPointMatchesBruteForce(self):
+        """
+        Overlapping intervals are found as a linear scan finds them.
+        """
+
+        rand = random.Random(4)
+        intervals = []
+
+        for i in range(300):
+            start = rand.randint(0, 1000)
+            intervals.append((start, start + rand.randint(0, 120), i))
+
+        tree = IntervalTree(intervals)
+
+        for point in range(-5, 1130, 7):
+            expected = sorted(v for s, e, v in intervals if s <= point < e)
+            self.assertEqual(sorted(tree.findPoint(point)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
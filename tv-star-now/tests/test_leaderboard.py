@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+import unittest
+from unittest import mock
+from restapi.leaderboard import CelebrityLeaderboard
+from restapi.leaderboard import getEpisodePeriod
+from restapi.leaderboard import makeCelebrityDeltas
+from tests.fakes import FakeColl
+
+
+class CelebrityLeaderboardTest(unittest.TestCase):
+
+    """
+    Celebrity leaderboard test class.
+    """
+
+    def setUp(self):
+        """
+        Build leaderboards of a few deltas matching the appearance counts.
+        """
+
+        deltas = makeCelebrityDeltas(collections.Counter({
+            ("A", "201410"): 3, ("B", "201410"): 1, ("B", "201411"): 4
+        }), u"예능")
+        deltas.extend(makeCelebrityDeltas(collections.Counter({("C", ""): 2}),
+                                          u"드라마"))
+        self.deltasColl = FakeColl(deltas)
+        self.celebritiesColl = FakeColl([
+            {"name": "A", "appearCount": 3},
+            {"name": "B", "appearCount": 5},
+            {"name": "C", "appearCount": 2}
+        ])
+        self.leaderboard = CelebrityLeaderboard(self.deltasColl,
+                                                self.celebritiesColl, size=2)
+
+    def getNames(self, topN, category="", period=""):
+        """
+        Return the names on given leaderboard.
+        """
+
+        return [r["name"]
+                for r in self.leaderboard.getTop(topN, category, period)]
+
+    def testGetEpisodePeriod(self):
+        """
+        The period is the month of an episode date, "" if unknown.
+        """
+
+        self.assertEqual(getEpisodePeriod("20141020"), "201410")
+        self.assertEqual(getEpisodePeriod(""), "")
+        self.assertEqual(getEpisodePeriod("2014.10"), "")
+
+    def testGetTop(self):
+        """
+        Counts are summed per category and period and only the top names
+        are kept.
+        """
+
+        self.assertEqual(self.leaderboard.getTop(10), [
+            {"name": "B", "appearCount": 5},
+            {"name": "A", "appearCount": 3}
+        ])
+        self.assertEqual(self.getNames(1), ["B"])
+        self.assertEqual(self.getNames(10, u"예능", "201410"), ["A", "B"])
+        self.assertEqual(self.getNames(10, "", "201411"), ["B"])
+        self.assertEqual(self.getNames(10, u"드라마"), ["C"])
+        self.assertEqual(self.getNames(10, u"교양"), [])
+        self.assertTrue(self.leaderboard.isComplete())
+
+    def addAppearances(self, celebCounts, category):
+        """
+        Ingest appearances as insert_prog_info.py does.
+        """
+
+        for (name, period), count in celebCounts.items():
+            celebItem = next((c for c in self.celebritiesColl.items
+                              if c["name"] == name), None)
+
+            if celebItem is None:
+                celebItem = {"name": name, "appearCount": 0}
+                self.celebritiesColl.insert(celebItem)
+
+            celebItem["appearCount"] += count
+
+        self.deltasColl.insert(makeCelebrityDeltas(celebCounts, category))
+
+    def testRefreshAddsNewDeltas(self):
+        """
+        Refreshing adds only new deltas, without rebuilding.
+        """
+
+        self.addAppearances(collections.Counter({("A", "201411"): 3}), u"예능")
+
+        with mock.patch.object(self.leaderboard, "rebuild") as rebuild:
+            self.leaderboard.refresh()
+            self.leaderboard.refresh()
+
+        rebuild.assert_not_called()
+        self.assertEqual(self.leaderboard.getTop(1),
+                         [{"name": "A", "appearCount": 6}])
+        self.assertEqual(self.getNames(10, "", "201411"), ["B", "A"])
+        self.assertEqual(self.getNames(10, u"드라마"), ["C"])
+        self.assertTrue(self.leaderboard.isComplete())
+
+    def testCompactedDeltasAreNotReadAgain(self):
+        """
+        Deltas compacted after they were applied keep the counts.
+        """
+
+        compacted = []
+
+        for (name, category, period), count in {
+                ("A", u"예능", "201410"): 3, ("B", u"예능", "201410"): 1,
+                ("B", u"예능", "201411"): 4, ("C", u"드라마", ""): 2}.items():
+            key = {"name": name, "category": category, "period": period}
+            compacted.append(dict(key, _id=key, count=count))
+
+        self.deltasColl.items = compacted
+        self.addAppearances(collections.Counter({("C", ""): 1}), u"드라마")
+
+        with mock.patch.object(self.leaderboard, "rebuild") as rebuild:
+            self.leaderboard.refresh()
+
+        rebuild.assert_not_called()
+        self.assertEqual(self.getNames(10, u"드라마"), ["C"])
+        self.assertEqual(self.leaderboard.getTop(10, u"드라마"),
+                         [{"name": "C", "appearCount": 3}])
+
+        # A new server sums compacted and new deltas alike
+        leaderboard = CelebrityLeaderboard(self.deltasColl,
+                                           self.celebritiesColl, size=2)
+
+        self.assertEqual(leaderboard.getTop(10),
+                         self.leaderboard.getTop(10))
+        self.assertTrue(leaderboard.isComplete())
+
+    def testRebuildAfterDrop(self):
+        """
+        Refreshing after the deltas and celebrities are dropped and ingested
+        again does not add to the old counts.
+        """
+
+        self.deltasColl.items = []
+        self.celebritiesColl.items = []
+        self.leaderboard.refresh()
+
+        self.assertEqual(self.leaderboard.getTop(10), [])
+        self.assertFalse(self.leaderboard.isComplete())
+
+        self.addAppearances(collections.Counter({("B", "201410"): 1}), u"예능")
+        self.leaderboard.refresh()
+
+        self.assertEqual(self.leaderboard.getTop(10),
+                         [{"name": "B", "appearCount": 1}])
+        self.assertTrue(self.leaderboard.isComplete())
+
+    def testIncomplete(self):
+        """
+        Celebrities counted without deltas make the leaderboards incomplete.
+        """
+
+        self.celebritiesColl.insert({"name": "D", "appearCount": 9})
+        self.leaderboard.refresh()
+
+        self.assertFalse(self.leaderboard.isComplete())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import unittest
+import ujson
+from restapi.notifier import TimerWheel
+from restapi.notifier import WatchlistNotifier
+from restapi.notifier import getMinute
+from restapi.queries import delDateTimeId
+from tests.fakes import FakeColl
+from tests.fakes import makeScheduleItem
+
+
+class FakeScheduleDB(object):
+
+    """
+    Storage stand-in listing the given schedule items by date.
+    """
+
+    def __init__(self, scheduleItems):
+        """
+        Initialize members.
+        """
+
+        self.scheduleColl = FakeColl(scheduleItems)
+        self.generation = 1
+
+    def getGeneration(self, collName):
+        """
+        Get the schedule generation.
+        """
+
+        return self.generation
+
+    def listSchedule(self, dateStr, dateRange):
+        """
+        Return copies of the items of given date as storages do.
+        """
+
+        return list(delDateTimeId(self.scheduleColl.find({"date": dateStr})))
+
+
+def parseEvent(event):
+    """
+    Parse the name and data of a server-sent event.
+    """
+
+    lines = event.strip().split("\n")
+
+    return lines[0][len("event: "):], ujson.loads(lines[-1][len("data: "):])
+
+
+class TimerWheelTest(unittest.TestCase):
+
+    """
+    Timer wheel test class.
+    """
+
+    def testPopDueEntries(self):
+        """
+        Only entries due at the popped minute are removed, even when later
+        turns share the slot.
+        """
+
+        wheel = TimerWheel(4)
+        wheel.add(1, "a")
+        wheel.add(5, "b")
+        wheel.add(1, "c")
+
+        self.assertEqual(len(wheel), 3)
+        self.assertEqual(wheel.pop(1), ["a", "c"])
+        self.assertEqual(wheel.pop(1), [])
+        self.assertEqual(wheel.pop(5), ["b"])
+        self.assertEqual(len(wheel), 0)
+
+    def testClear(self):
+        """
+        Clearing removes every entry.
+        """
+
+        wheel = TimerWheel(4)
+        wheel.add(2, "a")
+        wheel.clear()
+
+        self.assertEqual(wheel.pop(2), [])
+
+
+class WatchlistNotifierTest(unittest.TestCase):
+
+    """
+    Watchlist notifier test class.
+    """
+
+    def setUp(self):
+        """
+        Create a notifier notifying 5 minutes ahead.
+        """
+
+        dt = datetime.datetime
+        self.db = FakeScheduleDB([
+            makeScheduleItem(1, 10, dt(2014, 10, 20, 19, 0),
+                             participants=[u"유재석", u"하하"]),
+            makeScheduleItem(2, 20, dt(2014, 10, 20, 19, 30),
+                             participants=[u"하하"]),
+            makeScheduleItem(3, 30, dt(2014, 10, 20, 19, 30),
+                             participants=[])
+        ])
+        self.notifier = WatchlistNotifier(self.db, leadMinutes=5)
+
+    def tick(self, hour, minute):
+        """
+        Tick at given time of 2014-10-20.
+        """
+
+        self.notifier.tick(datetime.datetime(2014, 10, 20, hour, minute))
+
+    def testGetMinute(self):
+        """
+        Minutes are counted from the epoch.
+        """
+
+        self.assertEqual(getMinute(datetime.datetime(1970, 1, 1, 1, 2)), 62)
+
+    def testNotifiesWatchers(self):
+        """
+        Watchers are notified once, lead minutes ahead, of the watched
+        celebrities appearing.
+        """
+
+        subscriber = self.notifier.subscribe([u"하하", u"김구라"])
+        self.tick(18, 50)
+        self.tick(18, 54)
+
+        self.assertIsNone(subscriber.get(0))
+
+        self.tick(18, 55)
+        event, data = parseEvent(subscriber.get(0))
+
+        self.assertEqual(event, "onair")
+        self.assertEqual(data["celebrities"], [u"하하"])
+        self.assertEqual(data["scheduleItem"]["channelId"], 1)
+
+        self.tick(18, 55)
+
+        self.assertIsNone(subscriber.get(0))
+
+    def testCatchesUpLateTicks(self):
+        """
+        Items due at minutes skipped by a late tick are still notified.
+        """
+
+        subscriber = self.notifier.subscribe([u"하하"])
+        self.tick(18, 50)
+        self.tick(19, 30)
+
+        self.assertEqual(parseEvent(subscriber.get(0))[1]["scheduleItem"]
+                         ["channelId"], 1)
+        self.assertEqual(parseEvent(subscriber.get(0))[1]["scheduleItem"]
+                         ["channelId"], 2)
+
+    def testUnsubscribe(self):
+        """
+        Unsubscribed watchers are not notified.
+        """
+
+        subscriber = self.notifier.subscribe([u"유재석"])
+        self.notifier.unsubscribe(subscriber)
+        self.tick(18, 55)
+
+        self.assertIsNone(subscriber.get(0))
+        self.assertEqual(self.notifier.getStats()["subscribers"], 0)
+
+    def testMaxSubscribers(self):
+        """
+        Subscribing beyond the limit fails until a subscriber leaves.
+        """
+
+        notifier = WatchlistNotifier(self.db, maxSubscribers=1)
+        subscriber = notifier.subscribe([u"하하"])
+
+        self.assertIsNone(notifier.subscribe([u"유재석"]))
+
+        notifier.unsubscribe(subscriber)
+        notifier.unsubscribe(subscriber)
+
+        self.assertIsNotNone(notifier.subscribe([u"유재석"]))
+        self.assertEqual(notifier.getStats()["subscribers"], 1)
+
+    def testReloadsOnGenerationChange(self):
+        """
+        Schedule changes are loaded into the wheel from the next minute on.
+        """
+
+        subscriber = self.notifier.subscribe([u"김구라"])
+        self.tick(18, 50)
+        self.db.scheduleColl.insert(makeScheduleItem(
+            4, 40, datetime.datetime(2014, 10, 20, 19, 10),
+            participants=[u"김구라"]))
+        self.db.generation += 1
+        self.tick(19, 5)
+
+        self.assertEqual(parseEvent(subscriber.get(0))[1]["scheduleItem"]
+                         ["channelId"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import unittest
+from restapi.slottable import SlotTable
+from restapi.slottable import getSlot
+from restapi.slottable import getSlotStartDateTime
+from tests.fakes import FakeColl
+from tests.fakes import makeScheduleItem
+
+
+class SlotTableTest(unittest.TestCase):
+
+    """
+    On-air slot table test class.
+    """
+
+    def setUp(self):
+        """
+        Build a table of two channels.
+        """
+
+        dt = datetime.datetime
+        self.table = SlotTable(FakeColl([
+            makeScheduleItem(2, 20, dt(2014, 10, 20, 19, 0),
+                             dt(2014, 10, 20, 20, 0)),
+            makeScheduleItem(1, 10, dt(2014, 10, 20, 19, 0),
+                             dt(2014, 10, 20, 19, 32)),
+            makeScheduleItem(1, 11, dt(2014, 10, 20, 19, 32),
+                             dt(2014, 10, 20, 20, 0)),
+            makeScheduleItem(1, 12, dt(2014, 10, 20, 20, 10))
+        ]))
+
+    def getProgramIds(self, hour, minute):
+        """
+        Return IDs of the programs found at given time of 2014-10-20.
+        """
+
+        return [s["programId"] for s in self.table.findNow(
+            datetime.datetime(2014, 10, 20, hour, minute))]
+
+    def testGetSlot(self):
+        """
+        Slots are 5-minute steps from Sunday midnight.
+        """
+
+        dateTime = datetime.datetime(2014, 10, 20, 0, 7)
+
+        self.assertEqual(getSlot(dateTime),
+                         (datetime.datetime(2014, 10, 19), 24 * 12 + 1))
+        self.assertEqual(getSlotStartDateTime(dateTime),
+                         datetime.datetime(2014, 10, 20, 0, 5))
+
+    def testFindNow(self):
+        """
+        Items on air at the start of the slot are found sorted by channel.
+        """
+
+        self.assertEqual(self.getProgramIds(19, 0), [10, 20])
+        self.assertEqual(self.getProgramIds(19, 34), [10, 20])
+        self.assertEqual(self.getProgramIds(19, 35), [11, 20])
+        self.assertEqual(self.getProgramIds(18, 0), [])
+
+    def testGapAndDefaultDuration(self):
+        """
+        An item starting within a slot fills a gap, and items without an
+        end air for an hour.
+        """
+
+        self.assertEqual(self.getProgramIds(20, 5), [])
+        self.assertEqual(self.getProgramIds(20, 10), [12])
+        self.assertEqual(self.getProgramIds(21, 5), [12])
+        self.assertEqual(self.getProgramIds(21, 10), [])
+
+    def testItemsAreCopied(self):
+        """
+        Found items carry participants and can be modified by callers.
+        """
+
+        found = self.table.findNow(datetime.datetime(2014, 10, 20, 19, 0))
+        found[0]["note"] = "x"
+
+        self.assertEqual(found[0]["participants"], [])
+        self.assertNotIn("dateTime", found[0])
+        self.assertNotIn("note", self.table.findNow(
+            datetime.datetime(2014, 10, 20, 19, 0))[0])
+        self.assertEqual(self.table.getStats(), {"weeks": 1, "items": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+from restapi.snapshot import SnapshotScheduleDB
+from restapi.snapshot import exportSnapshot
+from tests.fakes import FakeColl
+from tests.fakes import FakeDatabase
+from tests.fakes import makeScheduleItem
+
+
+class SnapshotTest(unittest.TestCase):
+
+    """
+    Snapshot file format test class.
+    """
+
+    def setUp(self):
+        """
+        Export a snapshot of a small database.
+        """
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.tmpDir, "test.snap")
+        dt = datetime.datetime
+        self.db = FakeDatabase({
+            "schedule": FakeColl([
+                makeScheduleItem(2, 20, dt(2014, 10, 20, 20, 0),
+                                 dt(2014, 10, 20, 21, 0), episodeNum=""),
+                makeScheduleItem(1, 10, dt(2014, 10, 20, 19, 0),
+                                 dt(2014, 10, 20, 20, 0), episodeNum="3"),
+                makeScheduleItem(1, 11, dt(2014, 10, 20, 20, 0),
+                                 episodeNum="")
+            ]),
+            "episodes": FakeColl([
+                {"programId": 10, "episodeNum": "3",
+                 "guests": [u"유재석", u"하하"]}
+            ]),
+            "programs": FakeColl([
+                {"programId": 10, "cast": [u"김구라"], "mainCatName": u"예능"},
+                {"programId": 11, "cast": [u"하하"], "mainCatName": u"예능"},
+                {"programId": 20, "cast": [], "mainCatName": u"드라마"}
+            ]),
+            "celebrities": FakeColl([
+                {"name": u"하하", "appearCount": 2},
+                {"name": u"유재석", "appearCount": 2},
+                {"name": u"김구라", "appearCount": 1}
+            ]),
+            "metadata": FakeColl([{"_id": "schedule", "generation": 3}])
+        })
+        exportSnapshot(self.db, self.fileName)
+
+    def tearDown(self):
+        """
+        Remove the snapshot.
+        """
+
+        shutil.rmtree(self.tmpDir)
+
+    def testListSchedule(self):
+        """
+        Items come back in dateTime order with participants folded in and
+        missing fields left out.
+        """
+
+        scheduleItems = SnapshotScheduleDB(self.fileName).listSchedule(
+            "20141020", "day")
+
+        self.assertEqual([s["programId"] for s in scheduleItems],
+                         [10, 20, 11])
+        self.assertEqual(scheduleItems[0], {
+            "date": "20141020", "time": "1900", "endDate": "20141020",
+            "endTime": "2000", "channelId": 1, "channelName": u"채널1",
+            "programId": 10, "title": u"프로그램10", "episodeNum": "3",
+            "mainCategory": u"예능", "participants": [u"유재석", u"하하"]
+        })
+        self.assertNotIn("endTime", scheduleItems[2])
+        self.assertEqual(scheduleItems[2]["participants"], [u"하하"])
+
+    def testPostings(self):
+        """
+        Celebrities are found with their items in dateTime order.
+        """
+
+        db = SnapshotScheduleDB(self.fileName)
+        lower = datetime.datetime(2014, 10, 20)
+        upper = datetime.datetime(2014, 10, 20, 23, 59)
+        results = list(db.searchScheduleRange(u"하하|유재석|없음", lower, upper))
+
+        self.assertEqual([r["celebrity"] for r in results],
+                         [u"하하", u"유재석"])
+        self.assertEqual([s["programId"]
+                          for s in results[0]["scheduleItems"][u"하하"]],
+                         [10, 11])
+
+    def testOnAirAndCelebrities(self):
+        """
+        Items without an end are on air for the default duration, and
+        celebrities keep the exported order.
+        """
+
+        db = SnapshotScheduleDB(self.fileName)
+        onAirItems = db.listOnAirNow(datetime.datetime(2014, 10, 20, 20, 30))
+
+        self.assertEqual([s["programId"] for s in onAirItems], [11, 20])
+        self.assertEqual([c["name"] for c in db.listCelebrities(2)],
+                         [u"유재석", u"하하"])
+        self.assertEqual(db.getGeneration("schedule"), 3)
+        self.assertEqual(db.getGeneration("episodes"), 0)
+
+    def testRejectsOtherFiles(self):
+        """
+        Files without the magic or of another version are not mapped.
+        """
+
+        with open(self.fileName, "r+b") as f:
+            f.seek(8)
+            f.write(struct.pack("<I", 99))
+
+        with self.assertRaisesRegex(ValueError, "version"):
+            SnapshotScheduleDB(self.fileName)
+
+        with open(self.fileName, "r+b") as f:
+            f.write(b"NOTSNAP\0")
+
+        with self.assertRaisesRegex(ValueError, "Not a snapshot"):
+            SnapshotScheduleDB(self.fileName)
+
+    def testReloadsSwappedFile(self):
+        """
+        A snapshot exported again is mapped on the next check.
+        """
+
+        db = SnapshotScheduleDB(self.fileName)
+        self.db["metadata"].items[0]["generation"] = 4
+        self.db["schedule"].items.pop()
+        exportSnapshot(self.db, self.fileName)
+
+        with mock.patch("restapi.snapshot.RELOAD_CHECK_INTERVAL", 0):
+            self.assertEqual(db.getGeneration("schedule"), 4)
+            self.assertEqual(len(db.listSchedule("20141020", "day")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
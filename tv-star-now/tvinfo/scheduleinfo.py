@@ -16,6 +16,7 @@ import ujson
 from .daumtv import Schedule
 from .natetv import AuxSchedule
 from .util import validateDate
+from .util import getDateTimeKey
 
 
 class ScheduleInfo(object):
@@ -930,6 +931,7 @@ class ScheduleInfo(object):
             auxSchedule = self._auxSchedule.getChanSchedule(self._date,
                                                             linkTmpl)
             fullSchedule = self._combineSchedule(schedule, auxSchedule)
+            chanSchedules = []
 
             for scheduleElem in fullSchedule:
                 chanSchedule = {
@@ -938,7 +940,9 @@ class ScheduleInfo(object):
                     "date": scheduleElem["date"],
                     "schedule": scheduleElem["daySchedule"]
                 }
-                self._writeChanSchedule(chanSchedule)
+                chanSchedules.append(chanSchedule)
+
+            self._writeScheduleItems(self._decompChanSchedule(chanSchedules))
 
     def digSchedule(self):
         """
@@ -967,6 +971,7 @@ class ScheduleInfo(object):
             auxSchedule = self._auxSchedule.getChanSchedule(self._date,
                                                             linkTmpl)
             fullSchedule = self._combineSchedule(schedule, auxSchedule)
+            chanSchedules = []
 
             for scheduleElem in fullSchedule:
                 chanSchedule = {
@@ -975,7 +980,9 @@ class ScheduleInfo(object):
                     "date": scheduleElem["date"],
                     "schedule": scheduleElem["daySchedule"]
                 }
-                dugSchedule.extend(self._decompChanSchedule(chanSchedule))
+                chanSchedules.append(chanSchedule)
+
+            dugSchedule.extend(self._decompChanSchedule(chanSchedules))
 
         return dugSchedule
 
@@ -1024,31 +1031,41 @@ class ScheduleInfo(object):
 
         return None
 
-    def _writeChanSchedule(self, chanSchedule):
+    def _writeScheduleItems(self, scheduleItems):
         """
-        Decompose and write channel schedule to output file.
+        Write schedule items to output file.
         """
 
-        for scheduleItem in chanSchedule["schedule"]:
-            scheduleItem["channelId"] = chanSchedule["channelId"]
-            scheduleItem["channelName"] = chanSchedule["channelName"]
-            scheduleItem["date"] = chanSchedule["date"]
+        for scheduleItem in scheduleItems:
             self._outputFile.write("{}\n".format(ujson.dumps(scheduleItem,
                                                              ensure_ascii=
                                                              False)))
         self._outputFile.flush()
 
-    def _decompChanSchedule(self, chanSchedule):
+    def _decompChanSchedule(self, chanSchedules):
         """
-        Decompose schedule into a list.
+        Decompose daily schedules of a channel into a list and set the end
+        date and time of each item to the start of the next one.
         """
 
         decSchedule = []
 
-        for scheduleItem in chanSchedule["schedule"]:
-            scheduleItem["channelId"] = chanSchedule["channelId"]
-            scheduleItem["channelName"] = chanSchedule["channelName"]
-            scheduleItem["date"] = chanSchedule["date"]
-            decSchedule.append(scheduleItem)
+        for chanSchedule in chanSchedules:
+            for scheduleItem in chanSchedule["schedule"]:
+                scheduleItem["channelId"] = chanSchedule["channelId"]
+                scheduleItem["channelName"] = chanSchedule["channelName"]
+                scheduleItem["date"] = chanSchedule["date"]
+                decSchedule.append(scheduleItem)
+
+        decSchedule.sort(key=getDateTimeKey)
+
+        for scheduleItem, nextItem in zip(decSchedule, decSchedule[1:]):
+            scheduleItem["endDate"] = nextItem["date"]
+            scheduleItem["endTime"] = nextItem["time"]
+
+        # End of the last item is not known yet.
+        if decSchedule:
+            decSchedule[-1]["endDate"] = ""
+            decSchedule[-1]["endTime"] = ""
 
         return decSchedule
@@ -302,6 +302,14 @@ def str2dateTime(dateStr, timeStr):
     return dateTime
 
 
+def getDateTimeKey(scheduleItem):
+    """
+    Get sort key of schedule item by date and time.
+    """
+
+    return scheduleItem["date"], scheduleItem["time"]
+
+
 def containsNum(src):
     """
     Check if given string contains number character.
@@ -14,6 +14,9 @@ import ujson
 import pymongo
 import tvinfo
 from restapi.util import str2dateTime
+from restapi.datagen import bumpGeneration
+from restapi.participants import materializeParticipants
+from restapi.appearances import materializeAppearances
 
 
 def parseCmdLineArgs():
@@ -70,9 +73,18 @@ def updateSchedule(host, port, schedule):
         timeStr = scheduleItem["time"]
         scheduleItem["dateTime"] = str2dateTime(dateStr, timeStr)
 
+        # Add end datetime object property if the end is known
+        if scheduleItem.get("endTime"):
+            endDateStr = scheduleItem["endDate"]
+            endTimeStr = scheduleItem["endTime"]
+            scheduleItem["endDateTime"] = str2dateTime(endDateStr, endTimeStr)
+
         # Upsert
         coll.save(scheduleItem)
 
+    # Let API servers know the schedule changed
+    bumpGeneration(db, "schedule")
+
     client.close()
 
 
@@ -121,6 +133,26 @@ def updateProgInfo(host, port, schedule):
                 putEpisodes(programsColl, episodesColl, celebsColl, episodes)
 
 
+def updateParticipants(host, port, schedule):
+    """
+    Re-materialize participants of updated schedule items and upcoming
+    appearances.
+    """
+
+    client = pymongo.MongoClient(host=host, port=port)
+    db = client["tv-star-now"]
+    programIds = [s["programId"] for s in schedule]
+
+    materializeParticipants(db["schedule"], db["episodes"], db["programs"],
+                            programIds)
+    materializeAppearances(db)
+
+    # Let API servers know the schedule changed
+    bumpGeneration(db, "schedule")
+
+    client.close()
+
+
 def crawlProgramInfo(programId):
     """
     crawl single program information.
@@ -140,6 +172,8 @@ def main(host, port, date, chanType, chanCat):
     updateSchedule(host, port, schedule)
     print("Updating program information.")
     updateProgInfo(host, port, schedule)
+    print("Updating participants.")
+    updateParticipants(host, port, schedule)
 
 
 #